@@ -0,0 +1,249 @@
+# /bench/assistant_load.py
+"""
+智能舆情分析助手的压测脚本：模拟 N 个并发会话依次完成“上传 → 本地校验 → 分析 → 多轮对话”，
+输出各阶段的 p50/p95/p99 延迟和吞吐量。
+
+默认会在子进程中启动 tools/stub_agent.py 和 tools/stub_llm.py 两个桩服务：
+    python -m bench.assistant_load --sessions 20 --turns 3 --rows 500
+指向已有服务时加 --no-stubs 并设置 AGENT_BASE_URL / VLLM_BASE_URL 环境变量。
+"""
+
+import argparse
+import io
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+
+from bench.common import environment_info, format_table, save_json, summarize_latencies
+from tools.review_vocab import CLOSERS, ISSUE_TYPES, OPENERS, PLATFORMS, SCENIC_SPOTS
+
+STARTER_QUESTIONS = [
+    "这批评论里最突出的问题是什么？",
+    "黄山的排队问题严重吗？",
+    "哪个平台的差评最多？",
+    "请给出三条最优先的改进建议。",
+    "卫生环境方面的投诉主要集中在哪里？",
+]
+
+
+def make_upload(rows, rng):
+    """ 生成一份模拟的原始评论 CSV 文件 """
+    issue_specs = list(ISSUE_TYPES.values())
+    records = []
+    for _ in range(rows):
+        spec = rng.choice(issue_specs)
+        records.append({
+            "点评时间": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "平台": rng.choice(PLATFORMS),
+            "景区名称": rng.choice(SCENIC_SPOTS),
+            "内容": rng.choice(OPENERS) + rng.choice(spec["phrases"]) + rng.choice(CLOSERS),
+        })
+    buffer = io.StringIO()
+    pd.DataFrame(records).to_csv(buffer, index=False)
+    return buffer.getvalue().encode("utf-8")
+
+
+def wait_for_health(url, timeout=30):
+    """ 轮询健康检查接口，直到服务就绪 """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def start_stubs(args):
+    """ 在子进程中启动桩 Agent 和桩 LLM 服务，返回进程列表 """
+    agent_cmd = [sys.executable, "-m", "tools.stub_agent", "--port", str(args.agent_port),
+                 "--latency", str(args.agent_latency), "--per-row-ms", str(args.agent_per_row_ms),
+                 "--fail-rate", str(args.fail_rate)]
+    llm_cmd = [sys.executable, "-m", "tools.stub_llm", "--port", str(args.llm_port),
+               "--ttft", str(args.llm_ttft), "--tokens-per-second", str(args.llm_tokens_per_second),
+               "--fail-rate", str(args.fail_rate)]
+    processes = [subprocess.Popen(agent_cmd), subprocess.Popen(llm_cmd)]
+    ok = wait_for_health(f"http://127.0.0.1:{args.agent_port}/health") and \
+        wait_for_health(f"http://127.0.0.1:{args.llm_port}/health")
+    if not ok:
+        stop_stubs(processes)
+        raise RuntimeError("桩服务未能在规定时间内启动")
+    return processes
+
+
+def stop_stubs(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait(timeout=10)
+
+
+def run_session(session_id, args, recorder):
+    """ 模拟一个用户会话：上传分析一次，然后进行若干轮对话 """
+    from utils import agent_client, chat_context, llm_client, retrieval, upload_validation
+
+    rng = random.Random(args.seed + session_id)
+    upload = make_upload(args.rows, rng)
+    session_started = time.perf_counter()
+
+    started = time.perf_counter()
+    validated = upload_validation.validate_upload(f"session-{session_id}.csv", upload)
+    recorder.add("validate", started)
+
+    started = time.perf_counter()
+    transfer = {}
+    df, report = agent_client.analyze_file(validated.file_name, validated.payload, validated.mime_type,
+                                           response_format=args.response_format, stats=transfer)
+    recorder.add("analysis", started, ok=df is not None)
+    if transfer:
+        recorder.add_value("decode", transfer["decode_ms"])
+        recorder.add_bytes(transfer["bytes"])
+    if df is None:
+        recorder.add("session", session_started, ok=False)
+        return
+
+    started = time.perf_counter()
+    index = retrieval.BM25Index.from_dataframe(df)
+    recorder.add("index_build", started)
+
+    chat_messages = [{"role": "assistant", "content": "您好！我已经分析完您上传的文件。"}]
+    summary_state = {"text": "", "upto": 0}
+    session_ok = True
+    questions = STARTER_QUESTIONS[:args.turns] if args.same_questions else rng.sample(STARTER_QUESTIONS, args.turns)
+    for question in questions:
+        chat_messages.append({"role": "user", "content": question})
+
+        started = time.perf_counter()
+        context, _ = retrieval.build_retrieval_context(index, df, question)
+        messages, summary_state, _ = chat_context.build_chat_messages(
+            report, chat_messages, summary_state, question=question, retrieved_context=context
+        )
+        recorder.add("prompt_build", started)
+
+        started = time.perf_counter()
+        try:
+            answer, source = llm_client.chat_completion(messages, use_cache=not args.no_cache)
+            recorder.add("chat", started, source=source)
+        except Exception:
+            recorder.add("chat", started, ok=False)
+            session_ok = False
+            answer = "抱歉，我在回答时遇到了一个问题。"
+        chat_messages.append({"role": "assistant", "content": answer})
+
+    recorder.add("session", session_started, ok=session_ok)
+
+
+class Recorder:
+    """ 线程安全地记录各阶段耗时、错误数和响应来源 """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.sources = defaultdict(int)
+        self.transfer_bytes = []
+
+    def add(self, stage, started, ok=True, source=None):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self.lock:
+            if ok:
+                self.latencies[stage].append(elapsed_ms)
+            else:
+                self.errors[stage] += 1
+            if source:
+                self.sources[source] += 1
+
+    def add_value(self, stage, elapsed_ms):
+        with self.lock:
+            self.latencies[stage].append(elapsed_ms)
+
+    def add_bytes(self, size):
+        with self.lock:
+            self.transfer_bytes.append(size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="智能舆情分析助手压测")
+    parser.add_argument("--sessions", type=int, default=10, help="模拟的会话总数")
+    parser.add_argument("--concurrency", type=int, default=None, help="同时进行的会话数，默认等于会话总数")
+    parser.add_argument("--turns", type=int, default=3, help="每个会话的对话轮数")
+    parser.add_argument("--rows", type=int, default=300, help="每次上传的评论行数")
+    parser.add_argument("--same-questions", action="store_true", help="所有会话问相同的问题（考察缓存效果）")
+    parser.add_argument("--no-cache", action="store_true", help="关闭对话响应缓存")
+    parser.add_argument("--response-format", choices=["arrow", "parquet", "json"], default="arrow",
+                        help="请求的结构化数据格式")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-stubs", action="store_true", help="不启动桩服务，使用环境变量中的服务地址")
+    parser.add_argument("--agent-port", type=int, default=18000)
+    parser.add_argument("--llm-port", type=int, default=18001)
+    parser.add_argument("--agent-latency", type=float, default=0.5)
+    parser.add_argument("--agent-per-row-ms", type=float, default=0.5)
+    parser.add_argument("--llm-ttft", type=float, default=0.3)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="把结果保存为 JSON 文件")
+    args = parser.parse_args()
+    args.turns = min(args.turns, len(STARTER_QUESTIONS))
+
+    processes = []
+    if not args.no_stubs:
+        # 服务地址在 utils 模块导入时读取，必须在导入之前设置
+        os.environ["AGENT_BASE_URL"] = f"http://127.0.0.1:{args.agent_port}"
+        os.environ["VLLM_BASE_URL"] = f"http://127.0.0.1:{args.llm_port}/v1"
+        processes = start_stubs(args)
+
+    recorder = Recorder()
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency or args.sessions) as pool:
+            futures = [pool.submit(run_session, i, args, recorder) for i in range(args.sessions)]
+            for future in futures:
+                future.result()
+        wall_seconds = time.perf_counter() - started
+    finally:
+        if processes:
+            stop_stubs(processes)
+
+    stages = ["validate", "analysis", "decode", "index_build", "prompt_build", "chat", "session"]
+    rows = []
+    for stage in stages:
+        summary = summarize_latencies(recorder.latencies[stage])
+        rows.append(dict(summary, stage=stage, errors=recorder.errors[stage]))
+
+    completed = len(recorder.latencies["session"])
+    throughput = {
+        "wall_seconds": wall_seconds,
+        "sessions_per_second": completed / wall_seconds if wall_seconds else 0.0,
+        "chat_turns_per_second": len(recorder.latencies["chat"]) / wall_seconds if wall_seconds else 0.0,
+    }
+
+    print(format_table(rows, ["stage", "count", "errors", "mean", "p50", "p95", "p99", "max"]))
+    print(f"\n耗时 {wall_seconds:.1f} s，完成会话 {completed}/{args.sessions}，"
+          f"会话吞吐 {throughput['sessions_per_second']:.2f}/s，对话吞吐 {throughput['chat_turns_per_second']:.2f}/s")
+    print("对话响应来源：" + "，".join(f"{k} {v}" for k, v in recorder.sources.items()))
+    if recorder.transfer_bytes:
+        print(f"结构化数据（{args.response_format}）平均传输 {sum(recorder.transfer_bytes) / len(recorder.transfer_bytes) / 1024:.1f} KB")
+
+    if args.json:
+        save_json(args.json, {
+            "environment": environment_info(),
+            "config": vars(args),
+            "stages": rows,
+            "throughput": throughput,
+            "chat_sources": dict(recorder.sources),
+            "transfer_bytes": recorder.transfer_bytes,
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# /bench/common.py
+"""
+基准测试脚本共用的小工具：延迟分位数汇总、结果表格输出和 JSON 保存。
+"""
+
+import json
+import os
+import platform
+import time
+
+import numpy as np
+
+
+def summarize_latencies(values_ms):
+    """ 汇总一组耗时（毫秒）：次数、均值、p50/p95/p99 和最大值 """
+    if not values_ms:
+        return {"count": 0, "mean": None, "p50": None, "p95": None, "p99": None, "max": None}
+    arr = np.asarray(values_ms, dtype=float)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "count": int(arr.size),
+        "mean": float(arr.mean()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "max": float(arr.max()),
+    }
+
+
+def format_table(rows, columns):
+    """ 把字典列表格式化为等宽文本表格 """
+    def cell(value):
+        if value is None:
+            return "-"
+        if isinstance(value, float):
+            return f"{value:.1f}"
+        return str(value)
+
+    text_rows = [[cell(row.get(c)) for c in columns] for row in rows]
+    widths = [max([len(c)] + [len(r[i]) for r in text_rows]) for i, c in enumerate(columns)]
+    lines = ["  ".join(c.ljust(w) for c, w in zip(columns, widths))]
+    lines.append("  ".join("-" * w for w in widths))
+    lines += ["  ".join(v.ljust(w) for v, w in zip(r, widths)) for r in text_rows]
+    return "\n".join(lines)
+
+
+def environment_info():
+    """ 记录运行环境，便于对比不同机器上的结果 """
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save_json(path, payload):
+    """ 保存结果为 JSON 文件，必要时创建目录 """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
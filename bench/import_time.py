@@ -0,0 +1,112 @@
+# /bench/import_time.py
+"""
+页面冷启动的导入耗时报告：在全新的解释器中用 `-X importtime` 执行页面顶层的 import 语句，
+汇总总耗时和累计耗时最高的模块；加 --render 时再测量在全新进程中首次渲染页面（AppTest）的耗时。
+
+用法（在项目根目录下）：
+    python -m bench.import_time                     # 总览页和一个景区页
+    python -m bench.import_time --page home.py --top 30 --json bench/results/import_time.json
+    python -m bench.import_time --render --repeat 3 # 需要 data/sentiment_data.csv
+"""
+
+import argparse
+import ast
+import json
+import subprocess
+import sys
+import time
+
+from bench.common import environment_info, format_table, save_json, summarize_latencies
+
+DEFAULT_PAGES = ["home.py", "pages/分景区之黄山.py"]
+# 只统计页面自身引入的模块，Streamlit 运行时本身的导入不计入
+BASELINE_IMPORTS = "import streamlit"
+
+RENDER_SNIPPET = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=600).run()
+print(json.dumps({"render_ms": (time.perf_counter() - started) * 1000, "errors": len(at.exception)}))
+"""
+
+
+def page_imports(path):
+    """ 取出页面文件中顶层的 import 语句 """
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def parse_importtime(stderr):
+    """ 解析 -X importtime 的输出，返回 {模块名: (自身耗时 us, 累计耗时 us)} """
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def measure_imports(code):
+    """ 在全新的解释器中执行 code，返回各模块的导入耗时 """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+
+def import_report(page, top):
+    """ 页面导入相对于只导入 Streamlit 的额外耗时，以及累计耗时最高的模块 """
+    baseline = measure_imports(BASELINE_IMPORTS)
+    timings = measure_imports(BASELINE_IMPORTS + "\n" + page_imports(page))
+    extra = {name: t for name, t in timings.items() if name not in baseline}
+    heaviest = sorted(extra.items(), key=lambda item: -item[1][1])[:top]
+    return {
+        "page": page,
+        "modules": len(extra),
+        "total_ms": sum(self_us for self_us, _ in extra.values()) / 1000,
+        "top": [{"module": name, "self_ms": s / 1000, "cumulative_ms": c / 1000} for name, (s, c) in heaviest],
+    }
+
+
+def measure_render(page, repeat):
+    """ 在全新进程中首次渲染页面的耗时（包含导入、加载数据和绘制图表） """
+    samples, errors = [], 0
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", RENDER_SNIPPET, page],
+                                capture_output=True, text=True, check=True)
+        payload = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(payload["render_ms"])
+        errors += payload["errors"]
+    return dict(summarize_latencies(samples), errors=errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="页面冷启动导入耗时报告")
+    parser.add_argument("--page", action="append", help="要测量的页面文件，可重复，默认总览页和黄山页")
+    parser.add_argument("--top", type=int, default=15, help="列出累计耗时最高的模块数")
+    parser.add_argument("--render", action="store_true", help="同时测量全新进程中首次渲染的耗时")
+    parser.add_argument("--repeat", type=int, default=3, help="首次渲染的测量次数")
+    parser.add_argument("--json", help="把结果保存为 JSON 文件")
+    args = parser.parse_args()
+
+    results = []
+    for page in args.page or DEFAULT_PAGES:
+        started = time.perf_counter()
+        report = import_report(page, args.top)
+        print(f"\n== {page}: 额外导入 {report['modules']} 个模块，合计 {report['total_ms']:.1f} ms "
+              f"（测量耗时 {time.perf_counter() - started:.1f} s）")
+        print(format_table(report["top"], ["module", "self_ms", "cumulative_ms"]))
+        if args.render:
+            report["render"] = measure_render(page, args.repeat)
+            render = report["render"]
+            print(f"首次渲染：p50 {render['p50']:.0f} ms，max {render['max']:.0f} ms，异常 {render['errors']} 次")
+        results.append(report)
+
+    if args.json:
+        save_json(args.json, {"environment": environment_info(), "pages": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# /bench/pipeline.py
+"""
+看板数据管线的基准测试：在不同规模的合成数据集上测量 load_data、filter_data（未命中和命中筛选缓存）、get_total_metrics
+和 charts 中每个 create_* 图表构建函数的耗时（p50/p95）和峰值内存，结果保存为 JSON，
+compare 子命令对比基线结果并标出性能回退（有回退时退出码为 1，可直接用于 CI）。
+
+数据集由 tools/make_dataset.py 生成并缓存在 data/synthetic/ 下；每个规模在独立的子进程中测量，互不影响内存。
+load_data 的耗时包含解析、预处理、近似重复标记、异常检测和聚合立方体，近似重复的桶键与线上一样缓存在磁盘上，
+每个数据集第一次运行时会先计算一次（不计时）。
+
+用法（在项目根目录下）：
+    python -m bench.pipeline run --sizes 10k,100k,1m --json bench/results/pipeline.json
+    python -m bench.pipeline run --sizes 10m --repeat 3 --json bench/results/pipeline-10m.json
+    python -m bench.pipeline compare bench/results/baseline.json bench/results/pipeline.json --threshold 0.2
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from bench.common import environment_info, format_table, save_json, summarize_latencies
+
+DEFAULT_SIZES = "10k,100k,1m,10m"
+DATA_DIR = "data/synthetic"
+# 只画单个景区筛选结果的图表，其余图表使用全部数据
+SCENIC_CHARTS = {"create_scenic_issue_bar", "create_scenic_timeline"}
+
+
+def parse_size(text):
+    """ 10k / 1m / 250000 -> 行数 """
+    text = text.strip().lower()
+    for suffix, factor in (("k", 1_000), ("m", 1_000_000)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+
+def dataset_paths(rows, seed):
+    base = os.path.join(DATA_DIR, f"bench_{rows}_{seed}")
+    return base + ".csv", base + "_store"
+
+
+def ensure_dataset(rows, seed):
+    """ 生成（或复用已生成的）基准数据集 """
+    from tools.make_dataset import write_dataset
+
+    path, store_dir = dataset_paths(rows, seed)
+    if not os.path.exists(path):
+        result = write_dataset(path, rows, seed=seed)
+        print(f"生成数据集 {path}：{result['bytes'] / 1024 / 1024:.0f} MB，{result['elapsed_s']:.0f} s", file=sys.stderr)
+    return path, store_dir
+
+
+def rss_mb():
+    # Linux 上 ru_maxrss 的单位是 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(func, repeat, setup=None):
+    """
+    先不开启 tracemalloc 重复执行 repeat 次测耗时，再开启 tracemalloc 执行一次测峰值内存，
+    避免内存追踪的开销计入耗时。setup 在每次执行前调用且不计时（如清空进程级缓存）。
+    """
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    if setup is not None:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return dict(summarize_latencies(samples), peak_mb=round(peak / 1024 / 1024, 2))
+
+
+def prepare(rows, seed):
+    """ 生成数据集，并预先计算、缓存近似重复桶键（在单独的进程中执行，不影响测量进程的峰值 RSS） """
+    from utils.dataset import ReviewDataset
+
+    path, store_dir = ensure_dataset(rows, seed)
+    ReviewDataset(path, store_dir)
+
+
+def run_size(rows, seed, repeat, load_repeat):
+    """ 在当前进程中测量一个规模，返回结果列表 """
+    from utils import charts, data_loader, filter_cache
+    from utils.dataset import ReviewDataset
+
+    path, store_dir = dataset_paths(rows, seed)
+    results = []
+    rss_before = rss_mb()
+    samples, dataset = [], None
+    for _ in range(load_repeat):
+        dataset = None
+        gc.collect()
+        started = time.perf_counter()
+        dataset = ReviewDataset(path, store_dir)
+        samples.append((time.perf_counter() - started) * 1000)
+    # 数据加载使用进程峰值 RSS 的增量：tracemalloc 对千万行的解析开销过大
+    results.append(dict(summarize_latencies(samples), name="load_data", rows=rows,
+                        peak_mb=round(rss_mb() - rss_before, 1), peak_source="rss"))
+    df = dataset.df
+
+    scenic = df['景区名称'].value_counts().index[0]
+    scenic_all = df[df['景区名称'] == scenic]
+    filters = {
+        # 页面默认选中全部取值（与多选框的默认值一致）
+        "filter_data": (scenic_all['平台'].unique().tolist(), scenic_all['核心问题类型'].unique().tolist(),
+                        scenic_all['情感强度'].unique().tolist()),
+        "filter_data[narrow]": (scenic_all['平台'].unique().tolist()[:2],
+                                scenic_all['核心问题类型'].unique().tolist()[:1], ['严重']),
+    }
+    # filter_data 经过进程级筛选缓存：每次执行前清空缓存测实际筛选，命中缓存的路径单独一行
+    for name, (platforms, issue_types, sentiments) in filters.items():
+        stats = measure(lambda: data_loader.filter_data(df, scenic, platforms, issue_types, sentiments), repeat,
+                        setup=filter_cache.clear)
+        results.append(dict(stats, name=name, rows=rows))
+    df_filtered = data_loader.filter_data(df, scenic, *filters["filter_data"])
+    results.append(dict(measure(lambda: data_loader.filter_data(df, scenic, *filters["filter_data"]), repeat),
+                        name="filter_data[cached]", rows=rows))
+
+    results.append(dict(measure(lambda: data_loader.get_total_metrics(df), repeat), name="get_total_metrics",
+                        rows=rows))
+    for name in sorted(n for n in dir(charts) if n.startswith("create_")):
+        func = getattr(charts, name)
+        data = df_filtered if name in SCENIC_CHARTS else df
+        results.append(dict(measure(lambda: func(data), repeat), name=f"charts.{name}", rows=rows))
+    return results
+
+
+def run(args):
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+    results = []
+    for rows in sizes:
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "bench.pipeline", "worker", "--prepare", "--rows", str(rows),
+                        "--seed", str(args.seed)], stdout=subprocess.DEVNULL, check=True)
+        # 每个规模在独立的子进程中运行，峰值 RSS 和缓存互不影响
+        completed = subprocess.run(
+            [sys.executable, "-m", "bench.pipeline", "worker", "--rows", str(rows), "--seed", str(args.seed),
+             "--repeat", str(args.repeat), "--load-repeat", str(args.load_repeat)],
+            stdout=subprocess.PIPE, text=True, check=True)
+        size_results = json.loads(completed.stdout.strip().splitlines()[-1])
+        results.extend(size_results)
+        print(f"\n== {rows} 行（{time.perf_counter() - started:.0f} s）")
+        print(format_table(size_results, ["name", "p50", "p95", "max", "peak_mb"]))
+
+    payload = {"environment": environment_info(),
+               "config": {"sizes": sizes, "seed": args.seed, "repeat": args.repeat, "load_repeat": args.load_repeat},
+               "results": results}
+    if args.json:
+        save_json(args.json, payload)
+    return payload
+
+
+def compare(args):
+    """ 按 (name, rows) 对比 p50 耗时和峰值内存，超过阈值的记为回退 """
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = {(r["name"], r["rows"]): r for r in json.load(f)["results"]}
+    with open(args.current, "r", encoding="utf-8") as f:
+        current = json.load(f)["results"]
+
+    rows, regressions = [], 0
+    for result in current:
+        base = baseline.get((result["name"], result["rows"]))
+        if base is None:
+            rows.append({"name": result["name"], "rows": result["rows"], "p50": result["p50"], "status": "new"})
+            continue
+        time_ratio = result["p50"] / base["p50"] - 1 if base["p50"] else 0.0
+        mem_ratio = result["peak_mb"] / base["peak_mb"] - 1 if base["peak_mb"] else 0.0
+        slower = time_ratio > args.threshold and result["p50"] - base["p50"] > args.min_ms
+        bigger = mem_ratio > args.threshold and result["peak_mb"] - base["peak_mb"] > args.min_mb
+        status = "REGRESSION" if slower or bigger else ("faster" if time_ratio < -args.threshold else "ok")
+        regressions += status == "REGRESSION"
+        rows.append({"name": result["name"], "rows": result["rows"], "base_p50": base["p50"], "p50": result["p50"],
+                     "time_change": f"{time_ratio:+.0%}", "base_mb": base["peak_mb"], "peak_mb": result["peak_mb"],
+                     "mem_change": f"{mem_ratio:+.0%}", "status": status})
+    print(format_table(rows, ["name", "rows", "base_p50", "p50", "time_change", "base_mb", "peak_mb", "mem_change",
+                              "status"]))
+    print(f"\n{regressions} 项性能回退（阈值 {args.threshold:.0%}）")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="看板数据管线基准测试")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="运行基准测试")
+    run_parser.add_argument("--sizes", default=DEFAULT_SIZES, help="逗号分隔的数据规模，如 10k,100k,1m,10m")
+    run_parser.add_argument("--seed", type=int, default=42, help="合成数据的随机种子")
+    run_parser.add_argument("--repeat", type=int, default=5, help="每个函数的计时次数")
+    run_parser.add_argument("--load-repeat", type=int, default=2, help="load_data 的计时次数")
+    run_parser.add_argument("--json", help="把结果保存为 JSON 文件")
+
+    worker = sub.add_parser("worker", help=argparse.SUPPRESS)
+    worker.add_argument("--rows", type=int, required=True)
+    worker.add_argument("--seed", type=int, default=42)
+    worker.add_argument("--repeat", type=int, default=5)
+    worker.add_argument("--load-repeat", type=int, default=2)
+    worker.add_argument("--prepare", action="store_true")
+
+    compare_parser = sub.add_parser("compare", help="对比基线结果，标出性能回退")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="p50 耗时或峰值内存增加超过该比例视为回退")
+    compare_parser.add_argument("--min-ms", type=float, default=1.0, help="耗时增加的绝对值至少为该毫秒数")
+    compare_parser.add_argument("--min-mb", type=float, default=1.0, help="峰值内存增加的绝对值至少为该 MB 数")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run(args)
+    elif args.command == "worker" and args.prepare:
+        prepare(args.rows, args.seed)
+    elif args.command == "worker":
+        print(json.dumps(run_size(args.rows, args.seed, args.repeat, args.load_repeat), ensure_ascii=False))
+    else:
+        sys.exit(1 if compare(args) else 0)
+
+
+if __name__ == "__main__":
+    main()
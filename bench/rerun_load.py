@@ -0,0 +1,303 @@
+# /bench/rerun_load.py
+"""
+端到端的页面重跑压测：用 streamlit.testing.v1.AppTest 模拟 N 个用户会话，每个会话依次
+打开首页、随机浏览若干景区页面并切换侧边栏多选框、再上传文件给分析助手（桩 Agent）并对话若干轮，
+测量每次整页重跑的耗时和进程 RSS，按 页面 × 操作 输出 p50/p95/p99，并汇总各缓存的命中情况。
+
+说明：
+- AppTest 在每次重跑时替换进程级的 Runtime 单例，多个 AppTest 不能在多个线程中同时重跑。
+  因此所有会话的状态同时存在、共享进程内的缓存，但各会话的操作按随机顺序交错、逐次执行；
+  耗时是单次重跑的服务时间，不含排队。
+- AppTest 不支持操作 st.file_uploader，“上传”一步由压测脚本按页面的同一流程完成
+  （本地校验 → 桩 Agent 分析 → 建立检索索引 → 写入结果缓存），再把结果句柄写入会话状态后重跑页面。
+- 每个页面在进程内的第一次打开记为 open_cold（冷缓存），之后记为 open。
+
+用法（在项目根目录下，需要 data/sentiment_data.csv）：
+    python -m bench.rerun_load --sessions 10 --pages 3 --toggles 4 --turns 2
+    python -m bench.rerun_load --sessions 20 --no-upload --json bench/results/rerun_load.json
+"""
+
+import argparse
+import glob
+import os
+import random
+import resource
+import time
+from collections import defaultdict
+
+from bench.common import environment_info, format_table, save_json, summarize_latencies
+
+HOME_SCRIPT = "home.py"
+SCENIC_PAGE_PATTERN = os.path.join("pages", "分景区之*.py")
+ASSISTANT_SCRIPT = os.path.join("pages", "智能舆情分析助手.py")
+ASSISTANT_PAGE = "智能舆情分析助手"
+CHAT_QUESTIONS = [
+    "这批评论里最突出的问题是什么？",
+    "哪个平台的差评最多？",
+    "请给出三条最优先的改进建议。",
+    "卫生环境方面的投诉主要集中在哪里？",
+]
+
+
+def rss_mb():
+    """ 当前进程的常驻内存（MB）；读不到 /proc 时退回峰值 RSS """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def page_name(script):
+    return os.path.splitext(os.path.basename(script))[0].replace("分景区之", "")
+
+
+class Recorder:
+    """ 按 (页面, 操作) 记录每次重跑的耗时、重跑后的 RSS 和页面异常 """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.rss = defaultdict(list)
+        self.errors = defaultdict(list)
+        self.opened = set()
+
+    def rerun(self, at, page, action):
+        """ 重跑一次页面并记录；页面在进程内第一次打开时操作记为 open_cold """
+        if action == "open" and page not in self.opened:
+            self.opened.add(page)
+            action = "open_cold"
+        started = time.perf_counter()
+        try:
+            at.run()
+            errors = [str(e.value) for e in at.exception]
+        except Exception as e:  # 超时等运行器错误
+            errors = [f"{type(e).__name__}: {e}"]
+        self.record(page, action, started, errors)
+
+    def record(self, page, action, started, errors=()):
+        key = (page, action)
+        if errors:
+            self.errors[key].extend(errors)
+        else:
+            self.latencies[key].append((time.perf_counter() - started) * 1000)
+        self.rss[key].append(rss_mb())
+
+    def rows(self):
+        """ 每个 页面 × 操作 一行，另加每个页面全部操作的汇总行 """
+        by_page = defaultdict(list)
+        keys = sorted(set(self.latencies) | set(self.errors))
+        rows = []
+        for page, action in keys:
+            samples = self.latencies.get((page, action), [])
+            by_page[page].extend(samples)
+            rows.append(dict(summarize_latencies(samples), page=page, action=action,
+                             errors=len(self.errors.get((page, action), ())),
+                             rss_mb=max(self.rss.get((page, action), ()), default=None)))
+        for page, samples in sorted(by_page.items()):
+            rows.append(dict(summarize_latencies(samples), page=page, action="*",
+                             errors=sum(len(v) for (p, _), v in self.errors.items() if p == page),
+                             rss_mb=max((max(v) for (p, _), v in self.rss.items() if p == page), default=None)))
+        return rows
+
+
+def toggle_multiselect(at, rng):
+    """ 随机切换一个侧边栏多选框的一个选项：取消选中一项，或把已取消的选项重新选上；至少保留一项 """
+    widgets = [w for w in at.sidebar.multiselect if w.options]
+    if not widgets:
+        return False
+    widget = rng.choice(widgets)
+    missing = [option for option in widget.options if option not in widget.value]
+    if missing and (len(widget.value) <= 1 or rng.random() < 0.5):
+        widget.select(rng.choice(missing))
+    else:
+        widget.unselect(rng.choice(widget.value))
+    return True
+
+
+def upload_to_agent(at, session_id, args, rng):
+    """
+    按分析助手页面的流程完成一次上传分析，并把结果写入会话状态。
+
+    Returns:
+        str: 失败时的错误信息，成功时为 None。
+    """
+    from bench.assistant_load import make_upload
+    from utils import agent_client, session_store, upload_validation
+
+    validated = upload_validation.validate_upload(f"session-{session_id}.csv", make_upload(args.rows, rng))
+    df, report = agent_client.analyze_file(validated.file_name, validated.payload, validated.mime_type)
+    if df is None:
+        return report
+    at.session_state["result_handle"] = session_store.put(df, report)
+    session_store.get_retrieval_index(at.session_state["result_handle"])
+    at.session_state["file_processed"] = True
+    at.session_state["chat_messages"] = [{"role": "assistant", "content": "您好！我已经分析完您上传的文件。"}]
+    at.session_state["chat_summary"] = {"text": "", "upto": 0}
+    return None
+
+
+def session_steps(session_id, args, scenic_scripts, recorder):
+    """ 一个会话的全部操作；每完成一次重跑 yield 一次，由调度器与其他会话交错执行 """
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(args.seed + session_id)
+    at = AppTest.from_file(os.path.abspath(HOME_SCRIPT), default_timeout=args.timeout)
+    recorder.rerun(at, "home", "open")
+    yield
+
+    for script in rng.sample(scenic_scripts, min(args.pages, len(scenic_scripts))):
+        page = page_name(script)
+        at.switch_page(script)
+        recorder.rerun(at, page, "open")
+        yield
+        for _ in range(args.toggles):
+            if not toggle_multiselect(at, rng):
+                break
+            recorder.rerun(at, page, "toggle")
+            yield
+
+    if args.no_upload:
+        return
+    at.switch_page(ASSISTANT_SCRIPT)
+    recorder.rerun(at, ASSISTANT_PAGE, "open")
+    yield
+
+    started = time.perf_counter()
+    try:
+        error = upload_to_agent(at, session_id, args, rng)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    recorder.record(ASSISTANT_PAGE, "upload", started, [error] if error else ())
+    if error:
+        return
+    recorder.rerun(at, ASSISTANT_PAGE, "report")
+    yield
+
+    for question in rng.sample(CHAT_QUESTIONS, min(args.turns, len(CHAT_QUESTIONS))):
+        if not at.chat_input:
+            break
+        at.chat_input[0].set_value(question)
+        recorder.rerun(at, ASSISTANT_PAGE, "chat")
+        yield
+
+
+def run_sessions(args, recorder):
+    """ 同时打开 args.sessions 个会话，每一步随机挑一个未结束的会话执行它的下一次重跑 """
+    scenic_scripts = sorted(glob.glob(SCENIC_PAGE_PATTERN))
+    rng = random.Random(args.seed)
+    sessions = [session_steps(i, args, scenic_scripts, recorder) for i in range(args.sessions)]
+    while sessions:
+        session = rng.choice(sessions)
+        try:
+            next(session)
+        except StopIteration:
+            sessions.remove(session)
+
+
+def cache_snapshot():
+    """ 页面计时记录的缓存命中，加上 cache_registry 中各内存缓存的命中、淘汰和大小 """
+    from utils import cache_registry, perf
+
+    return perf.cache_summary() + [row for row in cache_registry.cache_rows() if not row.get("pinned")]
+
+
+def cache_delta(before, after):
+    """ 两次 cache_snapshot() 之间各缓存的命中/未命中/淘汰增量，以及结束时的大小 """
+    base = {row["cache"]: row for row in before}
+    rows = []
+    for row in after:
+        hits = row["hits"] - base.get(row["cache"], {}).get("hits", 0)
+        misses = row["misses"] - base.get(row["cache"], {}).get("misses", 0)
+        if hits or misses:
+            rows.append({"cache": row["cache"], "hits": hits, "misses": misses,
+                         "hit_rate": round(hits / (hits + misses), 3),
+                         "evictions": row.get("evictions", 0) - base.get(row["cache"], {}).get("evictions", 0)
+                         if "evictions" in row else None,
+                         "size_mb": row.get("size_mb")})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="基于 AppTest 的多会话页面重跑压测")
+    parser.add_argument("--sessions", type=int, default=10, help="模拟的会话数")
+    parser.add_argument("--pages", type=int, default=3, help="每个会话浏览的景区页面数")
+    parser.add_argument("--toggles", type=int, default=4, help="每个景区页面切换多选框的次数")
+    parser.add_argument("--turns", type=int, default=2, help="上传分析后的对话轮数")
+    parser.add_argument("--rows", type=int, default=300, help="每次上传的评论行数")
+    parser.add_argument("--no-upload", action="store_true", help="不访问分析助手页面")
+    parser.add_argument("--timeout", type=float, default=120, help="单次重跑的超时秒数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--perf-log", action="store_true", help="同时把每次重跑写入结构化计时日志")
+    parser.add_argument("--top", type=int, default=5, help="每个页面输出 p95 最高的若干个计时阶段")
+    parser.add_argument("--no-stubs", action="store_true", help="不启动桩服务，使用环境变量中的服务地址")
+    parser.add_argument("--agent-port", type=int, default=18000)
+    parser.add_argument("--llm-port", type=int, default=18001)
+    parser.add_argument("--agent-latency", type=float, default=0.5)
+    parser.add_argument("--agent-per-row-ms", type=float, default=0.5)
+    parser.add_argument("--llm-ttft", type=float, default=0.3)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="把结果保存为 JSON 文件")
+    args = parser.parse_args()
+
+    # 服务地址和计时日志开关在 utils 模块导入时读取，必须在导入之前设置
+    if not args.perf_log:
+        os.environ["PERF_LOG"] = "0"
+    processes = []
+    if not args.no_upload and not args.no_stubs:
+        from bench.assistant_load import start_stubs
+
+        os.environ["AGENT_BASE_URL"] = f"http://127.0.0.1:{args.agent_port}"
+        os.environ["VLLM_BASE_URL"] = f"http://127.0.0.1:{args.llm_port}/v1"
+        processes = start_stubs(args)
+
+    from utils import perf
+
+    recorder = Recorder()
+    rss_start = rss_mb()
+    caches_before = cache_snapshot()
+    try:
+        started = time.perf_counter()
+        run_sessions(args, recorder)
+        wall_seconds = time.perf_counter() - started
+    finally:
+        if processes:
+            from bench.assistant_load import stop_stubs
+
+            stop_stubs(processes)
+
+    rows = recorder.rows()
+    caches = cache_delta(caches_before, cache_snapshot())
+    stages = [row for row in perf.stage_summary() if row["stage"] != perf.RERUN_STAGE]
+    top_stages = []
+    for page in sorted({row["page"] for row in stages}):
+        top_stages.extend([row for row in stages if row["page"] == page][:args.top])
+    memory = {"rss_start_mb": round(rss_start, 1), "rss_end_mb": round(rss_mb(), 1),
+              "rss_peak_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    reruns = sum(len(v) for v in recorder.latencies.values())
+
+    print(format_table(rows, ["page", "action", "count", "errors", "p50", "p95", "p99", "max", "rss_mb"]))
+    print(f"\n{args.sessions} 个会话，{reruns} 次操作，耗时 {wall_seconds:.1f} s；"
+          f"RSS {memory['rss_start_mb']:.0f} → {memory['rss_end_mb']:.0f} MB（峰值 {memory['rss_peak_mb']:.0f} MB）")
+    print("\n缓存命中：")
+    print(format_table(caches, ["cache", "hits", "misses", "hit_rate", "evictions", "size_mb"]) if caches else "（无缓存访问记录）")
+    print(f"\n各页面 p95 最高的 {args.top} 个阶段：")
+    print(format_table(top_stages, ["page", "stage", "count", "p50_ms", "p95_ms", "max_ms"]))
+    for (page, action), errors in sorted(recorder.errors.items()):
+        print(f"\n{page} / {action} 出错 {len(errors)} 次，例如：{errors[0]}")
+
+    if args.json:
+        save_json(args.json, {
+            "environment": environment_info(),
+            "config": vars(args),
+            "reruns": rows,
+            "memory": memory,
+            "caches": caches,
+            "stages": stages,
+            "wall_seconds": wall_seconds,
+            "errors": {f"{page}/{action}": errors for (page, action), errors in recorder.errors.items()},
+        })
+
+
+if __name__ == "__main__":
+    main()
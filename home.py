@@ -1,8 +1,8 @@
 # /pages/home.py
 
 import streamlit as st
-from streamlit_echarts import st_pyecharts
-from utils import data_loader, style, charts
+from utils import data_loader, style, charts, review_browser, perf, perf_panel
+from utils.perf_panel import st_pyecharts
 import streamlit.components.v1 as components
 import time
 
@@ -13,12 +13,20 @@ st.set_page_config(
     page_icon="🗺️",
     layout="wide"
 )
+perf_panel.begin_page("home")
 
 # --- 加载数据和设置页面样式 ---
 # 应用背景图
 style.set_page_background('assets/backgroud.png')
-# 加载数据
+# 加载数据（明细数据和聚合立方体，二者都会增量合并新追加的数据段）
 df = data_loader.load_data('data/sentiment_data.csv')
+agg_cube = data_loader.load_cube('data/sentiment_data.csv')
+
+# 原始计数与去除近似重复评论后的计数之间切换
+dedup_enabled = st.sidebar.toggle("去除近似重复评论", value=False, help="同一条投诉在多个平台稍作修改后重复发布时，只保留其中一条")
+if dedup_enabled:
+    df = data_loader.drop_near_duplicates(df)
+    agg_cube = data_loader.drop_near_duplicates(agg_cube)
 
 # --- 页面内容 ---
 
@@ -27,7 +35,7 @@ st.title("旅游景区负面舆情总览")
 st.markdown("---")
 
 # 2. 顶部核心指标
-total_reviews, platform_count, scenic_spot_count = data_loader.get_total_metrics(df)
+total_reviews, platform_count, scenic_spot_count = data_loader.get_cube_metrics(agg_cube)
 cols_metric = st.columns(3)
 with cols_metric[0]:
     st.metric(label="负面舆情总量", value=f"{total_reviews} 条")
@@ -36,6 +44,15 @@ with cols_metric[1]:
 with cols_metric[2]:
     st.metric(label="涉及景区总数", value=f"{scenic_spot_count} 个")
 
+# 每日评论数异常监测：最近出现突增或持续上升的 景区 × 问题类型
+anomaly_detector = data_loader.get_anomaly_detector()
+current_anomalies = anomaly_detector.current_anomalies()
+with st.expander(f"⚠️ 当前异常波动（{len(current_anomalies)} 项）", expanded=not current_anomalies.empty):
+    if current_anomalies.empty:
+        st.success("最近 7 天各景区的每日评论数均在正常范围内。")
+    else:
+        st.dataframe(current_anomalies, width='stretch', hide_index=True)
+
 st.markdown("---")
 
 # 3. 页面主体布局：左、中、右三列
@@ -47,13 +64,15 @@ with mid_col:
         st.subheader("舆情地理分布热力图")
         map_chart = charts.create_china_heatmap(df)
         # 渲染为 HTML
-        chart_html = map_chart.render_embed()
+        with perf.span("render_embed") as span_record:
+            chart_html = map_chart.render_embed()
+            span_record["bytes"] = len(chart_html.encode("utf-8"))
         # 在 Streamlit 中显示
         components.html(chart_html, height=500, width=500, scrolling=False)
 
     with st.container():
         st.subheader("月度舆情数量趋势图")
-        line_chart = charts.create_monthly_reviews_line(df)
+        line_chart = charts.create_monthly_reviews_line(df, spike_months=anomaly_detector.spike_months())
         st_pyecharts(line_chart, height="400px")
 
 # --- 左侧列内容 ---
@@ -84,3 +103,21 @@ with right_col:
 
         sentiment_pie= charts.create_sentiment_pie(df)
         st_pyecharts(sentiment_pie, width="300px", height="280px")
+
+st.markdown("---")
+
+# 4. 全部景区的评论内容检索
+st.subheader("评论内容检索")
+search_query = st.text_input(
+    "🔍 检索全部景区的评论内容",
+    placeholder="如：排队 索道（空格分隔表示同时包含，OR 分隔表示包含任一）",
+    key="home_search"
+)
+if search_query.strip():
+    # 开启去重时只在保留下来的评论中检索，否则命中的重复评论不在 df 中
+    ranked_ids = data_loader.search_reviews(search_query, candidates=df.index if dedup_enabled else None)
+    search_columns = [c for c in ['点评时间', '景区名称', '平台', '核心问题类型', '情感强度', '内容'] if c in df.columns]
+    review_browser.show_review_browser(df.loc[ranked_ids], search_columns, key="home", ranked=True)
+
+# 结束本次重跑的计时；带管理令牌访问时在侧边栏显示性能面板
+perf_panel.show_perf_panel()
@@ -1,16 +1,14 @@
 # /pages/分景区之华山.py
 
 import streamlit as st
-from streamlit_echarts import st_pyecharts
-from utils import data_loader, style, charts
-import numpy as np
-from PIL import Image
+from utils import data_loader, style, charts, review_browser, perf_panel, filter_cache, filter_state
+from utils.perf_panel import st_pyecharts
 
 # --- 页面基本配置 ---
 SCENIC_SPOT_NAME = "恒山"
 BANNER_IMAGE_PATH = "assets/jingqu/beiyue.png"
 FONT_PATH = "assets/simhei.ttf" # 词云图字体路径
-mask = np.array(Image.open('assets/ditu/hengshan.png'))
+MASK_PATH = 'assets/ditu/hengshan.png'  # 词云形状掩码，只在需要重新绘制词云时读取
 
 # --- 页面设置 ---
 st.set_page_config(
@@ -18,6 +16,7 @@ st.set_page_config(
     page_icon="⛰️",
     layout="wide"
 )
+perf_panel.begin_page(SCENIC_SPOT_NAME)
 
 # --- 加载数据和应用样式 ---
 style.set_page_background('assets/backgroud.png')
@@ -29,35 +28,49 @@ df_scenic_all = df_full[df_full['景区名称'] == SCENIC_SPOT_NAME]
 # --- 侧边栏筛选器 ---
 st.sidebar.header(f"{SCENIC_SPOT_NAME} 数据筛选")
 
+# 筛选器的初始状态取自 URL 查询参数，分享的链接会打开同样的筛选
+dedup_enabled = filter_state.toggle("去除近似重复评论", key=f"{SCENIC_SPOT_NAME}_dedup",
+                                    help="同一条投诉在多个平台稍作修改后重复发布时，只保留其中一条")
+if dedup_enabled:
+    df_full = data_loader.drop_near_duplicates(df_full)
+    df_scenic_all = data_loader.drop_near_duplicates(df_scenic_all)
+
 platforms = df_scenic_all['平台'].unique()
-selected_platforms = st.sidebar.multiselect(
+selected_platforms = filter_state.multiselect(
     "选择平台:",
     options=platforms,
-    default=platforms
+    key=f"{SCENIC_SPOT_NAME}_platforms",
+    field="platforms"
 )
 
 issue_types = df_scenic_all['核心问题类型'].unique()
-selected_issue_types = st.sidebar.multiselect(
+selected_issue_types = filter_state.multiselect(
     "选择核心问题类型:",
     options=issue_types,
-    default=issue_types
+    key=f"{SCENIC_SPOT_NAME}_issue_types",
+    field="issue_types"
 )
 
 sentiments = df_scenic_all['情感强度'].unique()
-selected_sentiments = st.sidebar.multiselect(
+selected_sentiments = filter_state.multiselect(
     "选择情感强度:",
     options=sentiments,
-    default=sentiments
+    key=f"{SCENIC_SPOT_NAME}_sentiments",
+    field="sentiment_levels"
 )
 
 # --- 根据筛选器过滤数据 ---
-df_filtered = data_loader.filter_data(
-    df_full,
-    scenic_spot=SCENIC_SPOT_NAME,
+# 筛选条件规范化为与点击顺序无关的键（全选即不筛选），筛选结果和图表聚合在该键下进程级缓存，并同步到 URL
+filter_key = filter_cache.canonical_key(
+    SCENIC_SPOT_NAME,
     platforms=selected_platforms,
     issue_types=selected_issue_types,
-    sentiment_levels=selected_sentiments
+    sentiment_levels=selected_sentiments,
+    dedup=dedup_enabled,
+    options={"platforms": platforms, "issue_types": issue_types, "sentiment_levels": sentiments}
 )
+filter_state.sync_query_params(filter_key)
+df_filtered, filter_aggregates = data_loader.filter_view(df_full, filter_key)
 
 
 # --- 页面主内容 ---
@@ -88,7 +101,8 @@ wordcloud_image_path = charts.get_or_create_wordcloud_image(
     df=df_full,
     scenic_name=SCENIC_SPOT_NAME,
     font_path=FONT_PATH,
-    mask_image=mask
+    mask_path=MASK_PATH,
+    dedup=dedup_enabled
 )
 
 # 使用 st.image 显示保存好的图片
@@ -105,7 +119,7 @@ col1, col2 = st.columns(2)
 with col1:
     # 按问题内容的柱状图 (动态)
     if not df_filtered.empty:
-        issue_bar_chart = charts.create_scenic_issue_bar(df_filtered)
+        issue_bar_chart = charts.create_scenic_issue_bar(df_filtered, issue_counts=filter_aggregates["issue_counts"])
         if issue_bar_chart:
             st_pyecharts(issue_bar_chart, height="400px")
     else:
@@ -114,7 +128,11 @@ with col1:
 with col2:
     # 按时间的折线图 (动态)
     if not df_filtered.empty:
-        timeline_chart = charts.create_scenic_timeline(df_filtered)
+        # 标出该景区（所选问题类型）每日评论数出现异常的月份
+        spike_months = data_loader.get_anomaly_detector().spike_months(
+            scenic=SCENIC_SPOT_NAME, issue_types=selected_issue_types)
+        timeline_chart = charts.create_scenic_timeline(df_filtered, spike_months=spike_months,
+                                                        monthly_counts=filter_aggregates["monthly_counts"])
         if timeline_chart:
             st_pyecharts(timeline_chart, height="400px")
     else:
@@ -138,11 +156,25 @@ columns_to_display = [
  # 过滤掉数据中不存在的列名，避免程序出错
 existing_columns_to_display = [col for col in columns_to_display if col in df_filtered.columns]
 
-# 使用 st.dataframe 来展示数据
-# use_container_width=True 让表格宽度自适应页面
-# hide_index=True 隐藏 DataFrame 默认的行号索引
-st.dataframe(
-    df_filtered[existing_columns_to_display],
-    use_container_width=True,
-    hide_index=True
- )
\ No newline at end of file
+# 在筛选结果中按关键词检索评论内容，结果按相关度排序
+search_query = st.text_input(
+    "🔍 检索评论内容",
+    placeholder="如：排队 索道（空格分隔表示同时包含，OR 分隔表示包含任一）",
+    key=f"{SCENIC_SPOT_NAME}_search"
+)
+df_browse = df_filtered
+if search_query.strip():
+    ranked_ids = data_loader.search_reviews(search_query, candidates=df_filtered.index)
+    df_browse = df_filtered.loc[ranked_ids]
+
+# 分页、可排序的评论浏览器：每次只把当前页的数据发送到浏览器
+review_browser.show_review_browser(df_browse, existing_columns_to_display, key=SCENIC_SPOT_NAME,
+                                   ranked=df_browse is not df_filtered)
+
+# 按当前筛选（和检索）结果分块导出
+with st.expander("📤 导出筛选结果"):
+    review_browser.show_export_panel(df_full, df_browse.index, key=SCENIC_SPOT_NAME,
+                                     file_stem=f"{SCENIC_SPOT_NAME}_评论导出")
+
+# 结束本次重跑的计时；带管理令牌访问时在侧边栏显示性能面板
+perf_panel.show_perf_panel()
@@ -1,10 +1,6 @@
 # /pages/12_🤖_AI_Assistant.py
 
 import streamlit as st
-import pandas as pd
-import requests
-from openai import OpenAI
-import os
 
 # --- 页面设置 ---
 st.set_page_config(
@@ -14,74 +10,117 @@ st.set_page_config(
 )
 
 # --- 导入并应用背景样式 ---
-from utils import style
+from utils import style, agent_client, chat_context, retrieval, llm_client, upload_validation, review_store, \
+    session_store, perf, perf_panel
+
+perf_panel.begin_page("智能舆情分析助手")
 
 style.set_page_background('assets/backgroud.png')
 
-# --- 后端服务配置 ---
-# 主 Agent 服务地址，用于文件处理
-AGENT_BASE_URL = "http://127.0.0.1:8000"  # 使用 127.0.0.1 而不是 0.0.0.0
-FILE_ANALYSIS_ENDPOINT = f"{AGENT_BASE_URL}/analyze_reviews/"
+# --- 与后端 AI Agent 交互的函数 ---
 
-# vLLM OpenAI 风格 API 地址，用于对话
-VLLM_BASE_URL = "http://hpc.wisesoe.com:58001/v1"
-VLLM_MODEL_NAME = "deepseek-r1-distill-qwen-vllm"
+@perf.timed("agent.analyze_file")
+def analyze_file_with_agent(validated, stats=None):
+    """
+    将本地校验并重新编码后的文件发送到主 Agent 服务进行处理，服务地址见 utils/agent_client.py。
+    结构化数据优先以 Arrow 格式传输，stats 中记录传输字节数和解码耗时。
+    """
+    return agent_client.analyze_file(validated.file_name, validated.payload, validated.mime_type, stats=stats)
 
 
-# --- 与后端 AI Agent 交互的函数 ---
-
-def analyze_file_with_agent(uploaded_file):
+@perf.timed("upload_validation")
+def validate_uploaded_file(uploaded_file):
     """
-    通过 HTTP 请求将文件发送到主 Agent 服务进行处理。
-    期望后端返回一个 JSON，包含处理后的数据和分析建议。
+    本地校验上传的文件，同一个文件只校验一次。
+
+    Returns:
+        tuple: (ValidationResult, 错误信息)，二者只有一个不为 None。
     """
+    cached = st.session_state.upload_validation
+    if cached is not None and cached[0] == uploaded_file.file_id:
+        return cached[1], cached[2]
     try:
-        files = {'file': (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)}
-        response = requests.post(FILE_ANALYSIS_ENDPOINT, files=files, timeout=300)  # 设置较长的超时
-
-        if response.status_code == 200:
-            result = response.json()
-            # 假设后端返回格式为: {"structured_data": [...], "suggestions": "..."}
-            processed_df = pd.DataFrame(result.get("structured_data"))
-            suggestions_text = result.get("suggestions")
-            return processed_df, suggestions_text
-        else:
-            error_message = f"文件分析失败。服务器返回状态码: {response.status_code}。错误信息: {response.text}"
-            return None, error_message
-    except requests.exceptions.RequestException as e:
-        error_message = f"无法连接到分析服务，请确认AI Agent主服务正在 {AGENT_BASE_URL} 运行。错误详情: {e}"
-        return None, error_message
+        result, error = upload_validation.validate_upload(uploaded_file.name, uploaded_file.getvalue()), None
+    except upload_validation.UploadValidationError as e:
+        result, error = None, str(e)
+    st.session_state.upload_validation = (uploaded_file.file_id, result, error)
+    return result, error
 
 
-# --- 与 vLLM 服务交互的函数 ---
+BACKEND_STATUS_LABELS = {
+    "closed": ("🟢", "分析服务运行正常"),
+    "half_open": ("🟡", "分析服务正在恢复，下一次请求将用于试探"),
+    "open": ("🔴", "分析服务暂不可用"),
+}
 
-# 初始化 OpenAI 客户端，指向您的 vLLM 服务
-try:
-    client = OpenAI(
-        base_url=VLLM_BASE_URL,
-        api_key="not-needed"  # 对于本地或私有部署的服务，API密钥通常不是必需的
-    )
-except Exception as e:
-    st.error(f"初始化OpenAI客户端失败: {e}")
-    client = None
+
+@st.fragment(run_every=5)
+def show_backend_status():
+    """ 每 5 秒刷新一次分析服务的熔断状态和健康探测结果 """
+    status = agent_client.get_backend_status()
+    icon, label = BACKEND_STATUS_LABELS[status["state"]]
+    details = []
+    if status["state"] == "open":
+        details.append(f"约 {status['retry_in']:.0f} 秒后重试")
+    probe = status["last_probe"]
+    if probe:
+        details.append(f"最近探测{'成功' if probe['ok'] else '失败'}，耗时 {probe['latency_ms']:.0f} ms")
+    st.caption(f"{icon} {label}" + ("（" + "，".join(details) + "）" if details else ""))
+
+
+@perf.timed("append_to_dashboard")
+def append_to_dashboard(structured_df):
+    """
+    按看板数据集的要求校验结构化结果，并作为新的增量数据段追加。
+    看板页面在下次刷新时自动合并新数据，并用标记过近似重复的新行增量更新词云词频。
+    """
+    try:
+        valid, rejected = review_store.validate_for_dashboard(structured_df)
+    except review_store.StoreSchemaError as e:
+        st.error(str(e))
+        return
+    if not rejected.empty:
+        st.warning(f"有 {len(rejected)} 行不符合看板数据要求，未追加。")
+        st.dataframe(rejected, use_container_width=True)
+    if valid.empty:
+        st.info("没有可追加的数据。")
+        return
+
+    entry = review_store.append_segment(valid, source=st.session_state.upload_validation[1].file_name
+                                        if st.session_state.upload_validation else None)
+    affected = valid['景区名称'].unique()
+    st.session_state.appended_segment = entry["name"]
+    st.success(f"已追加 {entry['rows']} 行到看板数据集，涉及景区：{'、'.join(affected)}。")
 
 
+# --- 与 vLLM 服务交互的函数 ---
+
+@perf.timed("llm.chat_completion")
 def get_chat_response(messages):
     """
-    使用 OpenAI 客户端与您的 vLLM 模型进行对话。
+    与 vLLM 模型进行对话。
+    相同的请求会命中进程级响应缓存，或与正在进行的相同请求合并为一次上游调用。
     """
-    if not client:
-        return "错误：无法与AI对话服务建立连接。"
     try:
-        response = client.chat.completions.create(
-            model=VLLM_MODEL_NAME,
-            messages=messages,
-            temperature=0.7,
-        )
-        return response.choices[0].message.content
+        return llm_client.chat_completion(messages, temperature=0.7)
     except Exception as e:
         st.error(f"与AI对话时发生错误: {e}")
-        return "抱歉，我在回答时遇到了一个问题。"
+        return "抱歉，我在回答时遇到了一个问题。", None
+
+
+# --- 结构化数据分页浏览 ---
+
+DATA_PAGE_SIZE = 200
+
+
+@perf.timed("structured_data_page")
+def show_structured_data_page(handle):
+    """ 从磁盘上的分析结果中只读取当前页的行进行展示，页面负载与结果总行数无关 """
+    total = session_store.num_rows(handle)
+    page_count = max(1, -(-total // DATA_PAGE_SIZE))
+    page = st.number_input(f"页码（共 {page_count} 页，{total} 行）", min_value=1, max_value=page_count,
+                           value=1, step=1, key="structured_data_page")
+    st.dataframe(session_store.read_page(handle, page - 1, DATA_PAGE_SIZE), use_container_width=True)
 
 
 # --- Streamlit 页面 UI ---
@@ -92,53 +131,107 @@ st.markdown(
 st.markdown("---")
 
 # --- 初始化 Session State ---
-if "analysis_report" not in st.session_state:
-    st.session_state.analysis_report = None
-if "structured_data" not in st.session_state:
-    st.session_state.structured_data = None
+# 结构化数据和分析报告保存在磁盘上（utils/session_store.py），会话中只保存句柄
+if "result_handle" not in st.session_state:
+    st.session_state.result_handle = None
 if "chat_messages" not in st.session_state:
     st.session_state.chat_messages = []
 if "file_processed" not in st.session_state:
     st.session_state.file_processed = False
+if "chat_summary" not in st.session_state:
+    st.session_state.chat_summary = {"text": "", "upto": 0}
+if "upload_validation" not in st.session_state:
+    st.session_state.upload_validation = None
+if "appended_segment" not in st.session_state:
+    st.session_state.appended_segment = None
 
 # --- 1. 文件上传与分析 ---
+agent_client.ensure_health_probe()
 with st.container(border=True):
     st.subheader("第一步：上传文件并启动分析")
+    show_backend_status()
     uploaded_file = st.file_uploader(
         "支持CSV或Excel格式的评论文件",
         type=['csv', 'xlsx']
     )
 
+    validated = None
     if uploaded_file is not None:
+        # 在本地完成解析和校验，问题行立即展示，无需等待 Agent
+        validated, validation_error = validate_uploaded_file(uploaded_file)
+        if validation_error:
+            st.error(validation_error)
+        else:
+            st.caption(
+                f"本地校验完成（{validated.elapsed_ms:.0f} ms）：共 {validated.total_rows} 行，"
+                f"有效 {validated.accepted_rows} 行，空行 {validated.empty_rows} 行，"
+                f"重复 {validated.duplicate_rows} 行，不合格 {validated.rejected_count} 行；"
+                f"上传体积 {validated.original_bytes / 1024:.1f} KB → {len(validated.payload) / 1024:.1f} KB"
+            )
+            if validated.rejected_count:
+                with st.expander(f"查看不合格的 {validated.rejected_count} 行"):
+                    st.dataframe(validated.rejected, use_container_width=True)
+            if validated.accepted_rows == 0:
+                st.warning("文件中没有可供分析的有效评论。")
+                validated = None
+
+    if validated is not None:
         if st.button("🚀 开始智能分析", type="primary", use_container_width=True):
             with st.spinner("请稍候... AI Agent正在调用BERT模型进行深度分析..."):
-                df, report = analyze_file_with_agent(uploaded_file)
+                transfer_stats = {}
+                df, report = analyze_file_with_agent(validated, stats=transfer_stats)
 
             if df is not None:
                 st.success("文件分析完成！")
-                st.session_state.structured_data = df
-                st.session_state.analysis_report = report
+                st.caption(
+                    f"结构化数据以 {transfer_stats['format'].upper()} 格式传输："
+                    f"{transfer_stats['bytes'] / 1024:.1f} KB，{transfer_stats['rows']} 行，"
+                    f"解码耗时 {transfer_stats['decode_ms']:.1f} ms"
+                )
+                if st.session_state.result_handle:
+                    session_store.discard(st.session_state.result_handle)
+                st.session_state.result_handle = session_store.put(df, report)
+                del df
+                # 分析完成后为结构化数据建立本地检索索引（进程级有界缓存，不占会话内存），对话时按问题取回相关行
+                with perf.span("retrieval.build_index"):
+                    session_store.get_retrieval_index(st.session_state.result_handle)
                 st.session_state.file_processed = True
                 # 清空旧的对话历史并添加新的系统提示
                 st.session_state.chat_messages = [
                     {"role": "assistant",
                      "content": "您好！我已经分析完您上传的文件。请查看下方的报告和数据，然后我们可以开始对话。"}
                 ]
+                st.session_state.chat_summary = {"text": "", "upto": 0}
+                st.session_state.appended_segment = None
             else:
                 st.error(report)  # 如果失败，report变量会包含错误信息
                 st.session_state.file_processed = False
 
 # --- 2. 分析结果展示与对话 ---
+analysis_report = None
+if st.session_state.file_processed:
+    analysis_report = session_store.get_report(st.session_state.result_handle)
+    if analysis_report is None:
+        # 磁盘缓存超出预算时最久未访问的结果会被清理
+        st.session_state.file_processed = False
+        st.warning("分析结果已因缓存空间不足被清理，请重新上传文件进行分析。")
+
 if st.session_state.file_processed:
     st.markdown("---")
     st.subheader("第二步：查看分析报告并开始对话")
 
     # 展示分析报告和结构化数据
     with st.expander("点击查看AI生成的分析报告", expanded=True):
-        st.markdown(st.session_state.analysis_report)
+        st.markdown(analysis_report)
 
     with st.expander("点击查看结构化数据详情"):
-        st.dataframe(st.session_state.structured_data, use_container_width=True)
+        show_structured_data_page(st.session_state.result_handle)
+
+        # 把结构化结果作为新的增量数据段追加到看板数据集
+        if st.session_state.appended_segment:
+            st.caption(f"已追加到看板数据集（数据段 {st.session_state.appended_segment}）。")
+        elif st.button("📥 追加到看板数据集"):
+            append_to_dashboard(session_store.load_frame(st.session_state.result_handle))
 
     # 对话界面
     st.markdown("#### 与AI对话")
@@ -155,21 +248,39 @@ if st.session_state.file_processed:
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # 准备发送给 vLLM 的消息列表，包含系统级上下文
-        messages_for_vllm = [
-                                {
-                                    "role": "system",
-                                    "content": f"你是一个专业的景区舆情分析师。你已经分析了一份评论数据，并生成了以下的分析报告：\n\n---报告开始---\n{st.session_state.analysis_report}\n---报告结束---\n\n现在，请根据这份报告和你的专业知识，回答用户的问题。"
-                                }
-                            ] + st.session_state.chat_messages
+        # 从结构化数据中检索与问题相关的评论和统计
+        with perf.span("retrieval"):
+            retrieved_context, retrieval_stats = retrieval.build_retrieval_context(
+                session_store.get_retrieval_index(st.session_state.result_handle),
+                session_store.load_frame(st.session_state.result_handle),
+                prompt
+            )
+
+        # 准备发送给 vLLM 的消息列表：报告按问题节选，较早的对话折叠为摘要，控制提示词长度
+        messages_for_vllm, st.session_state.chat_summary, prompt_stats = chat_context.build_chat_messages(
+            analysis_report,
+            st.session_state.chat_messages,
+            st.session_state.chat_summary,
+            question=prompt,
+            retrieved_context=retrieved_context
+        )
 
         # 获取 AI 的响应
         with st.chat_message("assistant"):
             with st.spinner("AI 正在思考..."):
-                response = get_chat_response(messages_for_vllm)
+                response, response_source = get_chat_response(messages_for_vllm)
                 st.markdown(response)
+            source_note = {"cache": " · 命中缓存", "coalesced": " · 与相同请求合并"}.get(response_source, "")
+            st.caption(
+                f"本轮提示词约 {prompt_stats['total']} tokens · "
+                f"检索到 {retrieval_stats['hits']} 条相关评论，耗时 {retrieval_stats['total_ms']:.1f} ms"
+                f"{source_note}"
+            )
 
         # 将 AI 的响应也添加到历史记录
         st.session_state.chat_messages.append({"role": "assistant", "content": response})
 else:
-    st.info("请先上传文件并完成分析，以便启用对话功能。")
\ No newline at end of file
+    st.info("请先上传文件并完成分析，以便启用对话功能。")
+
+# 结束本次重跑的计时；带管理令牌访问时在侧边栏显示性能面板
+perf_panel.show_perf_panel()
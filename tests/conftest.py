@@ -0,0 +1,11 @@
+# /tests/conftest.py
+"""
+测试在项目根目录下运行（python -m pytest），页面和工具脚本同样以根目录为工作目录。
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
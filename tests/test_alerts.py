@@ -0,0 +1,93 @@
+"""
+告警规则评估与无界面告警任务（tools/alert_job.py）的测试：历史数据预热、增量评估，
+以及任务停止期间追加的数据段在下次 --once 运行时照常告警。
+"""
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from tools import alert_job
+from utils import alerts, review_store
+
+RULE = alerts.AlertRule(name="黄山差评", filters={"景区名称": "黄山"}, threshold=2)
+
+
+def reviews(day, n, scenic="黄山"):
+    return pd.DataFrame({
+        "点评时间": pd.to_datetime([day] * n), "平台": ["携程"] * n, "景区名称": [scenic] * n,
+        "核心问题类型": ["排队"] * n, "情感强度": ["负面"] * n,
+    })
+
+
+def test_evaluate_fires_once_per_day():
+    evaluator = alerts.AlertEvaluator([RULE])
+    assert evaluator.evaluate(reviews("2024-05-01", 2)) == []
+    fired = evaluator.evaluate(reviews("2024-05-01", 1))
+    assert [(a["day"], a["count"]) for a in fired] == [("2024-05-01", 3)]
+    assert evaluator.evaluate(reviews("2024-05-01", 5)) == []
+
+
+def test_evaluate_ignores_rows_outside_filters():
+    evaluator = alerts.AlertEvaluator([RULE])
+    assert evaluator.evaluate(reviews("2024-05-01", 10, scenic="泰山")) == []
+
+
+def test_prime_suppresses_historical_days_only():
+    evaluator = alerts.AlertEvaluator([RULE])
+    evaluator.prime(pd.concat([reviews("2024-05-01", 5), reviews("2024-05-02", 2)]))
+    assert evaluator.evaluate(reviews("2024-05-01", 1)) == []
+    # 历史计数继续累加：第二天已有 2 条，再来 1 条即超过阈值
+    assert [a["day"] for a in evaluator.evaluate(reviews("2024-05-02", 1))] == ["2024-05-02"]
+
+
+@pytest.fixture
+def job_env(tmp_path, monkeypatch):
+    base_path = tmp_path / "base.csv"
+    reviews("2024-05-01", 5).to_csv(base_path, index=False)
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps([{"name": RULE.name, "filters": RULE.filters, "threshold": RULE.threshold}],
+                                     ensure_ascii=False), encoding="utf-8")
+    store_dir = tmp_path / "store"
+    sink_path = tmp_path / "alerts.jsonl"
+    monkeypatch.setattr(alerts, "ALERT_DIR", str(tmp_path / "alerts"))
+
+    def run_once():
+        monkeypatch.setattr("sys.argv", ["alert_job", "--once", "--base", str(base_path), "--store-dir",
+                                         str(store_dir), "--rules", str(rules_path), "--sink", str(sink_path),
+                                         "--webhook", ""])
+        alert_job.main()
+        if not sink_path.exists():
+            return []
+        return [json.loads(line) for line in sink_path.read_text(encoding="utf-8").splitlines()]
+
+    def append(df):
+        valid, _ = review_store.validate_for_dashboard(df)
+        review_store.append_segment(valid, store_dir=str(store_dir))
+
+    return run_once, append, store_dir
+
+
+def test_once_treats_existing_data_as_history(job_env):
+    run_once, append, store_dir = job_env
+    append(reviews("2024-05-02", 3))
+    assert run_once() == []
+    assert alert_job.load_state(str(store_dir)) == 1
+
+
+def test_once_evaluates_segments_appended_while_stopped(job_env):
+    run_once, append, store_dir = job_env
+    assert run_once() == []
+    assert alert_job.load_state(str(store_dir)) == 0
+
+    append(reviews("2024-05-03", 3))
+    append(reviews("2024-05-01", 1))
+    fired = run_once()
+    # 5 月 1 日在基础数据中已超过阈值，不再告警
+    assert [(a["day"], a["count"]) for a in fired] == [("2024-05-03", 3)]
+    assert alert_job.load_state(str(store_dir)) == 2
+
+    assert len(run_once()) == 1
+    assert os.path.exists(os.path.join(str(store_dir), alert_job.STATE_NAME))
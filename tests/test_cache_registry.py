@@ -0,0 +1,110 @@
+"""
+全局缓存预算：GreedyDual-Size 淘汰、单个缓存的条目上限、常驻对象的登记和大小估算。
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import cache_registry
+
+MB = 1024 * 1024
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(cache_registry, "CACHE_BUDGET_BYTES", 10 * MB)
+    monkeypatch.setattr(cache_registry, "_pinned", {})
+    monkeypatch.setitem(cache_registry._state, "warned", False)
+    cache_registry.clear()
+    yield
+    cache_registry.clear()
+
+
+def test_evicts_cheap_large_entries_before_expensive_small_ones():
+    cache = cache_registry.get_cache("test_gds")
+    cache.put("cheap_large", None, cost_ms=1, nbytes=6 * MB)
+    cache.put("expensive_small", None, cost_ms=500, nbytes=1 * MB)
+    cache.put("new", None, cost_ms=1, nbytes=4 * MB)
+    assert "cheap_large" not in cache
+    assert "expensive_small" in cache and "new" in cache
+    assert cache.stats()["evictions"] == 1
+    assert cache_registry.get_stats()["cached_bytes"] == 5 * MB
+
+
+def test_equal_cost_degrades_to_lru():
+    cache = cache_registry.get_cache("test_lru")
+    for key in "abc":
+        cache.put(key, None, cost_ms=1, nbytes=3 * MB)
+    cache.get("a")
+    cache.put("d", None, cost_ms=1, nbytes=3 * MB)
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+
+
+def test_eviction_spans_caches():
+    first, second = cache_registry.get_cache("test_first"), cache_registry.get_cache("test_second")
+    first.put("old", None, cost_ms=1, nbytes=8 * MB)
+    second.put("new", None, cost_ms=1, nbytes=8 * MB)
+    assert "old" not in first and "new" in second
+
+
+def test_max_entries_evicts_least_recently_used():
+    cache = cache_registry.get_cache("test_max_entries", max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache and cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_pinned_objects_do_not_use_the_cache_budget():
+    cache_registry.pin("dataset:test", 50 * MB)
+    cache = cache_registry.get_cache("test_pinned")
+    assert cache.put("entry", None, nbytes=9 * MB)
+    stats = cache_registry.get_stats()
+    assert stats["pinned"] == {"dataset:test": 50 * MB}
+    assert stats["total_bytes"] == 59 * MB
+    rows = {row["cache"]: row for row in cache_registry.cache_rows()}
+    assert rows["dataset:test"]["pinned"] is True
+    cache_registry.unpin("dataset:test")
+    assert cache_registry.get_stats()["pinned"] == {}
+
+
+def test_oversized_entry_is_rejected():
+    cache = cache_registry.get_cache("test_reject")
+    assert not cache.put("huge", None, nbytes=11 * MB)
+    assert "huge" not in cache and cache.stats()["rejected"] == 1
+
+
+def test_no_budget_warns_once(monkeypatch, caplog):
+    monkeypatch.setattr(cache_registry, "CACHE_BUDGET_BYTES", 0)
+    cache = cache_registry.get_cache("test_no_budget")
+    with caplog.at_level(logging.WARNING, logger=cache_registry.__name__):
+        assert not cache.put("a", "x")
+        assert not cache.put("b", "y")
+    assert len([r for r in caplog.records if r.levelno == logging.WARNING]) == 1
+
+
+def test_get_or_compute_computes_once():
+    cache = cache_registry.get_cache("test_compute")
+    calls = []
+    compute = lambda: calls.append(1) or np.zeros(10)
+    cache.get_or_compute("k", compute)
+    cache.get_or_compute("k", compute)
+    assert len(calls) == 1 and cache.stats()["hits"] == 1
+
+
+@pytest.mark.parametrize("dtype", [object, "string[python]"])
+def test_string_columns_are_sampled(dtype):
+    series = pd.Series(["评论内容" * 50] * 5000, dtype=dtype)
+    estimate = cache_registry.estimate_bytes(series)
+    assert estimate > 10 * series.array.nbytes
+    assert estimate == pytest.approx(series.memory_usage(deep=True), rel=0.2)
+
+
+def test_numeric_columns_use_nbytes():
+    df = pd.DataFrame({"a": np.arange(1000, dtype=np.int64), "b": np.ones(1000)})
+    assert cache_registry.estimate_bytes(df) == df.index.nbytes + 16000
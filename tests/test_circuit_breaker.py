@@ -0,0 +1,104 @@
+# /tests/test_circuit_breaker.py
+
+import pytest
+
+from utils import circuit_breaker
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def state(breaker):
+    return breaker.snapshot()["state"]
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3)
+    for _ in range(2):
+        breaker.record_failure("boom")
+    assert state(breaker) == CLOSED
+    breaker.record_failure("boom")
+    assert state(breaker) == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure("boom")
+    breaker.record_success()
+    breaker.record_failure("boom")
+    assert state(breaker) == CLOSED
+
+
+def test_alternating_probe_results_stay_closed():
+    breaker = CircuitBreaker("test", failure_threshold=3)
+    for _ in range(10):
+        breaker._on_probe(False, 1.0, "timeout")
+        breaker._on_probe(True, 1.0)
+    assert state(breaker) == CLOSED
+    assert breaker.snapshot()["probe_failures"] == 0
+
+
+def test_request_failures_open_despite_healthy_probes():
+    # 服务能响应 /health，但分析请求一直超时
+    breaker = CircuitBreaker("test", failure_threshold=3)
+    breaker.record_failure("timeout")
+    breaker.record_failure("timeout")
+    breaker._on_probe(True, 1.0)
+    assert state(breaker) == CLOSED and breaker.snapshot()["failures"] == 2
+    breaker.record_failure("timeout")
+    assert state(breaker) == OPEN
+
+
+def test_probe_and_request_failures_are_counted_separately():
+    breaker = CircuitBreaker("test", failure_threshold=3)
+    breaker.record_failure("timeout")
+    breaker._on_probe(False, 1.0, "timeout")
+    breaker.record_failure("timeout")
+    breaker._on_probe(False, 1.0, "timeout")
+    assert state(breaker) == CLOSED
+    breaker.record_success()
+    assert breaker.snapshot()["failures"] == breaker.snapshot()["probe_failures"] == 0
+
+
+def test_consecutive_probe_failures_open():
+    breaker = CircuitBreaker("test", failure_threshold=3)
+    for _ in range(3):
+        breaker._on_probe(False, 1.0, "timeout")
+    assert state(breaker) == OPEN
+
+
+def test_half_open_allows_single_trial(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=5.0)
+    breaker.record_failure("boom")
+    assert not breaker.allow_request()
+
+    clock[0] += 5.0
+    assert state(breaker) == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_failure("still down")
+    assert state(breaker) == OPEN
+    # 第二次打开的时长按指数退避翻倍
+    clock[0] += 5.0
+    assert state(breaker) == OPEN
+    clock[0] += 5.0
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert state(breaker) == CLOSED
+
+
+def test_successful_probe_moves_open_to_half_open():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60.0)
+    breaker.record_failure("boom")
+    breaker._on_probe(True, 1.0)
+    assert state(breaker) == HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_unhealthy_result_counts_as_failure():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    breaker.call(lambda: {"status": "down"}, is_failure=lambda r: r["status"] != "ok")
+    assert state(breaker) == OPEN
@@ -0,0 +1,48 @@
+"""
+导出文件经 readiness HTTP 服务（utils/warmup.py）流式下载：按导出文件名取文件，拒绝导出目录之外的路径。
+"""
+
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+from utils import review_export, warmup
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(review_export, "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(warmup, "_server_port", None)
+    httpd = warmup.serve_readiness("127.0.0.1", 0)
+    yield f"http://127.0.0.1:{warmup.download_port()}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_export_is_streamed_with_download_name(server, tmp_path):
+    df = pd.DataFrame({"内容": ["很好", "排队太久"], "平台": ["携程", "美团"]})
+    result = review_export.write_export(df, df.index, "csv", export_dir=str(tmp_path))
+
+    status, headers, body = get(server + review_export.download_path(result, "黄山评论.csv"))
+    assert status == 200
+    assert headers["Content-Type"] == "text/csv"
+    assert headers["Content-Disposition"] == "attachment; filename*=UTF-8''%E9%BB%84%E5%B1%B1%E8%AF%84%E8%AE%BA.csv"
+    with open(result["path"], "rb") as f:
+        assert body == f.read()
+
+
+@pytest.mark.parametrize("name", ["..%2F..%2Fetc%2Fpasswd", "0" * 32 + ".txt", "0" * 32 + ".csv"])
+def test_unknown_or_foreign_files_are_not_served(server, tmp_path, name):
+    (tmp_path / ("0" * 32 + ".txt")).write_text("secret", encoding="utf-8")
+    status, _, _ = get(f"{server}{review_export.DOWNLOAD_ROUTE}{name}")
+    assert status == 404
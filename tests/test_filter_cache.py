@@ -0,0 +1,90 @@
+"""
+筛选键的规范化（normalize_selection / canonical_key / key_to_params）、数据集版本令牌和筛选结果缓存。
+"""
+
+import pandas as pd
+import pytest
+
+from utils import filter_cache
+
+PLATFORMS = ["携程", "美团", "抖音"]
+
+
+@pytest.fixture
+def reviews():
+    return pd.DataFrame({
+        "点评时间": pd.to_datetime(["2024-05-01", "2024-05-02", "2024-06-01", "2024-06-03"]),
+        "平台": ["携程", "美团", "携程", "抖音"],
+        "景区名称": ["黄山", "黄山", "黄山", "泰山"],
+        "核心问题类型": ["排队拥挤", "价格收费", "排队拥挤", "排队拥挤"],
+        "情感强度": ["一般", "严重", "轻微", "一般"],
+        "月份": [5, 5, 6, 6],
+    })
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    filter_cache.clear()
+    yield
+    filter_cache.clear()
+
+
+def test_normalize_selection_is_order_insensitive():
+    assert filter_cache.normalize_selection(["美团", "携程"]) == filter_cache.normalize_selection(["携程", "美团"])
+    assert filter_cache.normalize_selection([1, 2]) == frozenset({"1", "2"})
+
+
+@pytest.mark.parametrize("values", [None, [], ["携程", "美团", "抖音"], ["抖音", "携程", "美团", "美团"]])
+def test_normalize_selection_unrestricted(values):
+    assert filter_cache.normalize_selection(values, options=PLATFORMS) is None
+
+
+def test_canonical_key_merges_equivalent_selections():
+    options = {"platforms": PLATFORMS}
+    a = filter_cache.canonical_key("黄山", ["美团", "携程"], None, [], options=options)
+    b = filter_cache.canonical_key("黄山", ["携程", "美团"], [], None, options=options)
+    assert a == b and hash(a) == hash(b)
+    everything = filter_cache.canonical_key("黄山", PLATFORMS, options=options)
+    assert everything == filter_cache.canonical_key("黄山")
+    assert filter_cache.canonical_key("黄山", dedup=1).dedup is True
+
+
+def test_key_to_params_is_sorted_and_omits_unrestricted_fields():
+    key = filter_cache.canonical_key("黄山", ["美团", "携程"], None, ["严重"], dedup=True)
+    assert filter_cache.key_to_params(key) == {"platform": sorted(["美团", "携程"]), "sentiment": ["严重"],
+                                               "dedup": ["1"]}
+    assert filter_cache.key_to_params(filter_cache.canonical_key("黄山")) == {}
+
+
+def test_data_token_changes_when_rows_are_appended(reviews):
+    assert filter_cache.data_token(reviews.iloc[:0]) == (0, -1)
+    before = filter_cache.data_token(reviews.iloc[:3])
+    assert filter_cache.data_token(reviews) != before
+    # 去重视图行数更少，令牌也不同
+    assert filter_cache.data_token(reviews.iloc[[0, 2, 3]]) != filter_cache.data_token(reviews)
+
+
+def counters():
+    stats = filter_cache.get_stats()
+    return stats["hits"], stats["misses"]
+
+
+def test_filter_reviews_hits_cache_for_equivalent_key(reviews):
+    hits, misses = counters()
+    key = filter_cache.canonical_key("黄山", ["美团", "携程"])
+    first, aggregates = filter_cache.filter_reviews(reviews, key)
+    assert list(first.index) == [0, 1, 2]
+    assert aggregates["rows"] == 3
+    assert aggregates["issue_counts"]["排队拥挤"] == 2
+
+    again, cached = filter_cache.filter_reviews(reviews, filter_cache.canonical_key("黄山", ["携程", "美团"]))
+    assert again.equals(first) and cached is aggregates
+    assert counters() == (hits + 1, misses + 1)
+
+
+def test_filter_reviews_misses_after_append(reviews):
+    hits, misses = counters()
+    key = filter_cache.canonical_key("黄山", ["携程"])
+    assert len(filter_cache.filter_reviews(reviews.iloc[:2], key)[0]) == 1
+    assert len(filter_cache.filter_reviews(reviews, key)[0]) == 2
+    assert counters() == (hits, misses + 2)
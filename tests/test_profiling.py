@@ -0,0 +1,54 @@
+"""
+重跑剖析的生命周期：同一时刻只剖析一次，开始它的线程退出后不再阻塞新的剖析。
+"""
+
+import threading
+import tracemalloc
+
+import pytest
+
+from utils import profiling
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    yield
+    if profiling._active is not None and profiling._active.thread is threading.current_thread():
+        profiling._active.stop()
+
+
+def in_thread(func):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", func()))
+    thread.start()
+    thread.join()
+    return result["value"]
+
+
+def test_stop_saves_report_and_releases_slot():
+    profile = profiling.start("page")
+    assert profile is not None
+    assert profiling.start("other") is None
+    report_dir = profile.stop({"filter": "x"})
+    assert profiling.load_meta(report_dir)["page"] == "page"
+    assert not tracemalloc.is_tracing()
+    assert profiling.start("other") is not None
+
+
+def test_live_owner_blocks_other_threads():
+    profile = profiling.start("page")
+    assert in_thread(lambda: profiling.start("other")) is None
+    assert profiling._active is profile
+
+
+def test_abandoned_profile_is_discarded_without_waiting():
+    # 剖析所在的线程没有调用 stop() 就退出了（如 st.stop() 或异常结束的重跑）
+    abandoned = in_thread(lambda: profiling.start("page"))
+    assert abandoned is not None and not abandoned.thread.is_alive()
+
+    profiling.discard_abandoned()
+    assert profiling._active is None
+    assert not tracemalloc.is_tracing()
+    assert in_thread(lambda: profiling.start("other")) is not None
+    assert profiling.start("again") is not None
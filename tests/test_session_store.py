@@ -0,0 +1,57 @@
+"""
+会话结果的落盘存储，以及按结果句柄缓存在进程内的检索索引。
+"""
+
+import pandas as pd
+import pytest
+
+from utils import cache_registry, session_store
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_store, "SESSION_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(session_store, "_entries", type(session_store._entries)())
+    monkeypatch.setattr(session_store, "_tables", {})
+    monkeypatch.setattr(session_store, "_loaded", False)
+    session_store._indexes.clear()
+    yield
+    session_store._indexes.clear()
+
+
+def frame():
+    return pd.DataFrame({"景区名称": ["黄山", "泰山"], "内容": ["索道排队两个多小时", "门票太贵不值这个价"]})
+
+
+def test_put_and_read_back():
+    handle = session_store.put(frame(), "报告")
+    assert session_store.get_report(handle) == "报告"
+    assert session_store.num_rows(handle) == 2
+    assert list(session_store.load_frame(handle)["景区名称"]) == ["黄山", "泰山"]
+
+
+def test_retrieval_index_is_cached_per_handle_and_rebuilt_on_miss():
+    handle = session_store.put(frame(), "报告")
+    index = session_store.get_retrieval_index(handle)
+    assert len(index) == 2
+    assert index.search("排队")[0][0] == 0
+    assert session_store.get_retrieval_index(handle) is index
+
+    session_store._indexes.clear()  # 被全局内存预算淘汰
+    rebuilt = session_store.get_retrieval_index(handle)
+    assert rebuilt is not index and len(rebuilt) == 2
+
+
+def test_discard_drops_the_index():
+    handle = session_store.put(frame(), "报告")
+    session_store.get_retrieval_index(handle)
+    session_store.discard(handle)
+    assert handle not in session_store._indexes
+    assert session_store.get_retrieval_index(handle) is None
+
+
+def test_index_is_registered_with_its_size():
+    handle = session_store.put(frame(), "报告")
+    index = session_store.get_retrieval_index(handle)
+    rows = {row["cache"]: row for row in cache_registry.cache_rows()}
+    assert rows["retrieval_index"]["bytes"] == index.memory_bytes() > 0
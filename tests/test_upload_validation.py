@@ -0,0 +1,60 @@
+"""
+上传文件本地校验：格式错误的 CSV 行记为不合格行并带文件中的真实行号，后续行号不发生偏移。
+"""
+
+import io
+
+import pandas as pd
+import pytest
+
+from utils import upload_validation
+
+
+@pytest.fixture(autouse=True)
+def csv_encoding(monkeypatch):
+    monkeypatch.setattr(upload_validation, "UPLOAD_ENCODING", "csv")
+
+
+def validate(text):
+    return upload_validation.validate_upload("reviews.csv", text.encode("utf-8"))
+
+
+def test_malformed_lines_are_rejected_with_line_numbers():
+    text = ("内容,平台\n"
+            "景色很好,携程\n"
+            "多了一列,携程,多余\n"
+            "\n"
+            "\"跨两行的\n评论\",美团\n"
+            ",携程\n"
+            "排队太久,美团\n")
+    result = validate(text)
+    assert result.total_rows == 5
+    assert result.accepted_rows == 3
+    assert result.rejected_count == 2
+    assert result.rejected.index.tolist() == [3, 7]
+    assert result.rejected.loc[3, "拒绝原因"].startswith("列数与表头不一致")
+    assert result.rejected.loc[7, "拒绝原因"] == "内容为空"
+    assert "__parse_error__" not in result.rejected.columns
+
+    uploaded = pd.read_csv(io.BytesIO(result.payload))
+    assert uploaded["内容"].tolist() == ["景色很好", "跨两行的\n评论", "排队太久"]
+
+
+def test_line_numbers_continue_across_chunks():
+    lines = ["内容"] + [f"评论{i}" for i in range(5)] + ["a,b"] + ["评论5"]
+    gen = upload_validation.iter_csv_chunks(("\n".join(lines) + "\n").encode("utf-8"), chunk_rows=2)
+    index = [i for chunk in gen for i in chunk.index]
+    assert index == list(range(2, 9))
+
+
+def test_short_lines_are_padded():
+    result = validate("内容,平台,景区名称\n很好,携程\n")
+    assert result.accepted_rows == 1 and result.rejected_count == 0
+
+
+def test_parquet_is_opt_in(monkeypatch):
+    assert validate("内容\n很好\n").mime_type == "text/csv"
+    monkeypatch.setattr(upload_validation, "UPLOAD_ENCODING", "parquet")
+    result = validate("内容\n很好\n")
+    assert result.file_name == "reviews.parquet"
+    assert pd.read_parquet(io.BytesIO(result.payload))["内容"].tolist() == ["很好"]
@@ -0,0 +1,133 @@
+# /tools/alert_job.py
+"""
+无界面的告警任务：不依赖 Streamlit，复用 utils 中的数据集、异常检测和告警规则代码。
+定期检查数据段清单，只对新追加的数据段评估告警规则，告警写入本地文件并可推送到 Webhook，
+每次评估的耗时、吞吐和检测延迟记录到 metrics.jsonl。
+
+已评估到的数据段数记录在清单旁的 alert-state.json 中。启动时只用这些数据段预热计数器，
+任务停止期间追加的数据段在启动后照常评估，不会漏报；第一次运行时把已有的数据全部视为历史。
+
+用法（在项目根目录下）：
+    python -m tools.alert_job --rules tools/alert_rules.example.json --interval 10
+    python -m tools.alert_job --once        # 只检查一次，适合放进 cron
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from utils import alerts, review_store
+from utils.dataset import ReviewDataset
+
+logger = logging.getLogger("alert_job")
+
+STATE_NAME = "alert-state.json"
+
+
+def load_state(store_dir):
+    """ 已评估到的数据段数；还没有运行过时返回 None """
+    try:
+        with open(os.path.join(store_dir, STATE_NAME), 'r', encoding='utf-8') as f:
+            return int(json.load(f)["segments_evaluated"])
+    except FileNotFoundError:
+        return None
+
+
+def save_state(store_dir, segments_evaluated):
+    path = os.path.join(store_dir, STATE_NAME)
+    os.makedirs(store_dir, exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({"segments_evaluated": segments_evaluated}, f)
+    os.replace(path + '.tmp', path)
+
+
+def open_dataset(base_path, store_dir, evaluator):
+    """
+    加载数据集并预热告警计数器：只应用上次已评估过的数据段，之后的数据段留给 run_once 评估。
+    第一次运行时应用全部数据段并记录进度。
+    """
+    evaluated = load_state(store_dir)
+    dataset = ReviewDataset(base_path, store_dir, max_segments=evaluated)
+    evaluator.prime(dataset.df)
+    if evaluated is None:
+        save_state(store_dir, dataset.segments_applied)
+    return dataset
+
+
+def segment_lag_seconds(dataset):
+    """ 最新数据段写入到现在经过的秒数，即从数据追加到完成告警评估的延迟 """
+    manifest = review_store.read_manifest(dataset.store_dir)
+    if not manifest["segments"]:
+        return None
+    created_at = datetime.strptime(manifest["segments"][-1]["created_at"], "%Y-%m-%dT%H:%M:%S")
+    return round((datetime.now() - created_at).total_seconds(), 3)
+
+
+def run_once(dataset, evaluator, sinks):
+    """
+    检查并处理一次新数据。
+
+    Returns:
+        dict: 本次评估的指标；没有新数据时返回 None。
+    """
+    rows_before, events_before = len(dataset.df), len(dataset.anomaly_detector.events)
+    started = time.perf_counter()
+    if not dataset.refresh():
+        return None
+    applied = time.perf_counter()
+
+    delta = dataset.df.iloc[rows_before:]
+    events = dataset.anomaly_detector.events[events_before:]
+    fired = evaluator.evaluate(delta, events)
+    for sink in sinks:
+        sink.send(fired)
+    # 告警发出后再记录进度：中途退出时重启会重新评估这批数据，宁可重复告警也不漏报
+    save_state(dataset.store_dir, dataset.segments_applied)
+    finished = time.perf_counter()
+
+    eval_seconds = finished - applied
+    metrics = {
+        "rows": len(delta),
+        "alerts": len(fired),
+        "apply_ms": round((applied - started) * 1000, 2),
+        "eval_ms": round(eval_seconds * 1000, 2),
+        "rows_per_second": round(len(delta) / eval_seconds, 1) if eval_seconds > 0 else None,
+        "lag_seconds": segment_lag_seconds(dataset),
+    }
+    alerts.record_metrics(metrics)
+    for alert in fired:
+        logger.warning(alert["message"])
+    logger.info("evaluated %d new rows: %d alerts, eval %.1f ms", len(delta), len(fired), metrics["eval_ms"])
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无界面的舆情告警任务")
+    parser.add_argument("--rules", default=alerts.ALERT_RULES_PATH, help="告警规则 JSON 文件")
+    parser.add_argument("--base", default=review_store.BASE_DATA_PATH, help="基础数据 CSV")
+    parser.add_argument("--store-dir", default=review_store.STORE_DIR, help="增量数据段目录")
+    parser.add_argument("--interval", type=float, default=10.0, help="检查新数据段的间隔（秒）")
+    parser.add_argument("--sink", default=None, help="告警输出文件，默认 data/store/alerts/alerts.jsonl")
+    parser.add_argument("--webhook", default=alerts.ALERT_WEBHOOK_URL, help="告警推送的 Webhook 地址")
+    parser.add_argument("--once", action="store_true", help="只检查一次后退出")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    rules = alerts.load_rules(args.rules)
+    evaluator = alerts.AlertEvaluator(rules)
+    dataset = open_dataset(args.base, args.store_dir, evaluator)
+    sinks = [alerts.FileSink(args.sink), alerts.WebhookSink(args.webhook)]
+    logger.info("watching %s with %d rules (rows=%d)", args.store_dir, len(rules), len(dataset.df))
+
+    while True:
+        run_once(dataset, evaluator, sinks)
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
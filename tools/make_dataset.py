@@ -0,0 +1,286 @@
+# /tools/make_dataset.py
+"""
+生成与 data/sentiment_data.csv 同结构的合成评论数据集，用于在没有真实数据时做大规模的性能测试。
+
+数据特征尽量接近线上：景区和平台按幂律分布（少数景区 / 平台占大多数评论），各景区的问题类型分布不同，
+时间跨多个年份并带有节假日高峰和逐年增长，日期混用多种写法，评论文本由 tools/review_vocab.py 的词表拼成，
+并按一定比例混入跨平台转发的近似重复评论。相同的随机种子和分块大小生成完全相同的文件。
+评论文本含游览日期、时刻、景点和随机数字，不同评论的文本随行数增加基本互不相同，
+近似重复检测标记出的比例接近 --dup-rate（5 万行时约 3.0%，可用 --check-dup 核对）。
+
+用法（在项目根目录下）：
+    python -m tools.make_dataset --rows 1000000 --out data/synthetic/reviews_1m.csv
+    python -m tools.make_dataset --rows 10000000 --out data/synthetic/reviews_10m.parquet --seed 7
+    python -m tools.make_dataset --rows 100000 --out data/synthetic/reviews_gbk.csv --encoding gbk --date-formats iso
+    python -m tools.make_dataset --rows 50000 --out data/synthetic/reviews_50k.csv --check-dup 50000
+
+生成的数据可以直接作为基础数据加载：ReviewDataset("data/synthetic/reviews_1m.csv")。
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from tools.review_vocab import (ARRIVALS, CLOSERS, COMPANIONS, ISSUE_TYPES, OPENERS, PLATFORMS, SCENIC_PLACES,
+                                SCENIC_SPOTS, SENTIMENT_LEVELS, TIMES_OF_DAY, VISIT_VERBS, WEATHER)
+
+COLUMNS = ['点评时间', '平台', '景区名称', '核心问题类型', '问题细项', '情感强度', '内容']
+CHUNK_ROWS = 500_000
+SENTIMENT_WEIGHTS = [0.5, 0.35, 0.15]
+# 各月份的相对评论量：五一、暑假和国庆是高峰
+MONTH_WEIGHTS = [0.7, 0.9, 0.6, 0.9, 1.6, 0.9, 1.4, 1.6, 0.8, 2.0, 0.7, 0.5]
+WEEKEND_FACTOR = 1.4
+YEARLY_GROWTH = 1.3
+# 日期写法：名称 -> 在 mixed 模式下的占比
+DATE_FORMATS = {
+    'iso': 0.6,            # 2024-10-01
+    'slash': 0.15,         # 2024/10/01
+    'iso_time': 0.15,      # 2024-10-01 14:03:27
+    'slash_minute': 0.05,  # 2024/10/01 14:03
+    'dot': 0.05,           # 2024.10.01
+}
+SEVERE_CLOSERS = ['！投诉无门！', '，再也不来了！', '，太离谱了！', '，必须差评！']
+# 游览时刻（整点）及其对应的 TIMES_OF_DAY：6-8 点为早上，9-10 点为上午……
+VISIT_HOURS = (6, 19)
+TIME_OF_DAY_STARTS = [6, 9, 11, 13, 17]
+
+
+def zipf_weights(n, skew):
+    """ 第 k 个取值的权重正比于 1 / k^skew，skew 为 0 时为均匀分布 """
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+
+def day_weights(days):
+    """ 每一天的相对评论量：月份季节性 × 周末 × 逐年增长 """
+    months = days.astype('datetime64[M]').astype(int) % 12
+    years = days.astype('datetime64[Y]').astype(int)
+    weekday = (days.astype(int) + 3) % 7  # 1970-01-01 是周四
+    weights = np.asarray(MONTH_WEIGHTS)[months] * np.where(weekday >= 5, WEEKEND_FACTOR, 1.0) \
+        * YEARLY_GROWTH ** (years - years.min())
+    return weights / weights.sum()
+
+
+def format_dates(timestamps, rng, date_formats):
+    """ 把时间戳按给定写法的占比格式化为字符串 """
+    day = pd.Series(np.datetime_as_string(timestamps, unit='D'))
+    if date_formats == 'iso':
+        return day
+    names = list(DATE_FORMATS)
+    choice = rng.choice(len(names), size=len(timestamps), p=np.asarray(list(DATE_FORMATS.values())))
+    seconds = pd.Series(np.datetime_as_string(timestamps, unit='s')).str.replace('T', ' ', regex=False)
+    variants = {
+        'iso': day,
+        'slash': day.str.replace('-', '/', regex=False),
+        'iso_time': seconds,
+        'slash_minute': seconds.str.slice(0, 16).str.replace('-', '/', regex=False),
+        'dot': day.str.replace('-', '.', regex=False),
+    }
+    result = day.copy()
+    for i, name in enumerate(names):
+        mask = choice == i
+        result[mask] = variants[name][mask]
+    return result
+
+
+class ReviewGenerator:
+    """
+    按块生成合成评论。第 i 块使用种子 (seed, i)，与生成顺序和其他块无关。
+    """
+
+    def __init__(self, seed=42, start_year=2021, end_year=2024, scenic_skew=1.1, platform_skew=0.9,
+                 dup_rate=0.03, date_formats='mixed'):
+        self.seed = seed
+        self.dup_rate = dup_rate
+        self.date_formats = date_formats
+        setup = np.random.default_rng([seed, 2 ** 31])
+        # 幂律分布的顺序也随种子打乱，不同种子得到不同的"热门景区"
+        self.scenic_spots = np.asarray(SCENIC_SPOTS, dtype=object)[setup.permutation(len(SCENIC_SPOTS))]
+        self.scenic_p = zipf_weights(len(SCENIC_SPOTS), scenic_skew)
+        self.platforms = np.asarray(PLATFORMS, dtype=object)[setup.permutation(len(PLATFORMS))]
+        self.platform_p = zipf_weights(len(PLATFORMS), platform_skew)
+        # 每个景区有各自偏重的问题类型
+        self.issue_types = np.asarray(list(ISSUE_TYPES), dtype=object)
+        self.issue_p = setup.dirichlet(np.full(len(ISSUE_TYPES), 2.0), size=len(SCENIC_SPOTS))
+        self.days = np.arange(np.datetime64(f'{start_year}-01-01'), np.datetime64(f'{end_year + 1}-01-01'))
+        self.day_p = day_weights(self.days)
+
+        # 各问题类型的细项和文本片段展开为一维数组，按 (偏移, 个数) 取值
+        self.details, self.detail_offsets, self.detail_counts = self._flatten('details')
+        self.phrases, self.phrase_offsets, self.phrase_counts = self._flatten('phrases')
+        numbers, self.number_offsets, self.number_counts = self._flatten('numbers')
+        self.number_prefixes, self.number_suffixes, lows, highs = (np.asarray(v, dtype=object) for v in zip(*numbers))
+        self.number_lows, self.number_highs = lows.astype(int), highs.astype(int)
+        places = [SCENIC_PLACES[s] for s in self.scenic_spots]
+        self.places = np.asarray([p for group in places for p in group], dtype=object)
+        self.place_offsets = np.cumsum([0] + [len(g) for g in places[:-1]])
+        self.place_counts = np.asarray([len(g) for g in places])
+        self.openers = np.asarray(OPENERS, dtype=object)
+        self.closers = np.asarray(CLOSERS, dtype=object)
+        self.severe_closers = np.asarray(SEVERE_CLOSERS, dtype=object)
+
+    @staticmethod
+    def _flatten(key):
+        values, offsets, counts = [], [], []
+        for spec in ISSUE_TYPES.values():
+            offsets.append(len(values))
+            counts.append(len(spec[key]))
+            values.extend(spec[key])
+        if values and isinstance(values[0], tuple):
+            return values, np.asarray(offsets), np.asarray(counts)
+        return np.asarray(values, dtype=object), np.asarray(offsets), np.asarray(counts)
+
+    def _pick(self, rng, offsets, counts, type_idx):
+        return offsets[type_idx] + (rng.random(len(type_idx)) * counts[type_idx]).astype(int)
+
+    @staticmethod
+    def _choice(rng, values, rows):
+        return np.asarray(values, dtype=object)[rng.integers(0, len(values), rows)]
+
+    def _visit_text(self, rng, timestamps, scenic_idx):
+        """ 如"10月3号早上7点到的光明顶"：游览日期在评论前 0-2 天，景点取自该景区 """
+        visit = timestamps.astype('datetime64[D]') - rng.integers(0, 3, size=len(timestamps)).astype('timedelta64[D]')
+        month_start = visit.astype('datetime64[M]')
+        months = month_start.astype(int) % 12 + 1
+        days = (visit - month_start.astype('datetime64[D]')).astype(int) + 1
+        hours = rng.integers(*VISIT_HOURS, size=len(timestamps))
+        times_of_day = np.asarray(TIMES_OF_DAY, dtype=object)[np.searchsorted(TIME_OF_DAY_STARTS, hours, 'right') - 1]
+        places = self.places[self._pick(rng, self.place_offsets, self.place_counts, scenic_idx)]
+        verbs = np.asarray(VISIT_VERBS, dtype=object)[rng.integers(0, len(VISIT_VERBS), len(timestamps))]
+        return (months.astype(str).astype(object) + '月' + days.astype(str).astype(object) + '号' + times_of_day
+                + hours.astype(str).astype(object) + '点' + verbs + places)
+
+    def _number_text(self, rng, type_idx):
+        """ 如"排了135分钟才轮到"：该问题类型的带数字片段，数字在片段给定的范围内随机 """
+        picked = self._pick(rng, self.number_offsets, self.number_counts, type_idx)
+        lows, highs = self.number_lows[picked], self.number_highs[picked]
+        values = lows + (rng.random(len(picked)) * (highs - lows + 1)).astype(int)
+        return self.number_prefixes[picked] + values.astype(str).astype(object) + self.number_suffixes[picked]
+
+    def chunk(self, index, rows):
+        """ 生成第 index 块的 rows 行评论 """
+        rng = np.random.default_rng([self.seed, index])
+        scenic_idx = rng.choice(len(self.scenic_spots), size=rows, p=self.scenic_p)
+        # 按景区各自的问题类型分布抽样：逆 CDF
+        cdf = np.cumsum(self.issue_p, axis=1)[scenic_idx]
+        type_idx = np.minimum((cdf < rng.random((rows, 1))).sum(axis=1), len(self.issue_types) - 1)
+        sentiment_idx = rng.choice(len(SENTIMENT_LEVELS), size=rows, p=SENTIMENT_WEIGHTS)
+
+        timestamps = self.days[rng.choice(len(self.days), size=rows, p=self.day_p)].astype('datetime64[s]') \
+            + rng.integers(7 * 3600, 21 * 3600, size=rows).astype('timedelta64[s]')
+
+        closers = np.where(sentiment_idx == 2, self.severe_closers[rng.integers(0, len(self.severe_closers), rows)],
+                           self.closers[rng.integers(0, len(self.closers), rows)])
+        second = np.where(rng.random(rows) < 0.3,
+                          '，' + self.phrases[self._pick(rng, self.phrase_offsets, self.phrase_counts, type_idx)], '')
+        content = (pd.Series(self.openers[rng.integers(0, len(self.openers), rows)])
+                   + self._visit_text(rng, timestamps, scenic_idx) + '，'
+                   + self._choice(rng, COMPANIONS, rows) + self._choice(rng, ARRIVALS, rows) + '，'
+                   + np.where(rng.random(rows) < 0.6, self._choice(rng, WEATHER, rows) + '，', '')
+                   + self.phrases[self._pick(rng, self.phrase_offsets, self.phrase_counts, type_idx)] + '，'
+                   + self._number_text(rng, type_idx) + '，'
+                   + self._number_text(rng, (type_idx + rng.integers(1, len(self.issue_types), rows))
+                                       % len(self.issue_types))
+                   + second + closers)
+
+        df = pd.DataFrame({
+            '点评时间': format_dates(timestamps, rng, self.date_formats),
+            '平台': self.platforms[rng.choice(len(self.platforms), size=rows, p=self.platform_p)],
+            '景区名称': self.scenic_spots[scenic_idx],
+            '核心问题类型': self.issue_types[type_idx],
+            '问题细项': self.details[self._pick(rng, self.detail_offsets, self.detail_counts, type_idx)],
+            '情感强度': np.asarray(SENTIMENT_LEVELS, dtype=object)[sentiment_idx],
+            '内容': content,
+        }, columns=COLUMNS)
+
+        # 跨平台转发：复制本块中另一条评论的景区、问题和内容，末尾稍作改动
+        dup = np.flatnonzero(rng.random(rows) < self.dup_rate)
+        if len(dup):
+            source = rng.integers(0, rows, size=len(dup))
+            for column in ['景区名称', '核心问题类型', '问题细项', '情感强度']:
+                df.iloc[dup, df.columns.get_loc(column)] = df[column].to_numpy()[source]
+            df.iloc[dup, df.columns.get_loc('内容')] = df['内容'].to_numpy()[source] + np.where(
+                rng.random(len(dup)) < 0.5, '', '（转）')
+        return df
+
+    def frames(self, rows, chunk_rows=CHUNK_ROWS):
+        """ 依次产出各块 DataFrame，共 rows 行 """
+        for index, start in enumerate(range(0, rows, chunk_rows)):
+            yield self.chunk(index, min(chunk_rows, rows - start))
+
+
+def generate_frame(rows, seed=42, **options):
+    """ 在内存中生成 rows 行评论（适合较小的规模） """
+    generator = ReviewGenerator(seed=seed, **options)
+    return pd.concat(generator.frames(rows), ignore_index=True)
+
+
+def measure_duplicates(df):
+    """ 用看板的近似重复检测（utils/dedup.py）统计 df 中被标记为重复的评论占比 """
+    from utils import dedup
+
+    tagged = dedup.NearDuplicateIndex().tag(df.reset_index(drop=True))
+    return float(tagged[dedup.DUPLICATE_COLUMN].mean())
+
+
+def write_dataset(path, rows, seed=42, encoding='utf-8', chunk_rows=CHUNK_ROWS, **options):
+    """
+    分块生成并写入 CSV 或 Parquet（按扩展名），内存占用只与分块大小有关。
+
+    Returns:
+        dict: 行数、文件字节数和耗时。
+    """
+    started = time.perf_counter()
+    generator = ReviewGenerator(seed=seed, **options)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    if path.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([(c, pa.string()) for c in COLUMNS])
+        with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+            for frame in generator.frames(rows, chunk_rows):
+                writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+    else:
+        with open(tmp_path, 'w', encoding=encoding, newline='') as f:
+            for index, frame in enumerate(generator.frames(rows, chunk_rows)):
+                frame.to_csv(f, index=False, header=index == 0)
+    os.replace(tmp_path, path)
+    return {"path": path, "rows": rows, "bytes": os.path.getsize(path),
+            "elapsed_s": round(time.perf_counter() - started, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成评论数据集")
+    parser.add_argument("--rows", type=int, default=100_000, help="行数")
+    parser.add_argument("--out", required=True, help="输出文件，.csv 或 .parquet")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--encoding", default="utf-8", choices=["utf-8", "utf-8-sig", "gbk"], help="CSV 编码")
+    parser.add_argument("--start-year", type=int, default=2021, help="起始年份")
+    parser.add_argument("--end-year", type=int, default=2024, help="结束年份（含）")
+    parser.add_argument("--scenic-skew", type=float, default=1.1, help="景区分布的幂律指数，0 为均匀")
+    parser.add_argument("--platform-skew", type=float, default=0.9, help="平台分布的幂律指数，0 为均匀")
+    parser.add_argument("--dup-rate", type=float, default=0.03, help="跨平台转发的近似重复评论占比")
+    parser.add_argument("--date-formats", default="mixed", choices=["mixed", "iso"], help="日期写法")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="每块生成的行数")
+    parser.add_argument("--check-dup", type=int, default=0, metavar="ROWS",
+                        help="另按同样的参数生成 ROWS 行样本，统计近似重复检测标记出的占比")
+    args = parser.parse_args()
+
+    options = dict(start_year=args.start_year, end_year=args.end_year, scenic_skew=args.scenic_skew,
+                   platform_skew=args.platform_skew, dup_rate=args.dup_rate, date_formats=args.date_formats)
+    result = write_dataset(args.out, args.rows, seed=args.seed, encoding=args.encoding, chunk_rows=args.chunk_rows,
+                           **options)
+    print(f"已生成 {result['rows']} 行 → {result['path']}（{result['bytes'] / 1024 / 1024:.1f} MB，"
+          f"{result['elapsed_s']:.1f} s）")
+    if args.check_dup:
+        share = measure_duplicates(generate_frame(args.check_dup, seed=args.seed, **options))
+        print(f"近似重复占比：{share:.2%}（--dup-rate {args.dup_rate:.2%}，样本 {args.check_dup} 行）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# /tools/profile_viewer.py
+"""
+查看和对比页面重跑的剖析报告（由 ?admin=<令牌>&profile=1 或 PROFILE_RERUNS=1 生成，保存在 PROFILE_DIR）。
+
+用法（在项目根目录下）：
+    python -m tools.profile_viewer list
+    python -m tools.profile_viewer show  cache/profiles/20250101-120000_黄山_1a2b3c4d
+    python -m tools.profile_viewer compare <基准报告目录> <对比报告目录> --top 20
+"""
+
+import argparse
+import os
+
+from bench.common import format_table
+from utils import profiling
+
+
+def resolve(report):
+    """ 报告可以写完整路径，也可以只写 PROFILE_DIR 下的目录名 """
+    return report if os.path.isdir(report) else os.path.join(profiling.PROFILE_DIR, report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="页面重跑剖析报告查看器")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="列出已保存的报告")
+    show = sub.add_parser("show", help="显示一份报告的摘要")
+    show.add_argument("report")
+    show.add_argument("--top", type=int, default=20)
+    compare = sub.add_parser("compare", help="对比两份报告")
+    compare.add_argument("base")
+    compare.add_argument("other")
+    compare.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        rows = []
+        for report_dir in profiling.list_reports():
+            meta = profiling.load_meta(report_dir)
+            rows.append({"report": os.path.basename(report_dir), "page": meta["page"],
+                         "elapsed_ms": meta["elapsed_ms"], "peak_kb": meta["peak_kb"],
+                         "context": meta["context"]})
+        print(format_table(rows, ["report", "page", "elapsed_ms", "peak_kb", "context"]) if rows else "没有剖析报告")
+    elif args.command == "show":
+        meta = profiling.load_meta(resolve(args.report))
+        print(f"{meta['page']}：{meta['elapsed_ms']:.0f} ms，峰值内存 {meta['peak_kb']:.0f} KB，"
+              f"{meta['total_calls']} 次调用\n筛选状态：{meta['context']}\n")
+        print(format_table(meta["top_functions"][:args.top], ["function", "ncalls", "tottime_ms", "cumtime_ms"]))
+        print()
+        print(format_table(meta["top_allocations"][:args.top], ["location", "size_kb", "count"]))
+    else:
+        comparison = profiling.compare_reports(resolve(args.base), resolve(args.other), top=args.top)
+        print(format_table(comparison["summary"], ["report", "page", "elapsed_ms", "peak_kb", "total_calls"]))
+        print("\n累计耗时变化最大的函数：")
+        print(format_table(comparison["functions"], ["function", "base_ms", "other_ms", "delta_ms"]))
+        print("\n内存分配变化最大的位置：")
+        print(format_table(comparison["allocations"], ["location", "base_kb", "other_kb", "delta_kb"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# /tools/review_vocab.py
+"""
+离线工具共用的评论词表：核心问题类型、问题细项、关键词和评论文本片段。
+桩服务用它给上传的评论打标签，合成数据生成器用它拼出评论文本。
+numbers 为带数字的片段 (前缀, 后缀, 最小值, 最大值)，生成时在两者之间填入随机数，
+与景点名称、游览日期和时刻一起让不同评论的文本随行数增加而保持互不相同。
+"""
+
+# 与 utils/data_loader.py 中 SCENIC_PROVINCE_MAP 的景区一致
+SCENIC_SPOTS = ['普陀山', '黄山', '庐山', '雁荡山', '泰山', '衡山', '华山', '恒山', '嵩山', '峨眉山', '武夷山']
+
+PLATFORMS = ['携程', '美团', '去哪儿', '大众点评', '马蜂窝', '抖音', '小红书', '飞猪']
+
+SENTIMENT_LEVELS = ['轻微', '一般', '严重']
+
+ISSUE_TYPES = {
+    '排队拥挤': {
+        'details': ['索道排队', '入园排队', '人流拥挤', '观景台拥堵'],
+        'keywords': ['排队', '拥挤', '人多', '堵', '等了', '索道'],
+        'phrases': ['索道排队两个多小时', '入口排队排到怀疑人生', '山顶人挤人根本看不到风景',
+                    '节假日人太多寸步难行', '观景台被占满了', '等缆车等到天黑'],
+        'numbers': [('排了', '分钟才轮到', 20, 240), ('前面少说还有', '个人在排队', 50, 900),
+                    ('挤了', '分钟才挪到观景台', 10, 120)],
+    },
+    '卫生环境': {
+        'details': ['厕所卫生', '垃圾处理', '异味', '设施破损'],
+        'keywords': ['脏', '厕所', '垃圾', '臭', '卫生', '破'],
+        'phrases': ['厕所又脏又臭', '步道旁边到处是垃圾', '垃圾桶满了没人清理',
+                    '休息区的椅子坏了', '溪水里漂着塑料瓶', '卫生间排长队还没有纸'],
+        'numbers': [('连着找了', '个厕所都没法用', 2, 9), ('走了', '米就看到一堆垃圾', 50, 900),
+                    ('垃圾桶满了至少', '个没人清理', 3, 30)],
+    },
+    '价格收费': {
+        'details': ['门票价格', '索道价格', '餐饮价格', '乱收费'],
+        'keywords': ['贵', '价格', '收费', '门票', '坑', '宰'],
+        'phrases': ['门票太贵不值这个价', '山上一瓶水卖二十块', '索道票价格离谱',
+                    '停车费收得莫名其妙', '套票强制捆绑消费', '景区里吃饭被宰了'],
+        'numbers': [('门票', '元一张', 80, 320), ('一瓶矿泉水卖', '块', 5, 25),
+                    ('索道往返收了', '元', 100, 400)],
+    },
+    '服务态度': {
+        'details': ['工作人员态度', '导游服务', '投诉处理', '信息指引'],
+        'keywords': ['态度', '服务', '工作人员', '导游', '投诉', '不理'],
+        'phrases': ['工作人员态度很差爱答不理', '导游一直催着购物', '投诉了半天没人处理',
+                    '问路没人回答', '检票员很凶', '客服电话一直打不通'],
+        'numbers': [('问了', '个工作人员都说不知道', 2, 8), ('投诉电话打了', '次没人接', 2, 12),
+                    ('在服务台等了', '分钟没人理', 10, 90)],
+    },
+    '交通住宿': {
+        'details': ['景区交通', '停车', '住宿条件', '接驳车'],
+        'keywords': ['交通', '停车', '酒店', '住宿', '接驳', '大巴'],
+        'phrases': ['接驳车等了一个小时', '停车场太远还要走很久', '山上酒店又贵又旧',
+                    '下山的大巴挤不上去', '导航把我们带到了后山', '民宿和图片严重不符'],
+        'numbers': [('山上酒店一晚', '元', 300, 2500), ('接驳车等了', '分钟', 10, 120),
+                    ('停车费收了', '元', 20, 150)],
+    },
+    '安全管理': {
+        'details': ['步道安全', '救援设施', '秩序管理', '天气预警'],
+        'keywords': ['安全', '危险', '护栏', '滑', '秩序', '救援'],
+        'phrases': ['台阶湿滑没有护栏', '下雨天也不提醒游客', '有人插队也没人管',
+                    '险峻路段没有安全提示', '摔倒了很久才有人来', '夜里下山没有照明'],
+        'numbers': [('护栏断了', '处没人修', 2, 12), ('台阶上有', '块石板松动', 2, 20),
+                    ('路段有', '米没有安全提示', 50, 800)],
+    },
+}
+
+# 各景区的景点，合成评论里的游览地点
+SCENIC_PLACES = {
+    '普陀山': ['南海观音', '普济寺', '法雨寺', '慧济寺', '百步沙', '紫竹林'],
+    '黄山': ['迎客松', '光明顶', '西海大峡谷', '始信峰', '莲花峰', '天都峰'],
+    '庐山': ['含鄱口', '三叠泉', '如琴湖', '花径', '五老峰', '锦绣谷'],
+    '雁荡山': ['灵峰', '大龙湫', '灵岩', '方洞', '显胜门', '三折瀑'],
+    '泰山': ['南天门', '玉皇顶', '十八盘', '中天门', '碧霞祠', '日观峰'],
+    '衡山': ['祝融峰', '南岳大庙', '南台寺', '磨镜台', '藏经殿', '水帘洞'],
+    '华山': ['西峰', '东峰', '长空栈道', '苍龙岭', '北峰', '金锁关'],
+    '恒山': ['悬空寺', '北岳庙', '天峰岭', '翠屏峰', '会仙府', '果老岭'],
+    '嵩山': ['少林寺', '塔林', '中岳庙', '嵩阳书院', '三皇寨', '峻极峰'],
+    '峨眉山': ['金顶', '万年寺', '报国寺', '清音阁', '洗象池', '雷洞坪'],
+    '武夷山': ['天游峰', '九曲溪', '一线天', '大红袍景区', '虎啸岩', '水帘洞'],
+}
+TIMES_OF_DAY = ['早上', '上午', '中午', '下午', '傍晚']
+VISIT_VERBS = ['到的', '去的', '爬的', '逛的']
+COMPANIONS = ['和朋友', '带着爸妈', '带孩子', '跟同事', '和女朋友', '一家五口', '跟旅行团', '一个人']
+ARRIVALS = ['坐高铁过来', '自驾过来', '坐大巴过来', '坐飞机过来', '从市区打车过来', '骑车过来']
+WEATHER = ['天下着小雨', '太阳特别晒', '山上雾很大', '风很大', '天气还算不错', '气温有点低', '闷热得很', '刚下过雪']
+
+OPENERS = ['这次去玩体验很差，', '慕名而来结果失望，', '说实话不太推荐，', '带家人来的，',
+           '第二次来了，', '国庆节去的，', '周末去的，', '']
+CLOSERS = ['。', '，希望景区改进。', '，不会再来了。', '，体验大打折扣。', '，建议大家避开高峰。', '！']
+
+
+def classify_text(text):
+    """
+    按关键词给一条评论打上 (核心问题类型, 问题细项) 标签，未命中时返回第一类。
+    """
+    text = str(text)
+    best_type, best_hits = None, 0
+    for issue_type, spec in ISSUE_TYPES.items():
+        hits = sum(text.count(k) for k in spec['keywords'])
+        if hits > best_hits:
+            best_type, best_hits = issue_type, hits
+    if best_type is None:
+        best_type = next(iter(ISSUE_TYPES))
+    details = ISSUE_TYPES[best_type]['details']
+    detail = next((d for d in details if d[:2] in text), details[0])
+    return best_type, detail
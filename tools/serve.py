@@ -0,0 +1,52 @@
+# /tools/serve.py
+"""
+带启动预热的看板启动入口：先在后台开始预热（数据集、索引、jieba 词典、词云图）并打开 readiness 接口，
+再在同一进程中启动 Streamlit，页面直接复用预热好的进程内对象。
+readiness 接口所在的 HTTP 服务同时提供评论导出文件的流式下载（/exports/...），
+经反向代理部署时把浏览器可访问的服务地址设为环境变量 EXPORT_DOWNLOAD_BASE_URL。
+
+加载数据集时，基础数据的近似重复签名缓存（data/store/dedup/base-signatures.npz）不存在或已过期就要对全部评论分词。
+--prepare 只在前台执行一次预热、写好这些磁盘缓存和词云图后退出，适合在部署或构建镜像时运行，
+之后不经预热直接 streamlit run 的进程加载数据集时也无需导入 jieba。
+
+用法（在项目根目录下）：
+    python -m tools.serve                                  # 等价于 streamlit run home.py，readiness 在 8502 端口
+    python -m tools.serve --ready-port 9000 -- --server.port 8080
+    python -m tools.serve --prepare                        # 只生成磁盘缓存，失败时退出码为 1
+    curl -i http://localhost:8502/ready                    # 预热完成前 503，完成后 200
+"""
+
+import argparse
+import logging
+import sys
+
+from utils import review_store, warmup
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动预热后的舆情看板")
+    parser.add_argument("--app", default="home.py", help="Streamlit 入口脚本")
+    parser.add_argument("--data", default=review_store.BASE_DATA_PATH, help="基础数据 CSV")
+    parser.add_argument("--workers", type=int, default=warmup.WARMUP_WORKERS, help="预绘制词云的进程数")
+    parser.add_argument("--ready-host", default=warmup.WARMUP_READY_HOST, help="readiness 接口监听地址")
+    parser.add_argument("--ready-port", type=int, default=warmup.WARMUP_READY_PORT, help="readiness 接口（兼导出文件下载）端口")
+    parser.add_argument("--prepare", action="store_true", help="只执行预热，生成磁盘缓存后退出")
+    parser.add_argument("streamlit_args", nargs=argparse.REMAINDER, help="-- 之后的参数原样传给 streamlit run")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.prepare:
+        progress = warmup.run_warmup(args.data, workers=args.workers)
+        sys.exit(0 if progress["ready"] else 1)
+    warmup.serve_readiness(args.ready_host, args.ready_port)
+    warmup.start_warmup(args.data, workers=args.workers)
+
+    from streamlit.web import cli as stcli
+
+    extra = args.streamlit_args[1:] if args.streamlit_args[:1] == ["--"] else args.streamlit_args
+    sys.argv = ["streamlit", "run", args.app, *extra]
+    sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()
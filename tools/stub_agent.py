@@ -0,0 +1,241 @@
+# /tools/stub_agent.py
+"""
+本地桩 Agent 服务，模拟 POST /analyze_reviews/ 接口，用于离线压测和回归测试。
+
+用法（在项目根目录下）：
+    python -m tools.stub_agent --port 8000 --latency 1.5 --per-row-ms 2 --fail-rate 0.05
+"""
+
+import argparse
+import io
+import json
+import random
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from tools.review_vocab import PLATFORMS, SCENIC_SPOTS, classify_text
+from utils.agent_client import ARROW_STREAM_MIME, JSON_MIME, PARQUET_MIME, SUGGESTIONS_METADATA_KEY
+
+SEVERE_MARKERS = ['！', '!', '投诉', '再也不', '差评', '离谱', '骗']
+
+
+def parse_multipart_file(content_type, body):
+    """ 从 multipart/form-data 请求体中取出名为 file 的文件，返回 (文件名, 字节) """
+    message = BytesParser(policy=default_policy).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    for part in message.iter_parts():
+        if part.get_param("name", header="content-disposition") == "file":
+            return part.get_filename() or "upload.csv", part.get_payload(decode=True)
+    return None, None
+
+
+def read_upload(file_name, data):
+    """ 按扩展名读取上传的表格文件 """
+    name = file_name.lower()
+    if name.endswith(".xlsx"):
+        return pd.read_excel(io.BytesIO(data))
+    if name.endswith(".parquet"):
+        return pd.read_parquet(io.BytesIO(data))
+    try:
+        return pd.read_csv(io.BytesIO(data), encoding="utf-8")
+    except UnicodeDecodeError:
+        return pd.read_csv(io.BytesIO(data), encoding="gbk")
+
+
+def structure_reviews(df, rng):
+    """ 模拟 BERT 结构化：为每条评论补齐景区、平台、问题类型、细项和情感强度 """
+    if "内容" in df.columns:
+        texts = df["内容"].fillna("").astype(str)
+    else:
+        text_columns = df.select_dtypes(include="object").columns
+        texts = df[text_columns].fillna("").astype(str).agg(" ".join, axis=1) if len(text_columns) else \
+            pd.Series([""] * len(df))
+
+    rows = []
+    for i, text in enumerate(texts):
+        issue_type, detail = classify_text(text)
+        scenic = next((s for s in SCENIC_SPOTS if s in text), None)
+        if scenic is None:
+            scenic = df["景区名称"].iloc[i] if "景区名称" in df.columns else rng.choice(SCENIC_SPOTS)
+        severe = any(m in text for m in SEVERE_MARKERS)
+        rows.append({
+            "点评时间": str(df["点评时间"].iloc[i]) if "点评时间" in df.columns else time.strftime("%Y-%m-%d"),
+            "平台": df["平台"].iloc[i] if "平台" in df.columns else rng.choice(PLATFORMS),
+            "景区名称": scenic,
+            "核心问题类型": issue_type,
+            "问题细项": detail,
+            "情感强度": "严重" if severe else rng.choice(["轻微", "一般"]),
+            "内容": text,
+        })
+    return pd.DataFrame(rows, columns=["点评时间", "平台", "景区名称", "核心问题类型", "问题细项", "情感强度", "内容"])
+
+
+def build_report(structured):
+    """ 根据结构化结果生成一份 Markdown 格式的分析报告 """
+    lines = ["# 总体概述", f"本次共分析 {len(structured)} 条评论。", ""]
+    if structured.empty:
+        return "\n".join(lines)
+
+    lines.append("## 核心问题分布")
+    for issue, count in structured["核心问题类型"].value_counts().items():
+        lines.append(f"- {issue}：{count} 条（{count / len(structured):.1%}）")
+    lines += ["", "## 各景区情况"]
+    for scenic, group in structured.groupby("景区名称"):
+        top_issue = group["核心问题类型"].value_counts().index[0]
+        lines.append(f"- {scenic}：{len(group)} 条，最突出的问题是{top_issue}。")
+    lines += ["", "## 情感强度"]
+    for level, count in structured["情感强度"].value_counts().items():
+        lines.append(f"- {level}：{count} 条")
+    lines += ["", "## 改进建议"]
+    for issue in structured["核心问题类型"].value_counts().index[:3]:
+        lines.append(f"- 针对{issue}问题，建议优先排查高峰时段的管理措施并及时回应游客反馈。")
+    return "\n".join(lines)
+
+
+def negotiate_format(accept_header):
+    """ 按 Accept 头中的 q 值选择响应格式，未声明时返回 JSON """
+    best, best_q = JSON_MIME, 0.0
+    for item in (accept_header or "").split(","):
+        parts = [p.strip() for p in item.split(";")]
+        mime, q = parts[0].lower(), 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if mime in (ARROW_STREAM_MIME, PARQUET_MIME, JSON_MIME) and q > best_q:
+            best, best_q = mime, q
+    return best
+
+
+def encode_columnar(structured, report, mime):
+    """ 把结构化结果编码为 Arrow IPC 流或 Parquet，分析报告放在表结构元数据中 """
+    table = pa.Table.from_pandas(structured, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[SUGGESTIONS_METADATA_KEY] = report.encode("utf-8")
+    table = table.replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    if mime == ARROW_STREAM_MIME:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, sink, compression="zstd")
+    return sink.getvalue().to_pybytes()
+
+
+class StubAgentHandler(BaseHTTPRequestHandler):
+    server_version = "StubAgent/1.0"
+    config = None  # 由 make_server 注入
+
+    def log_message(self, format, *args):
+        if self.config.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("", "/health"):
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"detail": "Not Found"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/analyze_reviews":
+            self._send_json(404, {"detail": "Not Found"})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        config = self.config
+        rng = random.Random(config.seed + threading.get_ident())
+
+        if rng.random() < config.fail_rate:
+            time.sleep(config.latency * rng.random())
+            self._send_json(500, {"detail": "injected failure"})
+            return
+
+        file_name, data = parse_multipart_file(self.headers.get("Content-Type", ""), body)
+        if data is None:
+            self._send_json(422, {"detail": "missing file field"})
+            return
+        try:
+            df = read_upload(file_name, data)
+        except Exception as e:
+            self._send_json(400, {"detail": f"cannot parse file: {e}"})
+            return
+
+        structured = structure_reviews(df, rng)
+        delay = config.latency + config.per_row_ms * len(structured) / 1000
+        time.sleep(max(0.0, delay * (1 + config.jitter * (2 * rng.random() - 1))))
+        self.send_structured(structured, build_report(structured))
+
+    def send_structured(self, structured, report):
+        mime = negotiate_format(self.headers.get("Accept")) if self.config.columnar else JSON_MIME
+        if mime == JSON_MIME:
+            self._send_json(200, {
+                "structured_data": structured.to_dict(orient="records"),
+                "suggestions": report,
+            })
+            return
+
+        body = encode_columnar(structured, report, mime)
+        self.send_response(200)
+        self.send_header("Content-Type", mime)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(host, port, **options):
+    """ 创建桩 Agent 服务，options 对应命令行参数 """
+    config = argparse.Namespace(latency=0.5, per_row_ms=0.0, jitter=0.2, fail_rate=0.0, seed=0,
+                                columnar=True, verbose=False)
+    vars(config).update(options)
+    handler = type("ConfiguredStubAgentHandler", (StubAgentHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地桩 Agent 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.5, help="每次分析的基础耗时（秒）")
+    parser.add_argument("--per-row-ms", type=float, default=0.0, help="每行评论额外耗时（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0.2, help="耗时随机抖动比例")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="注入 500 错误的概率")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json-only", dest="columnar", action="store_false",
+                        help="忽略 Accept 头，始终返回 JSON（模拟旧版服务）")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    options = {k: v for k, v in vars(args).items() if k not in ("host", "port")}
+    server = make_server(args.host, args.port, **options)
+    print(f"stub agent listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
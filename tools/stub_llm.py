@@ -0,0 +1,196 @@
+# /tools/stub_llm.py
+"""
+本地 OpenAI 兼容的桩对话服务，模拟 vLLM 的 /v1/chat/completions 接口。
+支持配置首 token 延迟、生成速率和失败注入，支持 stream=True 的 SSE 输出。
+
+用法（在项目根目录下）：
+    python -m tools.stub_llm --port 8001 --ttft 0.3 --tokens-per-second 40 --fail-rate 0.02
+然后设置 VLLM_BASE_URL=http://127.0.0.1:8001/v1 启动 Streamlit。
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.chat_context import estimate_tokens
+
+ANSWER_TEMPLATE = (
+    "根据报告和检索到的数据，关于“{question}”可以从以下几个方面来看：\n\n"
+    "1. 问题主要集中在高峰时段，建议结合评论时间分布安排人手；\n"
+    "2. 不同平台的反馈侧重点不同，建议分平台跟进典型差评；\n"
+    "3. 对于情感强度为严重的评论，建议建立 24 小时内响应的处理机制。\n\n"
+    "以上结论基于当前上传的数据，仅供参考。"
+)
+
+
+def make_answer(messages, max_tokens):
+    """ 根据最后一条用户消息生成固定格式的回答，并按 max_tokens 截断 """
+    question = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    answer = ANSWER_TEMPLATE.format(question=" ".join(str(question).split())[:40])
+    return answer[:max_tokens] if max_tokens else answer
+
+
+def split_tokens(text):
+    """ 把回答切成模拟的 token 片段：中文逐字，其余按 4 个字符一段 """
+    pieces, buffer = [], ""
+    for char in text:
+        if ord(char) > 0x2e80:
+            if buffer:
+                pieces.append(buffer)
+                buffer = ""
+            pieces.append(char)
+        else:
+            buffer += char
+            if len(buffer) >= 4:
+                pieces.append(buffer)
+                buffer = ""
+    if buffer:
+        pieces.append(buffer)
+    return pieces
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    server_version = "StubLLM/1.0"
+    protocol_version = "HTTP/1.1"
+    config = None  # 由 make_server 注入
+
+    def log_message(self, format, *args):
+        if self.config.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif path == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": self.config.model, "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "Not Found"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": "Not Found"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        config = self.config
+        rng = random.Random(config.seed + threading.get_ident() + time.monotonic_ns())
+
+        if rng.random() < config.fail_rate:
+            time.sleep(config.ttft)
+            self._send_json(500, {"error": {"message": "injected failure", "type": "server_error"}})
+            return
+
+        messages = request.get("messages", [])
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+        pieces = split_tokens(make_answer(messages, request.get("max_tokens")))
+        # 首 token 延迟随提示词长度略有增加，模拟 prefill 开销
+        ttft = config.ttft + prompt_tokens * config.prefill_ms_per_token / 1000
+        interval = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        time.sleep(ttft)
+
+        if request.get("stream"):
+            self._stream(completion_id, created, pieces, interval)
+            return
+
+        time.sleep(interval * len(pieces))
+        self._send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": request.get("model", config.model),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(pieces)},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(pieces),
+                "total_tokens": prompt_tokens + len(pieces),
+            },
+        })
+
+    def _stream(self, completion_id, created, pieces, interval):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": self.config.model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        send({"role": "assistant", "content": ""})
+        for piece in pieces:
+            time.sleep(interval)
+            send({"content": piece})
+        send({}, finish_reason="stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def make_server(host, port, **options):
+    """ 创建桩对话服务，options 对应命令行参数 """
+    config = argparse.Namespace(
+        model="deepseek-r1-distill-qwen-vllm", ttft=0.3, tokens_per_second=40.0,
+        prefill_ms_per_token=0.05, fail_rate=0.0, seed=0, verbose=False
+    )
+    vars(config).update(options)
+    handler = type("ConfiguredStubLLMHandler", (StubLLMHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容的桩对话服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--model", default="deepseek-r1-distill-qwen-vllm")
+    parser.add_argument("--ttft", type=float, default=0.3, help="首 token 延迟（秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="生成速率")
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.05, help="每个提示词 token 的 prefill 耗时（毫秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="注入 500 错误的概率")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    options = {k: v for k, v in vars(args).items() if k not in ("host", "port")}
+    server = make_server(args.host, args.port, **options)
+    print(f"stub LLM listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# /utils/agent_client.py
+
+import os
+import time
+
+import pandas as pd
+import requests
+
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+# --- 后端服务配置（可通过环境变量覆盖） ---
+# 主 Agent 服务地址，用于文件处理
+AGENT_BASE_URL = os.environ.get("AGENT_BASE_URL", "http://127.0.0.1:8000")  # 使用 127.0.0.1 而不是 0.0.0.0
+FILE_ANALYSIS_ENDPOINT = f"{AGENT_BASE_URL}/analyze_reviews/"
+ANALYSIS_TIMEOUT = float(os.environ.get("AGENT_TIMEOUT", "300"))  # 设置较长的超时
+CONNECT_TIMEOUT = float(os.environ.get("AGENT_CONNECT_TIMEOUT", "3"))  # 连接超时要短，服务宕机时尽快失败
+
+# --- 熔断与健康探测配置 ---
+HEALTH_ENDPOINT = f"{AGENT_BASE_URL}{os.environ.get('AGENT_HEALTH_PATH', '/health')}"
+HEALTH_TIMEOUT = 2.0
+HEALTH_INTERVAL = float(os.environ.get("AGENT_HEALTH_INTERVAL", "5"))
+
+# 进程内所有会话共用一个熔断器
+breaker = CircuitBreaker("analysis-agent", failure_threshold=3, reset_timeout=5.0, max_reset_timeout=120.0)
+
+# --- 结构化数据的响应格式协商 ---
+ARROW_STREAM_MIME = "application/vnd.apache.arrow.stream"
+PARQUET_MIME = "application/vnd.apache.parquet"
+JSON_MIME = "application/json"
+# 列式格式中，分析建议文本放在表结构的元数据里
+SUGGESTIONS_METADATA_KEY = b"suggestions"
+# 优先 Arrow IPC 流，其次 Parquet，最后回退到 JSON
+ACCEPT_HEADER = f"{ARROW_STREAM_MIME}, {PARQUET_MIME};q=0.9, {JSON_MIME};q=0.5"
+RESPONSE_FORMAT = os.environ.get("AGENT_RESPONSE_FORMAT", "arrow")  # arrow / parquet / json
+
+_ACCEPT_BY_FORMAT = {
+    "arrow": ACCEPT_HEADER,
+    "parquet": f"{PARQUET_MIME}, {JSON_MIME};q=0.5",
+    "json": JSON_MIME,
+}
+
+
+def decode_structured_response(response):
+    """
+    按响应的 Content-Type 解码结构化数据和分析建议。
+    Arrow 和 Parquet 直接转换为 DataFrame，尽量避免额外拷贝。
+
+    Returns:
+        tuple: (DataFrame, 分析建议文本, 响应格式)
+    """
+    content_type = response.headers.get("Content-Type", JSON_MIME).split(";")[0].strip().lower()
+
+    if content_type in (ARROW_STREAM_MIME, PARQUET_MIME):
+        import pyarrow as pa
+
+        if content_type == ARROW_STREAM_MIME:
+            # 直接在响应缓冲区上读取，不再复制一份字节
+            table = pa.ipc.open_stream(pa.py_buffer(response.content)).read_all()
+            response_format = "arrow"
+        else:
+            import pyarrow.parquet as pq
+            table = pq.read_table(pa.BufferReader(response.content))
+            response_format = "parquet"
+
+        metadata = table.schema.metadata or {}
+        suggestions = metadata.get(SUGGESTIONS_METADATA_KEY, b"").decode("utf-8")
+        # split_blocks 让每列保持独立内存块，数值列可零拷贝转换
+        processed_df = table.to_pandas(split_blocks=True, self_destruct=True)
+        return processed_df, suggestions, response_format
+
+    result = response.json()
+    # 假设后端返回格式为: {"structured_data": [...], "suggestions": "..."}
+    return pd.DataFrame(result.get("structured_data")), result.get("suggestions"), "json"
+
+
+def probe_health():
+    """ 健康探测：服务能正常响应（非 5xx）即视为存活，兼容没有 /health 接口的服务 """
+    response = requests.get(HEALTH_ENDPOINT, timeout=HEALTH_TIMEOUT)
+    return response.status_code < 500
+
+
+def ensure_health_probe():
+    """ 启动后台健康探测（每个进程只启动一次） """
+    breaker.start_probe(probe_health, interval=HEALTH_INTERVAL, hedge_delay=0.5, max_backoff=60.0)
+
+
+def get_backend_status():
+    """ 返回分析服务的熔断状态和最近一次健康探测结果 """
+    return breaker.snapshot()
+
+
+def _post_file(files, accept):
+    return requests.post(FILE_ANALYSIS_ENDPOINT, files=files, headers={"Accept": accept},
+                         timeout=(CONNECT_TIMEOUT, ANALYSIS_TIMEOUT))
+
+
+def analyze_file(file_name, file_bytes, mime_type=None, response_format=None, stats=None):
+    """
+    通过 HTTP 请求将文件发送到主 Agent 服务进行处理。
+    通过 Accept 头协商结构化数据的格式（Arrow IPC 流 / Parquet / JSON），
+    服务端不支持列式格式时自动回退到 JSON。
+    请求经过熔断器：服务不可用时立即返回错误，不再等待超时。
+
+    Args:
+        response_format (str): 期望的响应格式，默认取 AGENT_RESPONSE_FORMAT 环境变量。
+        stats (dict): 可选，传入时写入传输字节数、解码耗时和实际响应格式。
+
+    Returns:
+        tuple: 成功时为 (结构化数据 DataFrame, 分析建议文本)，失败时为 (None, 错误信息)。
+    """
+    accept = _ACCEPT_BY_FORMAT.get(response_format or RESPONSE_FORMAT, ACCEPT_HEADER)
+    try:
+        files = {'file': (file_name, file_bytes, mime_type)}
+        # 只有连接失败、超时和 5xx 计入熔断失败次数
+        response = breaker.call(_post_file, files, accept, is_failure=lambda r: r.status_code >= 500)
+
+        if response.status_code == 200:
+            started = time.perf_counter()
+            processed_df, suggestions_text, actual_format = decode_structured_response(response)
+            if stats is not None:
+                stats.update({
+                    "format": actual_format,
+                    "bytes": len(response.content),
+                    "decode_ms": (time.perf_counter() - started) * 1000,
+                    "rows": len(processed_df),
+                })
+            return processed_df, suggestions_text
+        else:
+            error_message = f"文件分析失败。服务器返回状态码: {response.status_code}。错误信息: {response.text}"
+            return None, error_message
+    except CircuitOpenError as e:
+        return None, f"分析服务暂时不可用，已快速失败以免长时间等待：{e}。"
+    except requests.exceptions.RequestException as e:
+        error_message = f"无法连接到分析服务，请确认AI Agent主服务正在 {AGENT_BASE_URL} 运行。错误详情: {e}"
+        return None, error_message
+    except ValueError as e:
+        return None, f"无法解析分析服务返回的数据: {e}"
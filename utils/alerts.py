@@ -0,0 +1,191 @@
+# /utils/alerts.py
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ALERT_DIR = os.environ.get("ALERT_DIR", "data/store/alerts")
+ALERT_RULES_PATH = os.environ.get("ALERT_RULES_PATH", "tools/alert_rules.example.json")
+ALERT_WEBHOOK_URL = os.environ.get("ALERT_WEBHOOK_URL", "")
+ALERT_WEBHOOK_TIMEOUT = 5
+
+RULE_KINDS = ("daily_count", "anomaly")
+
+
+class AlertRuleError(Exception):
+    """ 告警规则配置有误 """
+
+
+@dataclass
+class AlertRule:
+    """
+    一条告警规则。
+
+    kind 为 daily_count 时：满足 filters 的评论在同一天的数量超过 threshold 即告警（每条规则每天只告警一次）；
+    kind 为 anomaly 时：异常检测器对满足 filters 的序列报出突增/持续上升时告警。
+    filters 的取值可以是单个值或取值列表，如 {"景区名称": "黄山", "情感强度": ["严重"]}。
+    """
+    name: str
+    kind: str = "daily_count"
+    filters: dict = field(default_factory=dict)
+    threshold: int = 0
+
+    def mask(self, df):
+        """ 返回满足 filters 的行 """
+        selected = pd.Series(True, index=df.index)
+        for column, value in self.filters.items():
+            if column not in df.columns:
+                return pd.Series(False, index=df.index)
+            values = value if isinstance(value, (list, tuple)) else [value]
+            selected &= df[column].isin(values)
+        return selected
+
+    def matches_series(self, scenic, issue_type):
+        """ 判断 景区名称 × 核心问题类型 序列是否在 filters 范围内（用于异常类规则） """
+        for column, actual in (('景区名称', scenic), ('核心问题类型', issue_type)):
+            value = self.filters.get(column)
+            if value is not None and actual not in (value if isinstance(value, (list, tuple)) else [value]):
+                return False
+        return True
+
+
+def load_rules(path=ALERT_RULES_PATH):
+    """
+    从 JSON 文件读取告警规则列表。
+
+    Raises:
+        AlertRuleError: 文件内容不是规则列表，或规则缺少名称、类型不支持。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    if not isinstance(raw, list):
+        raise AlertRuleError("告警规则文件应为规则列表")
+    rules = []
+    for item in raw:
+        if not item.get("name"):
+            raise AlertRuleError(f"告警规则缺少名称：{item}")
+        rule = AlertRule(name=item["name"], kind=item.get("kind", "daily_count"),
+                         filters=item.get("filters", {}), threshold=int(item.get("threshold", 0)))
+        if rule.kind not in RULE_KINDS:
+            raise AlertRuleError(f"不支持的告警规则类型：{rule.kind}")
+        rules.append(rule)
+    return rules
+
+
+class AlertEvaluator:
+    """
+    在增量数据上评估告警规则。
+
+    每条 daily_count 规则只维护 "日期 -> 评论数" 的计数器，每批新数据只对这批数据做筛选和计数，
+    不重新扫描历史；计数首次超过阈值的日期产生一条告警。
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.daily_counts = {rule.name: defaultdict(int) for rule in rules}
+        self.fired = {rule.name: set() for rule in rules}
+
+    def prime(self, df):
+        """ 用已有的历史数据初始化计数器，历史上已超过阈值的日期不再告警 """
+        for rule in self.rules:
+            if rule.kind != "daily_count":
+                continue
+            counts = self.daily_counts[rule.name]
+            for day, count in self._count_by_day(df, rule).items():
+                counts[day] += int(count)
+                if counts[day] > rule.threshold:
+                    self.fired[rule.name].add(day)
+
+    @staticmethod
+    def _count_by_day(df, rule):
+        selected = df[rule.mask(df).to_numpy(dtype=bool)]
+        return selected['点评时间'].dt.normalize().value_counts()
+
+    def evaluate(self, delta, anomaly_events=()):
+        """
+        评估一批新数据。
+
+        Args:
+            delta (pd.DataFrame): 新追加的评论（已预处理）。
+            anomaly_events (iterable): 这批数据触发的 AnomalyEvent。
+
+        Returns:
+            list: 告警记录（dict）。
+        """
+        alerts = []
+        for rule in self.rules:
+            if rule.kind == "daily_count":
+                counts = self.daily_counts[rule.name]
+                for day, count in self._count_by_day(delta, rule).items():
+                    counts[day] += int(count)
+                    if counts[day] > rule.threshold and day not in self.fired[rule.name]:
+                        self.fired[rule.name].add(day)
+                        alerts.append({
+                            "rule": rule.name, "kind": rule.kind, "filters": rule.filters,
+                            "day": day.strftime("%Y-%m-%d"), "count": counts[day], "threshold": rule.threshold,
+                            "message": f"{rule.name}：{day:%Y-%m-%d} 评论数 {counts[day]} 超过阈值 {rule.threshold}",
+                        })
+            else:
+                for event in anomaly_events:
+                    if rule.matches_series(event.scenic, event.issue_type):
+                        alerts.append({
+                            "rule": rule.name, "kind": rule.kind, "filters": rule.filters,
+                            "day": event.day.strftime("%Y-%m-%d"), "count": event.count,
+                            "baseline": round(event.baseline, 1), "z": round(event.z, 1),
+                            "message": f"{rule.name}：{event.scenic}/{event.issue_type} 在 {event.day:%Y-%m-%d} "
+                                       f"{event.kind}，评论数 {event.count}（基线 {event.baseline:.1f}）",
+                        })
+        return alerts
+
+
+# --- 告警输出 ---
+
+class FileSink:
+    """ 把告警以 JSON Lines 追加写入本地文件 """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(ALERT_DIR, "alerts.jsonl")
+        self._lock = threading.Lock()
+
+    def send(self, alerts):
+        if not alerts:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            for alert in alerts:
+                f.write(json.dumps(alert, ensure_ascii=False) + "\n")
+
+
+class WebhookSink:
+    """ 把告警以 JSON 数组 POST 到 Webhook，发送失败只记录日志，不影响后续评估 """
+
+    def __init__(self, url=ALERT_WEBHOOK_URL, timeout=ALERT_WEBHOOK_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alerts):
+        if not alerts or not self.url:
+            return
+        import requests
+
+        try:
+            response = requests.post(self.url, json=alerts, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.warning("webhook delivery failed for %d alerts: %s", len(alerts), e)
+
+
+def record_metrics(metrics, path=None):
+    """ 记录每次评估的耗时和吞吐（JSON Lines） """
+    path = path or os.path.join(ALERT_DIR, "metrics.jsonl")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(dict(metrics, recorded_at=time.strftime("%Y-%m-%dT%H:%M:%S")), ensure_ascii=False) + "\n")
@@ -0,0 +1,87 @@
+# /utils/analytics.py
+"""
+看板的纯计算层：筛选、指标和各图表所需的计数。
+
+本模块不依赖 Streamlit 或任何绘图库，输入输出都是 DataFrame / Series / 基本类型，可以 pickle，
+因此同样能在进程池、批处理任务和基准测试中调用。页面和 charts.py 中的图表构建函数只是它的薄封装。
+"""
+
+import pandas as pd
+
+from utils.dedup import DUPLICATE_COLUMN
+
+CHINA_PROVINCES = [
+    "北京市", "天津市", "上海市", "重庆市", "河北省", "山西省", "辽宁省", "吉林省", "黑龙江省",
+    "江苏省", "浙江省", "安徽省", "福建省", "江西省", "山东省", "河南省", "湖北省", "湖南省",
+    "广东省", "海南省", "四川省", "贵州省", "云南省", "陕西省", "甘肃省", "青海省",
+    "台湾省", "内蒙古自治区", "广西壮族自治区", "西藏自治区", "宁夏自治区", "新疆维吾尔自治区", "香港特别行政区", "澳门特别行政区"
+]
+
+
+# --- 筛选 ---
+
+def filter_mask(df, scenic_spot, platforms=None, issue_types=None, sentiment_levels=None):
+    """ 返回满足景区和各筛选条件的布尔掩码；筛选条件为空时不限制该字段 """
+    mask = df['景区名称'] == scenic_spot
+    if platforms:
+        mask &= df['平台'].isin(platforms)
+    if issue_types:
+        mask &= df['核心问题类型'].isin(issue_types)
+    if sentiment_levels:
+        mask &= df['情感强度'].isin(sentiment_levels)
+    return mask
+
+
+def filter_reviews(df, scenic_spot, platforms=None, issue_types=None, sentiment_levels=None):
+    """ 按景区和筛选条件取出评论，保留原索引（行 ID） """
+    return df[filter_mask(df, scenic_spot, platforms, issue_types, sentiment_levels)].copy()
+
+
+def drop_near_duplicates(data):
+    """
+    去除被标记为近似重复的评论，每个重复簇只保留行 ID 最小的一条。
+    对明细数据和聚合立方体都适用（二者都有 是否重复 列）。
+    """
+    if DUPLICATE_COLUMN not in data.columns:
+        return data
+    return data[~data[DUPLICATE_COLUMN].astype(bool)]
+
+
+# --- 指标与计数 ---
+
+def total_metrics(df):
+    """ 计算舆情总量、平台数、景区数 """
+    return len(df), int(df['平台'].nunique()), int(df['景区名称'].nunique())
+
+
+def province_counts(df):
+    """ 各省份的舆情数，按 CHINA_PROVINCES 的顺序补齐为 0 """
+    return df.groupby('省份').size().reindex(CHINA_PROVINCES, fill_value=0)
+
+
+def scenic_counts(df, ascending=None):
+    """ 各景区的舆情数；ascending 为 None 时按数量从高到低 """
+    counts = df['景区名称'].value_counts()
+    return counts if ascending is None else counts.sort_values(ascending=ascending)
+
+
+def monthly_counts(df):
+    """ 按月份（1-12）统计的舆情数 """
+    return df['月份'].value_counts().sort_index()
+
+
+def top_issue_details(df, n=10):
+    """ 出现最多的 n 个问题细项 """
+    return df['问题细项'].value_counts().sort_values(ascending=False).head(n)
+
+
+def platform_counts(df):
+    return df['平台'].value_counts()
+
+
+def sentiment_counts(df):
+    return df['情感强度'].value_counts()
+
+
+def issue_type_counts(df):
+    return df['核心问题类型'].value_counts()
@@ -0,0 +1,170 @@
+# /utils/anomaly.py
+
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# --- 异常检测配置 ---
+SERIES_COLUMNS = ['景区名称', '核心问题类型']
+EWMA_ALPHA = 0.1           # 基线的平滑系数，约等于最近 20 天的加权平均
+Z_THRESHOLD = 3.0          # 单日计数超过基线这么多个标准差即视为突增
+CUSUM_DRIFT = 0.5          # CUSUM 每天允许的偏移（以标准差计）
+CUSUM_THRESHOLD = 5.0      # CUSUM 累计超过该值视为持续上升
+MIN_STD = 1.0              # 标准差下限，避免低频序列上一两条评论就报警
+MIN_COUNT = 5              # 当日评论数至少达到该值才报警
+WARMUP_DAYS = 14           # 序列积累满这么多天后才开始检测
+MAX_GAP_DAYS = 60          # 两次评论之间最多按这么多个零计数的日子更新基线
+RECENT_DAYS = 7            # 最近这么多天内的异常视为"当前异常"
+
+
+@dataclass
+class SeriesState:
+    """ 一个 景区名称 × 核心问题类型 序列的检测状态，大小固定，与历史长度无关 """
+    mean: float = 0.0
+    var: float = 0.0
+    cusum: float = 0.0
+    days: int = 0
+    open_day: pd.Timestamp = None   # 最新的一天，当天可能还会有新评论，暂不计入基线
+    open_count: int = 0
+    late_rows: int = 0
+
+
+@dataclass
+class AnomalyEvent:
+    scenic: str
+    issue_type: str
+    day: pd.Timestamp
+    count: int
+    baseline: float
+    z: float
+    kind: str = field(default='突增')
+
+
+class AnomalyDetector:
+    """
+    按天对每个 景区名称 × 核心问题类型 的评论数做增量异常检测：
+    EWMA 维护基线均值和方差，单日 z 分数超过阈值记为"突增"，CUSUM 累计偏移超过阈值记为"持续上升"。
+
+    每批新评论先按 (序列, 日期) 计数，再只更新涉及的序列状态，不需要重新扫描历史。
+    最新的一天视为尚未结束，等出现更晚的日期时才计入基线；早于最新一天的迟到评论不参与检测。
+    """
+
+    def __init__(self):
+        self.series = {}
+        self.events = []
+        self.latest_day = None
+        self._lock = threading.Lock()
+
+    def update(self, df):
+        """ 用一批新评论更新检测状态，返回这批评论触发的异常事件 """
+        if df.empty or any(c not in df.columns for c in SERIES_COLUMNS):
+            return []
+        started = time.perf_counter()
+        days = df['点评时间'].dt.normalize()
+        daily = df.groupby(SERIES_COLUMNS + [days], observed=True).size().sort_index(level=-1, kind='stable')
+
+        new_events = []
+        with self._lock:
+            for (scenic, issue_type, day), count in daily.items():
+                state = self.series.setdefault((scenic, issue_type), SeriesState())
+                new_events.extend(self._add_day(state, scenic, issue_type, day, int(count)))
+                if self.latest_day is None or day > self.latest_day:
+                    self.latest_day = day
+            self.events.extend(new_events)
+        logger.info("anomaly update: series-days=%d events=%d in %.1f ms",
+                    len(daily), len(new_events), (time.perf_counter() - started) * 1000)
+        return new_events
+
+    def _add_day(self, state, scenic, issue_type, day, count):
+        if state.open_day is None:
+            state.open_day, state.open_count = day, count
+            return []
+        if day < state.open_day:
+            state.late_rows += count
+            return []
+        if day == state.open_day:
+            state.open_count += count
+            return []
+
+        # 出现更晚的日期：最新一天结束，计入基线；中间没有评论的日子按零计数
+        events = []
+        event = self._step(state, scenic, issue_type, state.open_day, state.open_count)
+        if event:
+            events.append(event)
+        gap = (day - state.open_day).days - 1
+        for _ in range(min(gap, MAX_GAP_DAYS)):
+            self._step(state, scenic, issue_type, None, 0)
+        state.open_day, state.open_count = day, count
+        return events
+
+    @staticmethod
+    def _score(state, count):
+        std = max(math.sqrt(state.var), MIN_STD)
+        return (count - state.mean) / std
+
+    def _step(self, state, scenic, issue_type, day, count):
+        """ 用一天的计数更新 EWMA 基线和 CUSUM，达到阈值时返回异常事件 """
+        event = None
+        if state.days >= WARMUP_DAYS:
+            z = self._score(state, count)
+            state.cusum = max(0.0, state.cusum + z - CUSUM_DRIFT)
+            if count >= MIN_COUNT and (z >= Z_THRESHOLD or state.cusum >= CUSUM_THRESHOLD):
+                kind = '突增' if z >= Z_THRESHOLD else '持续上升'
+                event = AnomalyEvent(scenic, issue_type, day, count, state.mean, z, kind)
+                state.cusum = 0.0
+
+        diff = count - state.mean
+        increment = EWMA_ALPHA * diff
+        state.mean += increment
+        state.var = (1 - EWMA_ALPHA) * (state.var + diff * increment)
+        state.days += 1
+        return event
+
+    def current_anomalies(self, recent_days=RECENT_DAYS):
+        """
+        当前处于异常状态的序列：最近 recent_days 天内出现过异常，或最新一天（尚未结束）的计数已超过阈值。
+
+        Returns:
+            pd.DataFrame: 景区名称、核心问题类型、日期、当日评论数、基线、z 分数、类型，按 z 分数降序。
+        """
+        with self._lock:
+            if self.latest_day is None:
+                return pd.DataFrame(columns=['景区名称', '核心问题类型', '日期', '当日评论数', '基线', 'z 分数', '类型'])
+            since = self.latest_day - pd.Timedelta(days=recent_days)
+            events = [e for e in self.events if e.day >= since]
+            for (scenic, issue_type), state in self.series.items():
+                if state.days < WARMUP_DAYS or state.open_day < since:
+                    continue
+                z = self._score(state, state.open_count)
+                if state.open_count >= MIN_COUNT and z >= Z_THRESHOLD:
+                    events.append(AnomalyEvent(scenic, issue_type, state.open_day, state.open_count,
+                                               state.mean, z, '突增（当日）'))
+
+        rows = [{
+            '景区名称': e.scenic, '核心问题类型': e.issue_type, '日期': e.day.date(),
+            '当日评论数': e.count, '基线': round(e.baseline, 1), 'z 分数': round(e.z, 1), '类型': e.kind,
+        } for e in events]
+        return pd.DataFrame(rows, columns=['景区名称', '核心问题类型', '日期', '当日评论数', '基线', 'z 分数', '类型']) \
+            .sort_values('z 分数', ascending=False).reset_index(drop=True)
+
+    def spike_months(self, scenic=None, issue_types=None):
+        """
+        统计每个月份出现异常的天数，用于在月度趋势图上标记。
+
+        Returns:
+            dict: {月份: 异常天数}
+        """
+        with self._lock:
+            events = list(self.events)
+        counts = Counter(
+            e.day.month for e in events
+            if (scenic is None or e.scenic == scenic) and (issue_types is None or e.issue_type in issue_types)
+        )
+        return dict(counts)
@@ -0,0 +1,276 @@
+# /utils/cache_registry.py
+"""
+进程级内存缓存的统一登记与全局内存预算。
+
+各模块通过 get_cache(name) 取得一个 ManagedCache（筛选结果、词云掩码等），放入缓存的每个对象都估算字节数，
+所有可淘汰的缓存共用一个内存预算 CACHE_BUDGET_MB。超出预算时按代价感知的 LRU（GreedyDual-Size）淘汰：
+每个条目的优先级为 全局时钟 + 重新计算的耗时 / 字节数，访问时刷新；淘汰优先级最低的条目，并把时钟推进到该优先级。
+重算代价相同时退化为普通 LRU；体积大而重算便宜的条目先被淘汰，体积小而重算昂贵的条目保留更久。
+
+不可淘汰的常驻对象（如看板的完整数据集）用 pin() 登记大小，只计入统计中的总量，不占用缓存预算，也不参与淘汰：
+否则数据集接近预算时所有缓存都会放不进任何条目。
+get_stats() / cache_rows() 给出每个缓存的条目数、字节数、命中率和淘汰次数。本模块不依赖 Streamlit。
+"""
+
+import heapq
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_BUDGET_BYTES = int(float(os.environ.get("CACHE_BUDGET_MB", "1024")) * 1024 * 1024)
+MIN_COST_MS = 0.01  # 未记录重算耗时的条目按该代价计算优先级
+SIZE_SAMPLE_ROWS = 1000  # 估算字符串列大小时抽样的行数
+
+# 进程级共享：所有缓存的条目、常驻对象和淘汰用的优先级堆共用一把锁
+_lock = threading.RLock()
+_caches = {}
+_pinned = {}
+_heap = []  # (优先级, 序号, 缓存名, 键)，条目被访问后旧的堆项作废，淘汰时跳过
+_state = {"clock": 0.0, "bytes": 0, "seq": 0}
+
+
+# --- 大小估算 ---
+
+def estimate_bytes(value):
+    """
+    估算对象占用的内存字节数。
+
+    NumPy 数组取 nbytes；DataFrame / Series 的数值列取 nbytes，字符串等对象列抽样估算
+    （对千万行数据做 deep=True 的精确统计太慢）；容器递归累加；其余对象取 sys.getsizeof。
+    """
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    # 不主动导入 pandas：还没导入时，value 也不可能是 pandas 对象
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(value, pd.DataFrame):
+        return int(value.index.nbytes) + sum(_series_bytes(value[c]) for c in value.columns)
+    if pd is not None and isinstance(value, pd.Series):
+        return int(value.index.nbytes) + _series_bytes(value)
+    if isinstance(value, (str, bytes, bytearray)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_bytes(k) + estimate_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _series_bytes(series):
+    values = series.array
+    # object 列和 Python 存储的 StringDtype 列的 nbytes 只含指针，字符串本身要抽样估算；Arrow 存储的 nbytes 已是实际大小
+    if series.dtype != object and getattr(series.dtype, "storage", None) != "python":
+        return int(values.nbytes)
+    n = len(values)
+    if n == 0:
+        return 0
+    sample = values[np.linspace(0, n - 1, min(n, SIZE_SAMPLE_ROWS), dtype=np.int64)]
+    per_item = sum(sys.getsizeof(v) for v in sample) / len(sample)
+    return int(values.nbytes + per_item * n)
+
+
+# --- 缓存 ---
+
+class ManagedCache:
+    """
+    登记在全局预算下的键值缓存，线程安全。
+
+    max_entries 为该缓存自身的条目上限（超出时淘汰其中最久未访问的条目），不设时只受全局内存预算约束。
+    """
+
+    def __init__(self, name, max_entries=None):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # 键 -> 条目 dict，按最近访问排序
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+
+    def get(self, key, default=None):
+        with _lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            _schedule(self, key, entry)
+            return entry["value"]
+
+    def put(self, key, value, cost_ms=None, nbytes=None):
+        """
+        放入一个条目。cost_ms 为重新计算它的耗时，nbytes 不传时自动估算。
+
+        Returns:
+            bool: 是否放入；单个条目超过缓存预算时不缓存。
+        """
+        nbytes = estimate_bytes(value) if nbytes is None else int(nbytes)
+        with _lock:
+            self._remove(key)
+            if nbytes > CACHE_BUDGET_BYTES:
+                self.rejected += 1
+                if CACHE_BUDGET_BYTES <= 0:
+                    _warn_no_budget()
+                else:
+                    logger.info("%s: entry of %.1f MB exceeds cache budget, not cached",
+                                self.name, nbytes / 1024 / 1024)
+                return False
+            entry = {"value": value, "bytes": nbytes, "cost_ms": max(cost_ms or 0.0, MIN_COST_MS)}
+            self._entries[key] = entry
+            self.bytes += nbytes
+            _state["bytes"] += nbytes
+            _schedule(self, key, entry)
+            if self.max_entries is not None:
+                while len(self._entries) > self.max_entries:
+                    self._evict(next(iter(self._entries)))
+            _enforce_budget()
+            return True
+
+    def get_or_compute(self, key, compute):
+        """ 命中时返回缓存的值；否则调用 compute()，以其耗时作为重算代价放入缓存 """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is not sentinel:
+            return value
+        started = time.perf_counter()
+        value = compute()
+        self.put(key, value, cost_ms=(time.perf_counter() - started) * 1000)
+        return value
+
+    def pop(self, key):
+        with _lock:
+            entry = self._remove(key)
+        return None if entry is None else entry["value"]
+
+    def clear(self):
+        with _lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"cache": self.name, "entries": len(self._entries), "bytes": self.bytes,
+                "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+                "evictions": self.evictions, "rejected": self.rejected}
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry["bytes"]
+            _state["bytes"] -= entry["bytes"]
+        return entry
+
+    def _evict(self, key):
+        entry = self._remove(key)
+        if entry is not None:
+            self.evictions += 1
+        return entry
+
+
+def get_cache(name, max_entries=None):
+    """ 取得（首次调用时创建并登记）名为 name 的缓存 """
+    with _lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = ManagedCache(name, max_entries)
+        return cache
+
+
+def _schedule(cache, key, entry):
+    """ 按 GreedyDual-Size 计算条目的新优先级并压入堆 """
+    _state["seq"] += 1
+    entry["seq"] = _state["seq"]
+    entry["priority"] = _state["clock"] + entry["cost_ms"] / max(entry["bytes"], 1)
+    heapq.heappush(_heap, (entry["priority"], entry["seq"], cache.name, key))
+    if len(_heap) > 4 * max(sum(len(c) for c in _caches.values()), 64):
+        _rebuild_heap()
+
+
+def _rebuild_heap():
+    """ 丢弃已作废的堆项 """
+    _heap[:] = [(e["priority"], e["seq"], c.name, k) for c in _caches.values() for k, e in c._entries.items()]
+    heapq.heapify(_heap)
+
+
+def _enforce_budget():
+    """ 缓存总量超出预算时，淘汰优先级最低的条目，直到回到预算以内 """
+    while _state["bytes"] > CACHE_BUDGET_BYTES and _heap:
+        priority, seq, name, key = heapq.heappop(_heap)
+        cache = _caches.get(name)
+        entry = cache._entries.get(key) if cache is not None else None
+        if entry is None or entry["seq"] != seq:
+            continue
+        _state["clock"] = priority
+        cache._evict(key)
+        logger.debug("evicted %s entry (%.1f KB, cost %.1f ms)", name, entry["bytes"] / 1024, entry["cost_ms"])
+
+
+# --- 常驻对象 ---
+
+def _warn_no_budget():
+    # 每个进程只提示一次，之后的放入照常拒绝
+    if not _state.get("warned"):
+        _state["warned"] = True
+        logger.warning("cache budget is %.0f MB, nothing will be cached (set CACHE_BUDGET_MB)",
+                       CACHE_BUDGET_BYTES / 1024 / 1024)
+
+
+def pin(name, nbytes):
+    """ 登记（或更新）一个不可淘汰的常驻对象的大小，只计入统计，不占用缓存预算 """
+    with _lock:
+        _pinned[name] = int(nbytes)
+
+
+def unpin(name):
+    with _lock:
+        _pinned.pop(name, None)
+
+
+def _pinned_bytes():
+    return sum(_pinned.values())
+
+
+# --- 统计 ---
+
+def get_stats():
+    """
+    Returns:
+        dict: budget_bytes（缓存预算）、pinned（常驻对象 -> 字节数）、cached_bytes、
+        total_bytes（缓存与常驻对象之和）和 caches（各缓存的统计）。
+    """
+    with _lock:
+        return {"budget_bytes": CACHE_BUDGET_BYTES, "pinned": dict(_pinned), "cached_bytes": _state["bytes"],
+                "total_bytes": _state["bytes"] + _pinned_bytes(),
+                "caches": [c.stats() for _, c in sorted(_caches.items())]}
+
+
+def cache_rows():
+    """ 每个缓存一行（条目数、大小、命中率、淘汰次数），常驻对象也各占一行，供性能面板和压测输出 """
+    stats = get_stats()
+    rows = [dict(s, size_mb=round(s["bytes"] / 1024 / 1024, 2)) for s in stats["caches"]]
+    rows += [{"cache": name, "entries": 1, "bytes": nbytes, "size_mb": round(nbytes / 1024 / 1024, 2), "pinned": True}
+             for name, nbytes in sorted(stats["pinned"].items())]
+    return rows
+
+
+def clear():
+    """ 清空所有缓存（不影响常驻对象的登记） """
+    with _lock:
+        for cache in _caches.values():
+            cache.clear()
+        _heap.clear()
@@ -1,30 +1,28 @@
 # /utils/charts.py
+import logging
+import os
+
 from pyecharts import options as opts
 from pyecharts.charts import Map, Bar, Radar, Line, Pie, Funnel
 from pyecharts.globals import ThemeType
-import streamlit.components.v1 as components
 import pandas as pd
-import streamlit as st
-import jieba
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import os
+
+from utils import analytics, perf, text_features
+
+logger = logging.getLogger(__name__)
 
 # --- 主题和颜色配置 ---
 CHART_THEME = ThemeType.DARK
 TEXT_COLOR = "#FFFFFF"
 ACCENT_COLOR = "#4CAF50"
 
-china_provinces = [
-    "北京市","天津市","上海市","重庆市","河北省","山西省","辽宁省","吉林省","黑龙江省",
-    "江苏省","浙江省","安徽省","福建省","江西省","山东省","河南省","湖北省","湖南省",
-    "广东省","海南省","四川省","贵州省","云南省","陕西省","甘肃省","青海省",
-    "台湾省","内蒙古自治区","广西壮族自治区","西藏自治区","宁夏自治区","新疆维吾尔自治区","香港特别行政区","澳门特别行政区"
-]
+# 地图按省份补齐的顺序，与 analytics 中一致
+china_provinces = analytics.CHINA_PROVINCES
 
+@perf.timed()
 def create_china_heatmap(df: pd.DataFrame):
     """根据各景区的舆情数生成中国地图热力图"""
-    province_reviews = df.groupby('省份').size().reindex(china_provinces, fill_value=0).reset_index()
+    province_reviews = analytics.province_counts(df).reset_index()
     province_reviews .columns = ["省份", "舆情数"]
     data_pairs = list(zip(province_reviews['省份'], province_reviews['舆情数']))
 
@@ -59,9 +57,10 @@ def create_china_heatmap(df: pd.DataFrame):
     return map_chart
 
 
+@perf.timed()
 def create_scenic_reviews_bar(df: pd.DataFrame):
     """创建各景区舆情数柱状图"""
-    scenic_counts = df['景区名称'].value_counts().sort_values(ascending=True)
+    scenic_counts = analytics.scenic_counts(df, ascending=True)
 
     bar_chart = (
         Bar(init_opts=opts.InitOpts(theme=CHART_THEME, bg_color="transparent"))
@@ -94,12 +93,13 @@ def create_scenic_reviews_bar(df: pd.DataFrame):
     return bar_chart
 
 
+@perf.timed()
 def create_scenic_quantity_radar(df: pd.DataFrame):
     """
     创建一个新的雷达图，维度为所有景区，展现各景区的舆情数量。
     """
     # 1. 计算每个景区的舆情数
-    scenic_counts = df['景区名称'].value_counts()
+    scenic_counts = analytics.scenic_counts(df)
 
     # 2. 创建雷达图的 schema (维度)
     # 每个维度是一个字典，包含名称和该维度的最大值
@@ -158,9 +158,19 @@ def create_scenic_quantity_radar(df: pd.DataFrame):
         )
     )
     return radar_chart
-def create_monthly_reviews_line(df: pd.DataFrame):
-    """创建月度舆情数量折线图"""
-    monthly_counts = df['月份'].value_counts().sort_index()
+def spike_mark_points(monthly_counts, spike_months):
+    """ 把异常检测得到的 {月份: 异常天数} 转换为折线图上的标记点 """
+    return [
+        opts.MarkPointItem(name="异常", coord=[f"{m}月", int(monthly_counts[m])], value=f"异常{n}天",
+                           symbol_size=40, itemstyle_opts=opts.ItemStyleOpts(color="#E53935"))
+        for m, n in sorted((spike_months or {}).items()) if m in monthly_counts.index
+    ]
+
+
+@perf.timed()
+def create_monthly_reviews_line(df: pd.DataFrame, spike_months=None):
+    """创建月度舆情数量折线图，spike_months 为 {月份: 异常天数} 时在对应月份标出异常"""
+    monthly_counts = analytics.monthly_counts(df)
 
     line_chart = (
         Line(init_opts=opts.InitOpts(theme=CHART_THEME, bg_color="transparent"))
@@ -169,7 +179,8 @@ def create_monthly_reviews_line(df: pd.DataFrame):
             "舆情数",
             monthly_counts.values.tolist(),
             is_smooth=True,
-            markpoint_opts=opts.MarkPointOpts(data=[opts.MarkPointItem(type_="max"), opts.MarkPointItem(type_="min")]),
+            markpoint_opts=opts.MarkPointOpts(data=[opts.MarkPointItem(type_="max"), opts.MarkPointItem(type_="min")]
+                                              + spike_mark_points(monthly_counts, spike_months)),
             markline_opts=opts.MarkLineOpts(data=[opts.MarkLineItem(type_="average")]),
         )
         .set_global_opts(
@@ -190,9 +201,10 @@ def create_monthly_reviews_line(df: pd.DataFrame):
     return line_chart
 
 
+@perf.timed()
 def create_issue_details_horizontal_bar(df: pd.DataFrame):
     """创建问题细项水平条形图"""
-    detail_counts = df['问题细项'].value_counts().sort_values(ascending=False).head(10)
+    detail_counts = analytics.top_issue_details(df, 10)
 
     bar_chart = (
         Bar(init_opts=opts.InitOpts(theme=CHART_THEME, bg_color="transparent"))
@@ -213,9 +225,10 @@ def create_issue_details_horizontal_bar(df: pd.DataFrame):
     return bar_chart
 
 
+@perf.timed()
 def create_platform_pie(df: pd.DataFrame):
     """创建平台来源饼图"""
-    platform_counts = df['平台'].value_counts()
+    platform_counts = analytics.platform_counts(df)
     data_pair = [[platform, count] for platform, count in platform_counts.items()]
 
     pie_chart = (
@@ -240,9 +253,10 @@ def create_platform_pie(df: pd.DataFrame):
     return pie_chart
 
 
+@perf.timed()
 def create_sentiment_pie(df: pd.DataFrame):
     """创建情感强度饼图"""
-    sentiment_counts = df['情感强度'].value_counts()
+    sentiment_counts = analytics.sentiment_counts(df)
     data_pair = [[sentiment, count] for sentiment, count in sentiment_counts.items()]
     pie_chart = (
         Pie(init_opts=opts.InitOpts(theme=CHART_THEME, bg_color="transparent", width="300px", height="300px"))
@@ -265,19 +279,11 @@ def create_sentiment_pie(df: pd.DataFrame):
     return pie_chart
 
 
-import pandas as pd
-import jieba
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import os
-import streamlit as st
-import numpy as np
-from PIL import Image
-
-
-def create_scenic_issue_bar(df: pd.DataFrame):
-    """为特定景区创建按问题内容的柱状图"""
-    issue_counts = df['核心问题类型'].value_counts()
+@perf.timed()
+def create_scenic_issue_bar(df: pd.DataFrame, issue_counts=None):
+    """为特定景区创建按问题内容的柱状图，issue_counts 为筛选结果缓存中已算好的计数时直接使用"""
+    if issue_counts is None:
+        issue_counts = analytics.issue_type_counts(df)
 
     bar_chart = (
         Bar(init_opts=opts.InitOpts(theme=CHART_THEME, bg_color="transparent"))
@@ -298,13 +304,18 @@ def create_scenic_issue_bar(df: pd.DataFrame):
     return bar_chart
 
 
-def create_scenic_timeline(df: pd.DataFrame):
-    """为特定景区创建按时间的折线图"""
+@perf.timed()
+def create_scenic_timeline(df: pd.DataFrame, spike_months=None, monthly_counts=None):
+    """
+    为特定景区创建按时间的折线图，spike_months 为 {月份: 异常天数} 时在对应月份标出异常，
+    monthly_counts 为筛选结果缓存中已算好的月度计数时直接使用
+    """
     # 确保'月份'列存在
     if '月份' not in df.columns:
         return None
 
-    monthly_counts = df['月份'].value_counts().sort_index()
+    if monthly_counts is None:
+        monthly_counts = analytics.monthly_counts(df)
 
     line_chart = (
         Line(init_opts=opts.InitOpts(theme=CHART_THEME, bg_color="transparent"))
@@ -313,6 +324,7 @@ def create_scenic_timeline(df: pd.DataFrame):
             "舆情数",
             monthly_counts.values.tolist(),
             is_smooth=True,
+            markpoint_opts=opts.MarkPointOpts(data=spike_mark_points(monthly_counts, spike_months)),
             linestyle_opts=opts.LineStyleOpts(width=3, color=ACCENT_COLOR),
             itemstyle_opts=opts.ItemStyleOpts(color=ACCENT_COLOR)
         )
@@ -329,8 +341,9 @@ def create_scenic_timeline(df: pd.DataFrame):
     return line_chart
 
 
+@perf.timed()
 def get_or_create_wordcloud_image(df: pd.DataFrame, scenic_name: str, font_path='assets/simhei.ttf',
-                                  output_dir='assets/wordclouds', mask_image=None):
+                                  output_dir='assets/wordclouds', mask_image=None, dedup=False, mask_path=None):
     """
     检查词云图图片是否存在。如果不存在，则生成并保存；然后返回图片路径。
 
@@ -339,71 +352,32 @@ def get_or_create_wordcloud_image(df: pd.DataFrame, scenic_name: str, font_path=
         scenic_name (str): 当前景区的名称，用于命名文件和筛选数据。
         font_path (str): 字体文件路径。
         output_dir (str): 保存生成图片的目录。
+        dedup (bool): 是否只统计非近似重复的评论。
+        mask_path (str): 形状掩码图片路径；只在需要重新绘制时才读取（mask_image 为空时使用）。
 
     Returns:
-        str: 生成的词云图图片的路径，如果失败则返回 None。
+        str: 生成的词云图图片的路径；没有评论内容或绘制失败时返回 None（原因写入日志）。
     """
     # 1. 定义输出路径并确保目录存在
     os.makedirs(output_dir, exist_ok=True)
-    image_path = os.path.join(output_dir, f"{scenic_name}.png")
+    image_path = text_features.wordcloud_image_path(scenic_name, output_dir, dedup)
 
     # 2. 检查图片是否已存在，如果存在则直接返回路径
     if os.path.exists(image_path):
+        perf.record_cache("wordcloud_image", True)
         return image_path
+    perf.record_cache("wordcloud_image", False)
 
-    # 筛选当前景区数据并准备文本
-    df_scenic = df[df['景区名称'] == scenic_name]
-    if '内容' not in df_scenic.columns or df_scenic['内容'].dropna().empty:
-        st.warning(f"“{scenic_name}”没有评论内容，无法生成词云图。")
+    # 读取该景区的词频（已保存的词频会随新追加的评论增量更新，无需重新分词）
+    word_counts = text_features.get_word_counts(df, scenic_name, dedup=dedup)
+    if not word_counts:
+        logger.warning("no review text for %s, word cloud skipped", scenic_name)
         return None
 
-    text = " ".join(review for review in df_scenic['内容'].astype(str).dropna())
-    if not text.strip():
-        return None
-
-    # 分词
-    word_list = jieba.cut(text, cut_all=False)
-    words = " ".join(word_list)
-
-    with open('assets/hit_stopwords.txt', 'r', encoding='utf-8') as f:
-        stopwords = f.read().splitlines()
-
-    # 创建词云图对象
-    wc = WordCloud(
-        font_path=font_path,
-        background_color="rgba(255, 255, 255, 0)",
-        mode="RGB",
-        width=800,
-        height=500,
-        max_words=150,
-        stopwords=stopwords,  # 停用词
-        mask=mask_image,  # 形状掩码
-        colormap='viridis',
-        contour_width = 1,  # 轮廓宽度
-        contour_color = 'steelblue',  # 轮廓颜色
-        collocations = False,  # 不考虑词语搭配
-        prefer_horizontal = 0.7,  # 水平词语比例
-        scale = 2,  # 缩放比例以提高清晰度
-        min_font_size = 10,  # 最小字体大小
-        max_font_size = 200,  # 最大字体大小
-        random_state = 42  # 随机种子以确保可重复性
-    )
-
-    # 生成词云
-    wc.generate(words)
-
-    # 使用 matplotlib 绘制并保存
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.imshow(wc, interpolation='bilinear')
-    ax.axis('off')
-
     try:
-        # 保存图像，bbox_inches='tight' 和 pad_inches=0 可以去除白边
-        # transparent=True 使背景透明
-        fig.savefig(image_path, format='png', transparent=True, bbox_inches='tight', pad_inches=0)
-        plt.close(fig)  # 关闭图像，释放内存
-        return image_path
-    except Exception as e:
-        st.error(f"保存词云图失败: {e}")
-        plt.close(fig)
-        return None
\ No newline at end of file
+        if mask_image is None and mask_path:
+            mask_image = text_features.load_mask(mask_path)
+        return text_features.render_wordcloud(word_counts, image_path, font_path, mask_image)
+    except Exception:
+        logger.exception("failed to render word cloud for %s", scenic_name)
+        return None
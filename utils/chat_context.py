@@ -0,0 +1,205 @@
+# /utils/chat_context.py
+
+import logging
+import re
+
+
+logger = logging.getLogger(__name__)
+
+# --- 上下文预算配置 ---
+MAX_PROMPT_TOKENS = 6000      # 整个提示词（系统提示 + 摘要 + 历史）的上限
+REPORT_TOKEN_BUDGET = 2500    # 系统提示中报告节选的上限
+SUMMARY_TOKEN_BUDGET = 600    # 滚动摘要的上限
+KEEP_LAST_TURNS = 4           # 原样保留的最近对话轮数（一问一答为一轮）
+MESSAGE_OVERHEAD_TOKENS = 4   # 每条消息的角色/分隔符开销
+
+SYSTEM_PROMPT_TEMPLATE = (
+    "你是一个专业的景区舆情分析师。你已经分析了一份评论数据，并生成了以下的分析报告{note}：\n\n"
+    "---报告开始---\n{report}\n---报告结束---\n\n"
+    "现在，请根据这份报告和你的专业知识，回答用户的问题。"
+)
+SUMMARY_PROMPT_TEMPLATE = "以下是此前对话的摘要，供你参考：\n{summary}"
+RETRIEVAL_PROMPT_TEMPLATE = "以下是从结构化评论数据中检索到的与当前问题相关的统计和评论，请优先依据这些数据作答：\n{context}"
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+_HEADING_PATTERN = re.compile(r"^\s{0,3}#{1,6}\s+\S", re.MULTILINE)
+
+
+def estimate_tokens(text):
+    """
+    估算文本的 token 数。
+    中文按每字 1 个 token 计，其余字符按约 4 个字符 1 个 token 计，结果偏保守。
+    """
+    if not text:
+        return 0
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    other_count = len(text) - cjk_count
+    return cjk_count + (other_count + 3) // 4
+
+
+def count_message_tokens(messages):
+    """ 估算一组对话消息的 token 总数 """
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def split_report_sections(report):
+    """
+    按 Markdown 标题把报告切分为若干节；没有标题时按空行分段。
+    返回 [(标题, 正文), ...]，标题为空字符串表示开头的无标题部分。
+    """
+    if not report:
+        return []
+
+    starts = [m.start() for m in _HEADING_PATTERN.finditer(report)]
+    if starts:
+        if starts[0] != 0:
+            starts.insert(0, 0)
+        bounds = starts + [len(report)]
+        chunks = [report[bounds[i]:bounds[i + 1]].strip() for i in range(len(starts))]
+    else:
+        chunks = [p.strip() for p in re.split(r"\n\s*\n", report)]
+
+    sections = []
+    for chunk in chunks:
+        if not chunk:
+            continue
+        first_line = chunk.splitlines()[0]
+        title = first_line.lstrip("# ").strip() if first_line.lstrip().startswith("#") else ""
+        sections.append((title, chunk))
+    return sections
+
+
+def _keywords(text):
+    """ 用 jieba 分词得到长度大于 1 的关键词集合 """
+    import jieba
+
+    return {w for w in jieba.cut_for_search(text) if len(w.strip()) > 1}
+
+
+def trim_report(report, question, budget=REPORT_TOKEN_BUDGET):
+    """
+    在预算内选出与问题最相关的报告章节，保持原有顺序。
+    报告本身未超预算时原样返回。
+
+    Returns:
+        tuple: (节选后的报告文本, 是否发生了裁剪)
+    """
+    if estimate_tokens(report) <= budget:
+        return report, False
+
+    sections = split_report_sections(report)
+    query_words = _keywords(question or "")
+
+    scored = []
+    for idx, (title, body) in enumerate(sections):
+        words = _keywords(body)
+        overlap = len(query_words & words)
+        # 标题命中的权重更高；开头的概述节在同分时优先
+        title_hits = len(query_words & _keywords(title)) if title else 0
+        scored.append((overlap + 2 * title_hits, -idx, idx))
+    scored.sort(reverse=True)
+
+    chosen, used = [], 0
+    for _, _, idx in scored:
+        cost = estimate_tokens(sections[idx][1])
+        if used + cost > budget:
+            continue
+        chosen.append(idx)
+        used += cost
+
+    if not chosen:
+        # 单个章节就超出预算时，截取最相关章节的开头部分
+        best = sections[scored[0][2]][1]
+        return best[:budget], True
+
+    return "\n\n".join(sections[i][1] for i in sorted(chosen)), True
+
+
+def _brief(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def fold_into_summary(summary, messages, budget=SUMMARY_TOKEN_BUDGET):
+    """
+    把较早的对话消息折叠进滚动摘要。
+    每条消息只保留开头的要点；摘要超出预算时丢弃最早的条目。
+    """
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        prefix = "用户问" if message["role"] == "user" else "助手答"
+        limit = 60 if message["role"] == "user" else 120
+        lines.append(f"- {prefix}：{_brief(message['content'], limit)}")
+
+    while lines and estimate_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def build_chat_messages(report, chat_messages, summary_state, question=None, retrieved_context=None):
+    """
+    组装发送给大模型的消息列表。
+
+    - 报告只保留与当前问题相关的章节；
+    - 最近 KEEP_LAST_TURNS 轮对话原样保留；
+    - 更早的对话折叠进滚动摘要，超出总预算时继续折叠。
+
+    Args:
+        report (str): 分析报告全文。
+        chat_messages (list): 完整对话历史（最后一条为当前用户问题）。
+        summary_state (dict): 滚动摘要状态 {"text": str, "upto": int}，
+            upto 为已经折叠进摘要的历史消息条数。
+        question (str): 当前问题，默认取最后一条用户消息。
+        retrieved_context (str): 从结构化数据中检索到的上下文，可选。
+
+    Returns:
+        tuple: (消息列表, 更新后的摘要状态, token 统计字典)
+    """
+    if question is None:
+        question = next((m["content"] for m in reversed(chat_messages) if m["role"] == "user"), "")
+
+    summary_text = summary_state.get("text", "")
+    upto = summary_state.get("upto", 0)
+
+    # 超出保留轮数的消息依次折叠进摘要
+    keep_from = max(upto, len(chat_messages) - 2 * KEEP_LAST_TURNS)
+    if keep_from > upto:
+        summary_text = fold_into_summary(summary_text, chat_messages[upto:keep_from])
+        upto = keep_from
+
+    report_text, trimmed = trim_report(report or "", question)
+    system_message = {
+        "role": "system",
+        "content": SYSTEM_PROMPT_TEMPLATE.format(note="（节选）" if trimmed else "", report=report_text),
+    }
+
+    while True:
+        messages = [system_message]
+        if retrieved_context:
+            messages.append({"role": "system", "content": RETRIEVAL_PROMPT_TEMPLATE.format(context=retrieved_context)})
+        if summary_text:
+            messages.append({"role": "system", "content": SUMMARY_PROMPT_TEMPLATE.format(summary=summary_text)})
+        messages.extend(chat_messages[upto:])
+
+        total = count_message_tokens(messages)
+        # 至少保留当前这条用户消息
+        if total <= MAX_PROMPT_TOKENS or upto >= len(chat_messages) - 1:
+            break
+        summary_text = fold_into_summary(summary_text, chat_messages[upto:upto + 1])
+        upto += 1
+
+    stats = {
+        "total": total,
+        "report": estimate_tokens(report_text),
+        "summary": estimate_tokens(summary_text),
+        "retrieval": estimate_tokens(retrieved_context or ""),
+        "history": count_message_tokens(chat_messages[upto:]),
+        "verbatim_messages": len(chat_messages) - upto,
+        "report_trimmed": trimmed,
+    }
+    logger.info(
+        "chat prompt tokens: total=%d report=%d retrieval=%d summary=%d history=%d verbatim_messages=%d",
+        stats["total"], stats["report"], stats["retrieval"], stats["summary"], stats["history"],
+        stats["verbatim_messages"],
+    )
+    return messages, {"text": summary_text, "upto": upto}, stats
@@ -0,0 +1,224 @@
+# /utils/circuit_breaker.py
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from tenacity import Retrying, retry_if_result, stop_never, wait_exponential
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """ 熔断器处于打开状态时拒绝请求 """
+
+    def __init__(self, name, retry_in):
+        self.retry_in = retry_in
+        super().__init__(f"{name} 当前不可用，约 {retry_in:.0f} 秒后重试")
+
+
+class CircuitBreaker:
+    """
+    进程级共享的熔断器。
+
+    - 关闭（closed）：请求正常放行，请求连续失败或健康探测连续失败达到阈值后打开；
+      两者分别计数，探测成功只清零探测失败：服务能响应 /health 但分析请求一直超时时，仍会打开；
+    - 打开（open）：请求立即失败，打开时长按指数退避增长；
+    - 半开（half_open）：打开时长到期或健康探测成功后，只放行一个试探请求，
+      成功则关闭，失败则再次打开。
+
+    可选的后台健康探测线程会定期探测服务；探测使用对冲请求，
+    第一个请求在 hedge_delay 内未返回时再发一个，取先成功的结果。
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=5.0, max_reset_timeout=120.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0  # 请求连续失败次数
+        self._probe_failures = 0  # 健康探测连续失败次数
+        self._open_count = 0
+        self._opened_at = 0.0
+        self._open_duration = 0.0
+        self._trial_in_flight = False
+        self._last_error = None
+        self._last_probe = None  # {"ok": bool, "latency_ms": float, "at": float}
+
+        self._probe_thread = None
+        self._stop_event = threading.Event()
+
+    # --- 状态机 ---
+
+    def _open(self, error):
+        self._state = OPEN
+        self._open_count += 1
+        self._opened_at = time.monotonic()
+        self._open_duration = min(self.reset_timeout * 2 ** (self._open_count - 1), self.max_reset_timeout)
+        self._trial_in_flight = False
+        self._last_error = error
+        logger.warning("circuit %s opened for %.1fs: %s", self.name, self._open_duration, error)
+
+    def _retry_in(self):
+        return max(0.0, self._opened_at + self._open_duration - time.monotonic())
+
+    def allow_request(self):
+        """ 判断当前是否放行请求；打开状态到期后转为半开并放行一个试探请求 """
+        with self._lock:
+            if self._state == OPEN and self._retry_in() <= 0:
+                self._state = HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("circuit %s closed", self.name)
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_failures = 0
+            self._open_count = 0
+            self._trial_in_flight = False
+            self._last_error = None
+
+    def record_failure(self, error):
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error)
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open(str(error))
+
+    def call(self, func, *args, is_failure=None, **kwargs):
+        """
+        在熔断器保护下调用 func。
+
+        Args:
+            is_failure: 可选的判定函数，返回值被判定为失败时计入失败次数。
+        Raises:
+            CircuitOpenError: 熔断器打开时立即抛出，不会调用 func。
+        """
+        if not self.allow_request():
+            with self._lock:
+                retry_in = self._retry_in()
+            raise CircuitOpenError(self.name, retry_in)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        if is_failure is not None and is_failure(result):
+            self.record_failure(f"unhealthy result: {result!r}"[:200])
+        else:
+            self.record_success()
+        return result
+
+    # --- 后台健康探测 ---
+
+    def _on_probe(self, ok, latency_ms, error=None):
+        with self._lock:
+            self._last_probe = {"ok": ok, "latency_ms": latency_ms, "at": time.time(), "error": error}
+            if ok and self._state == OPEN:
+                # 服务恢复响应：提前进入半开状态，让下一个真实请求试探
+                self._state = HALF_OPEN
+                self._trial_in_flight = False
+                logger.info("circuit %s half-open after successful probe", self.name)
+            elif ok:
+                # 只有连续的探测失败才打开熔断器；探测成功不代表分析请求正常，不清零请求失败次数
+                self._probe_failures = 0
+            elif self._state != OPEN:
+                self._probe_failures += 1
+                self._last_error = error
+                if self._state == HALF_OPEN or self._probe_failures >= self.failure_threshold:
+                    self._open(error or "health probe failed")
+
+    def _hedged_probe(self, probe, executor, hedge_delay):
+        """ 对冲探测：首个探测超过 hedge_delay 未返回时再发一个，任一成功即视为健康 """
+        started = time.perf_counter()
+        futures = {executor.submit(probe)}
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done:
+            futures.add(executor.submit(probe))
+
+        error = None
+        pending = futures
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    if future.result():
+                        self._on_probe(True, (time.perf_counter() - started) * 1000)
+                        return True
+                    error = "health probe returned unhealthy"
+                except Exception as e:
+                    error = str(e)
+        self._on_probe(False, (time.perf_counter() - started) * 1000, error)
+        return False
+
+    def _probe_loop(self, probe, interval, hedge_delay, max_backoff):
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"{self.name}-probe")
+        # 探测失败时按指数退避重试，成功后回到固定间隔
+        retrying = Retrying(
+            retry=retry_if_result(lambda healthy: not healthy),
+            wait=wait_exponential(multiplier=interval, min=interval, max=max_backoff),
+            stop=stop_never,
+            sleep=self._stop_event.wait,
+        )
+        try:
+            while not self._stop_event.is_set():
+                retrying(self._hedged_probe_or_stop, probe, executor, hedge_delay)
+                self._stop_event.wait(interval)
+        finally:
+            executor.shutdown(wait=False)
+
+    def _hedged_probe_or_stop(self, probe, executor, hedge_delay):
+        # 停止时返回 True 以结束重试循环
+        return self._stop_event.is_set() or self._hedged_probe(probe, executor, hedge_delay)
+
+    def start_probe(self, probe, interval=5.0, hedge_delay=0.5, max_backoff=60.0):
+        """
+        启动后台健康探测线程（重复调用无副作用）。
+
+        Args:
+            probe: 无参函数，返回 True 表示服务健康，抛出异常或返回 False 表示不健康。
+        """
+        with self._lock:
+            if self._probe_thread is not None and self._probe_thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._probe_thread = threading.Thread(
+                target=self._probe_loop, args=(probe, interval, hedge_delay, max_backoff),
+                name=f"{self.name}-health", daemon=True
+            )
+            self._probe_thread.start()
+
+    def stop_probe(self):
+        self._stop_event.set()
+
+    def snapshot(self):
+        """ 返回当前状态，供页面展示 """
+        with self._lock:
+            state = self._state
+            if state == OPEN and self._retry_in() <= 0:
+                state = HALF_OPEN
+            return {
+                "name": self.name,
+                "state": state,
+                "failures": self._failures,
+                "probe_failures": self._probe_failures,
+                "retry_in": self._retry_in() if state == OPEN else 0.0,
+                "last_error": self._last_error,
+                "last_probe": dict(self._last_probe) if self._last_probe else None,
+            }
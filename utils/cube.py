@@ -0,0 +1,51 @@
+# /utils/cube.py
+
+import pandas as pd
+
+# 聚合立方体的维度：看板上所有计数类图表都能从它的边际汇总得到
+# 是否重复 用于在原始计数与去除近似重复后的计数之间切换
+CUBE_DIMENSIONS = ['景区名称', '省份', '平台', '核心问题类型', '问题细项', '情感强度', '月份', '是否重复']
+
+
+def build_cube(df):
+    """
+    按所有维度分组计数，得到聚合立方体。
+    立方体的行数只取决于维度取值的组合数，与评论条数无关。
+    """
+    dims = [d for d in CUBE_DIMENSIONS if d in df.columns]
+    if df.empty:
+        return pd.DataFrame(columns=dims + ['count'])
+    return df.groupby(dims, dropna=False, observed=True).size().rename('count').reset_index()
+
+
+def merge_cubes(cube, delta_cube):
+    """ 把增量数据的立方体合并进已有立方体，只需对两个立方体的行做一次分组求和 """
+    if cube is None or cube.empty:
+        return delta_cube
+    if delta_cube.empty:
+        return cube
+    dims = [d for d in CUBE_DIMENSIONS if d in cube.columns]
+    merged = pd.concat([cube, delta_cube], ignore_index=True)
+    return merged.groupby(dims, dropna=False, observed=True)['count'].sum().reset_index()
+
+
+def marginal(cube, dimension, **filters):
+    """
+    计算某个维度的边际计数，可附加等值或取值列表筛选。
+
+    Examples:
+        marginal(cube, '月份', 景区名称='黄山')
+    """
+    subset = cube
+    for column, value in filters.items():
+        if isinstance(value, (list, tuple, set, frozenset)):
+            subset = subset[subset[column].isin(list(value))]
+        else:
+            subset = subset[subset[column] == value]
+    return subset.groupby(dimension, dropna=True)['count'].sum()
+
+
+def cube_metrics(cube):
+    """ 从立方体计算舆情总量、平台数、景区数 """
+    nonzero = cube[cube['count'] > 0]
+    return int(nonzero['count'].sum()), int(nonzero['平台'].nunique()), int(nonzero['景区名称'].nunique())
@@ -1,55 +1,100 @@
 # /utils/data_loader.py
 
-import pandas as pd
 import streamlit as st
-import numpy as np
-import os
-
-# 定义景区和对应省份的映射
-SCENIC_PROVINCE_MAP = {
-    '普陀山': '浙江省', '黄山': '安徽省', '庐山': '江西省', '雁荡山': '浙江省',
-    '泰山': '山东省', '衡山': '湖南省', '华山': '陕西省', '恒山': '山西省',
-    '嵩山': '河南省', '峨眉山': '四川省', '武夷山': '福建省'
-}
-@st.cache_data
+
+from utils import analytics, cube, filter_cache, perf
+from utils.dataset import get_shared_dataset
+from utils.review_store import SCENIC_PROVINCE_MAP
+
+
+@st.cache_resource(show_spinner="正在加载数据...")
+def get_dataset(file_path='data/sentiment_data.csv'):
+    """
+    进程内共享的数据集对象：基础数据只解析一次，之后只增量追加新的数据段。
+    通过 tools.serve 启动时，数据集已在启动预热中加载好，这里直接返回同一个实例。
+    """
+    return get_shared_dataset(file_path)
+
+
+@perf.timed("load_data")
 def load_data(file_path='data/sentiment_data.csv'):
     """
     加载并预处理数据。
-    如果真实数据文件不存在，则加载模拟数据。
+    每次调用都会检查是否有新追加的数据段，有则增量合并。
+    """
+    dataset = get_dataset(file_path)
+    dataset.refresh()
+    return dataset.df
+
+
+@perf.timed("load_cube")
+def load_cube(file_path='data/sentiment_data.csv'):
+    """ 返回与 load_data 同步的聚合立方体 """
+    dataset = get_dataset(file_path)
+    dataset.refresh()
+    return dataset.cube
+
+
+def get_anomaly_detector(file_path='data/sentiment_data.csv'):
+    """ 返回与 load_data 同步的每日评论数异常检测器 """
+    dataset = get_dataset(file_path)
+    dataset.refresh()
+    return dataset.anomaly_detector
+
+
+def drop_near_duplicates(data):
+    """ 去除近似重复的评论，见 analytics.drop_near_duplicates """
+    return analytics.drop_near_duplicates(data)
+
+
+@perf.timed("search_reviews")
+def search_reviews(query, candidates=None, file_path='data/sentiment_data.csv'):
+    """
+    在评论内容中检索关键词，空格分隔表示同时包含，OR 分隔表示包含任一组。
+
+    Args:
+        query (str): 查询字符串，如 "排队 索道" 或 "排队 OR 索道"。
+        candidates (array-like, optional): 只在这些行 ID 中检索，通常是 filter_data 结果的索引。
+
+    Returns:
+        np.ndarray: 按相关度从高到低排列的行 ID。
     """
-    try:
-        df = pd.read_csv(file_path, encoding='utf-8')
-    except UnicodeDecodeError:
-        df = pd.read_csv(file_path, encoding='gbk')
+    dataset = get_dataset(file_path)
+    dataset.refresh()
+    row_ids, _ = dataset.get_search_index().search(query, candidates=candidates)
+    return row_ids
+
+
+def get_cube_metrics(agg_cube):
+    """ 从聚合立方体计算舆情总量、平台数、景区数，无需扫描明细数据 """
+    return cube.cube_metrics(agg_cube)
 
-    # 对真实数据进行预处理
-    df['点评时间'] = pd.to_datetime(df['点评时间'], errors='coerce')
-    df.dropna(subset=['点评时间'], inplace=True)
-    df['月份'] = df['点评时间'].dt.month
-    df['省份'] = df['景区名称'].map(SCENIC_PROVINCE_MAP)
 
-    return df
+@perf.timed("get_total_metrics")
 def get_total_metrics(df):
     """ 计算舆情总量、平台数、景区数 """
-    total_reviews = len(df)
-    platform_count = df['平台'].nunique()
-    scenic_spot_count = df['景区名称'].nunique()
-    return total_reviews, platform_count, scenic_spot_count
+    return analytics.total_metrics(df)
 
 
-def filter_data(df, scenic_spot, platforms, issue_types, sentiment_levels):
+@perf.timed("filter_data")
+def filter_data(df, scenic_spot, platforms, issue_types, sentiment_levels, options=None):
     """
-    根据筛选器条件过滤特定景区页面的数据。
+    根据筛选器条件过滤特定景区页面的数据，保留原索引（行 ID）。
+    筛选条件先规范化为 filter_cache.FilterKey，等价的筛选命中同一条进程级缓存；
+    options 为 字段名 -> 全部可选取值 时，全选的字段按不筛选处理。
     """
-    # 1. 首先筛选出特定景区的数据
-    filtered_df = df[df['景区名称'] == scenic_spot].copy()
+    key = filter_cache.canonical_key(scenic_spot, platforms, issue_types, sentiment_levels, options=options)
+    perf.annotate(scenic_spot=key.scenic_spot, **filter_cache.key_to_params(key))
+    return filter_cache.filter_reviews(df, key)[0]
 
-    # 2. 根据传入的筛选条件进行进一步过滤
-    if platforms:
-        filtered_df = filtered_df[filtered_df['平台'].isin(platforms)]
-    if issue_types:
-        filtered_df = filtered_df[filtered_df['核心问题类型'].isin(issue_types)]
-    if sentiment_levels:
-        filtered_df = filtered_df[filtered_df['情感强度'].isin(sentiment_levels)]
 
-    return filtered_df
\ No newline at end of file
+@perf.timed("filter_data")
+def filter_view(df, filter_key):
+    """
+    按规范化的筛选键过滤数据，同时返回缓存的聚合结果，供景区页面的图表直接使用。
+
+    Returns:
+        tuple: (筛选结果 DataFrame, 聚合结果 dict：rows、issue_counts、monthly_counts)
+    """
+    perf.annotate(scenic_spot=filter_key.scenic_spot, **filter_cache.key_to_params(filter_key))
+    return filter_cache.filter_reviews(df, filter_key)
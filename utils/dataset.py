@@ -0,0 +1,169 @@
+# /utils/dataset.py
+
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils import anomaly, cache_registry, cube, dedup, review_store, text_features
+from utils.search_index import InvertedIndex
+
+logger = logging.getLogger(__name__)
+
+# 进程级共享：基础数据路径 -> ReviewDataset，看板页面和启动预热使用同一个实例
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+class ReviewDataset:
+    """
+    看板使用的评论数据集：基础 CSV 加上若干 Parquet 增量数据段。
+
+    基础数据只在创建时解析一次；之后每次 refresh() 只读取清单中新增的数据段，
+    追加到 DataFrame 并增量合并聚合立方体，不重新加载已有数据。
+    行 ID 即 DataFrame 的索引，从 0 开始连续编号，追加的数据段接着编号。
+    评论内容的倒排索引在第一次检索时建立，之后随数据段的追加增量更新。
+    加载和追加时都会检测近似重复评论，添加 重复簇 / 是否重复 两列，看板可在原始与去重计数间切换。
+    每日评论数的异常检测状态同样随数据段增量更新，已保存的词云词频用标记过近似重复的新行增量累加。
+    """
+
+    def __init__(self, base_path=review_store.BASE_DATA_PATH, store_dir=review_store.STORE_DIR, max_segments=None):
+        """
+        Args:
+            max_segments (int, optional): 创建时只应用清单中的前若干个数据段，其余留给之后的 refresh()
+                （告警任务用来从上次评估到的数据段继续）；不设时应用全部数据段。
+        """
+        self.base_path = base_path
+        self.store_dir = store_dir
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self.search_index = None
+
+        started = time.perf_counter()
+        self.df = review_store.prepare_reviews(review_store.read_csv_file(base_path))
+        self.base_rows = len(self.df)
+        self.dedup_index = dedup.NearDuplicateIndex()
+        self.dedup_index.tag(self.df, signatures=self._base_signatures())
+        self.anomaly_detector = anomaly.AnomalyDetector()
+        self.anomaly_detector.update(self.df)
+        self.cube = cube.build_cube(self.df)
+        self.segments_applied = 0
+        self.version = 0
+        self._manifest_mtime = None
+        logger.info("loaded base dataset: rows=%d in %.0f ms", self.base_rows, (time.perf_counter() - started) * 1000)
+        self._track_memory()
+
+        self.refresh(max_segments)
+
+    def refresh(self, max_segments=None):
+        """
+        检查是否有新的增量数据段，有则增量应用。
+        一次刷新中的所有新数据段先合并为一个增量再应用，整个 DataFrame 每次刷新只复制一次。
+
+        Args:
+            max_segments (int, optional): 最多应用到清单中的第几个数据段，不设时应用全部。
+
+        Returns:
+            bool: 是否应用了新数据。
+        """
+        mtime = review_store.manifest_mtime(self.store_dir)
+        if mtime == self._manifest_mtime:
+            return False
+
+        with self._lock:
+            if mtime == self._manifest_mtime:
+                return False
+            manifest = review_store.read_manifest(self.store_dir)
+            new_segments = manifest["segments"][self.segments_applied:max_segments]
+            if new_segments:
+                delta = review_store.read_segments(new_segments, self.store_dir)
+                self._apply(review_store.prepare_reviews(delta))
+            self.segments_applied += len(new_segments)
+            if self.segments_applied >= len(manifest["segments"]):
+                self._manifest_mtime = mtime
+            return bool(new_segments)
+
+    def _apply(self, delta):
+        started = time.perf_counter()
+        start = len(self.df)
+        delta.index = pd.RangeIndex(start, start + len(delta))
+        self.dedup_index.tag(delta)
+
+        # 先算好新的对象再整体替换，正在读取旧数据的会话不受影响
+        new_df = pd.concat([self.df, delta])
+        new_cube = cube.merge_cubes(self.cube, cube.build_cube(delta))
+        self.df, self.cube = new_df, new_cube
+        if self.search_index is not None:
+            self.search_index.add_dataframe(delta)
+        self.anomaly_detector.update(delta)
+        with review_store.store_lock(self.store_dir):
+            text_features.update_word_counts(delta, os.path.join(self.store_dir, 'tokens'))
+        self.version += 1
+        self._track_memory()
+        logger.info("applied delta: rows=%d total=%d in %.0f ms",
+                    len(delta), len(new_df), (time.perf_counter() - started) * 1000)
+
+    def _track_memory(self):
+        """ 把数据集和聚合立方体的内存占用登记为常驻对象，与缓存一起显示在性能面板中（不占用缓存预算） """
+        cache_registry.pin(f"dataset:{self.base_path}",
+                           cache_registry.estimate_bytes(self.df) + cache_registry.estimate_bytes(self.cube))
+
+    def _base_signatures(self):
+        """
+        基础数据的 LSH 桶键和压缩签名（计算量主要在分词），按基础文件的大小、修改时间和去重参数缓存到磁盘，
+        文件不变时重启无需重新计算。
+        """
+        stat = os.stat(self.base_path)
+        source = np.array([stat.st_size, stat.st_mtime_ns, len(self.df),
+                           dedup.NUM_PERM, dedup.BANDS, dedup.SKETCH_BITS, dedup.MIN_TOKENS], dtype=np.int64)
+        cache_path = os.path.join(self.store_dir, 'dedup', 'base-signatures.npz')
+        try:
+            with np.load(cache_path) as cached:
+                if np.array_equal(cached['source'], source):
+                    return cached['keys'], cached['sketches']
+        except (FileNotFoundError, KeyError, ValueError):
+            pass
+
+        # 缓存缺失或过期：需要对全部基础评论分词（导入 jieba），部署时可先用 python -m tools.serve --prepare 生成
+        logger.info("computing near-duplicate signatures for %d base rows (no valid cache at %s)",
+                    len(self.df), cache_path)
+        keys, sketches = dedup.compute_signatures(
+            self.df['内容'] if '内容' in self.df.columns else [None] * len(self.df),
+            self.df['景区名称']
+        )
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        np.savez(cache_path + '.tmp.npz', keys=keys, sketches=sketches, source=source)
+        os.replace(cache_path + '.tmp.npz', cache_path)
+        return keys, sketches
+
+    def get_search_index(self):
+        """ 返回评论内容的倒排索引，首次调用时对现有数据建立索引 """
+        if self.search_index is not None:
+            return self.search_index
+        with self._index_lock:
+            if self.search_index is None:
+                index = InvertedIndex()
+                index.add_dataframe(self.df)
+                with self._lock:
+                    # 建索引期间可能又追加了数据段，补齐后再对外可见
+                    if len(index) < len(self.df):
+                        index.add_dataframe(self.df.iloc[len(index):])
+                    self.search_index = index
+        return self.search_index
+
+
+def get_shared_dataset(base_path=review_store.BASE_DATA_PATH):
+    """
+    返回进程内共享的数据集对象，首次调用时加载。
+    加载期间的其他调用会等待同一次加载完成，不会重复解析基础数据。
+    """
+    dataset = _shared.get(base_path)
+    if dataset is not None:
+        return dataset
+    with _shared_lock:
+        if base_path not in _shared:
+            _shared[base_path] = ReviewDataset(base_path)
+        return _shared[base_path]
@@ -0,0 +1,238 @@
+# /utils/dedup.py
+
+import logging
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- 近似重复检测配置 ---
+# 签名长度 = 分段数 × 每段行数；两条评论的 Jaccard 相似度约 0.75 以上时大概率落入同一个桶
+NUM_PERM = 64
+BANDS = 8
+ROWS_PER_BAND = NUM_PERM // BANDS
+# 落入同一个桶只是候选；用完整签名估计的 Jaccard 相似度不低于该值才判为重复
+MIN_SIMILARITY = 0.6
+# 每个签名值只保留低若干位用于估计相似度（b-bit MinHash），每条评论占 NUM_PERM 字节
+SKETCH_BITS = 8
+# 词数太少的评论（如"很差""排队太久了"）不做近似重复判断，避免把不同用户的简短评价合并
+MIN_TOKENS = 6
+DEDUP_WORKERS = int(os.environ.get("DEDUP_WORKERS", str(os.cpu_count() or 1)))
+# 评论数超过这个值才使用多进程计算签名
+PARALLEL_MIN_ROWS = 20000
+CHUNK_ROWS = 20000
+
+CLUSTER_COLUMN = '重复簇'
+DUPLICATE_COLUMN = '是否重复'
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SKETCH_MASK = np.uint64((1 << SKETCH_BITS) - 1)
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_BAND_MULTIPLIERS = _rng.randint(1, 1 << 31, size=ROWS_PER_BAND, dtype=np.int64).astype(np.uint64)
+
+_WORD_PATTERN = re.compile(r"\w")
+
+
+def shingles(text):
+    """ 对评论分词（去掉标点），返回相邻两个词组成的词组集合；词数不足时返回空集合 """
+    import jieba
+
+    words = [w for w in jieba.lcut(str(text)) if _WORD_PATTERN.search(w)]
+    if len(words) < MIN_TOKENS:
+        return set()
+    return {words[i] + ' ' + words[i + 1] for i in range(len(words) - 1)}
+
+
+def shingle_hashes(shingle_set):
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingle_set), dtype=np.uint64,
+                       count=len(shingle_set))
+
+
+def _permute(hashes):
+    """ 对哈希值做 NUM_PERM 次随机线性置换，返回形状 (NUM_PERM, len(hashes)) """
+    return ((hashes[None, :] * _PERM_A[:, None] + _PERM_B[:, None]) % _MERSENNE_PRIME) & _MAX_HASH
+
+
+def minhash(shingle_set):
+    """ 计算一组词组的 MinHash 签名（NUM_PERM 个 32 位取值） """
+    return _permute(shingle_hashes(shingle_set)).min(axis=1)
+
+
+def signatures(texts, groups=None, batch_rows=2000):
+    """
+    计算每条评论的 LSH 桶键和压缩签名。
+
+    Returns:
+        tuple: (桶键，形状 (评论数, BANDS) 的 uint64；压缩签名，形状 (评论数, NUM_PERM) 的 uint8，
+        即每个 MinHash 值的低 SKETCH_BITS 位，用于核实候选重复的相似度)。
+
+    groups 不为空时（如景区名称）把分组混入桶键，不同分组的评论不会被判为重复。
+    无法判断的评论（内容为空或过短）对应的桶键全为 0。
+    每 batch_rows 条评论的词组哈希拼接后一次完成置换，再按评论分段取最小值。
+    """
+    keys = np.zeros((len(texts), BANDS), dtype=np.uint64)
+    sketches = np.zeros((len(texts), NUM_PERM), dtype=np.uint8)
+    for start in range(0, len(texts), batch_rows):
+        rows, parts = [], []
+        for i in range(start, min(start + batch_rows, len(texts))):
+            shingle_set = shingles(texts[i]) if isinstance(texts[i], str) else set()
+            if shingle_set:
+                rows.append(i)
+                parts.append(shingle_hashes(shingle_set))
+        if not rows:
+            continue
+        offsets = np.cumsum([0] + [len(p) for p in parts[:-1]])
+        minhashes = np.minimum.reduceat(_permute(np.concatenate(parts)), offsets, axis=1).T
+        banded = (minhashes.reshape(len(rows), BANDS, ROWS_PER_BAND) * _BAND_MULTIPLIERS).sum(axis=2)
+        if groups is not None:
+            salts = np.fromiter((zlib.crc32(str(groups[i]).encode('utf-8')) for i in rows),
+                                dtype=np.uint64, count=len(rows))
+            banded ^= salts[:, None] << np.uint64(32)
+        banded[banded == 0] = 1
+        keys[rows] = banded
+        sketches[rows] = (minhashes & _SKETCH_MASK).astype(np.uint8)
+    return keys, sketches
+
+
+def compute_signatures(texts, groups=None, workers=DEDUP_WORKERS):
+    """ 分块计算桶键和压缩签名，评论较多时用多个进程并行 """
+    texts = list(texts)
+    groups = None if groups is None else list(groups)
+    if workers <= 1 or len(texts) < PARALLEL_MIN_ROWS:
+        return signatures(texts, groups)
+    chunks = [(texts[i:i + CHUNK_ROWS], None if groups is None else groups[i:i + CHUNK_ROWS])
+              for i in range(0, len(texts), CHUNK_ROWS)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(signatures, *zip(*chunks)))
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+def similarity(sketches_a, sketches_b):
+    """
+    由压缩签名逐行估计两组评论的 Jaccard 相似度。
+    只保留低 b 位时，不相似的取值也有 1/2^b 的概率相同，按 b-bit MinHash 的公式扣除。
+    """
+    chance = 1.0 / (1 << SKETCH_BITS)
+    matches = (sketches_a == sketches_b).mean(axis=-1)
+    return (matches - chance) / (1 - chance)
+
+
+def _propagate_min(labels, edges_a, edges_b):
+    """ 沿核实过的候选边反复取最小标签，直到稳定，得到连通的重复簇 """
+    while len(edges_a):
+        merged = np.minimum(labels[edges_a], labels[edges_b])
+        if (merged == labels[edges_a]).all() and (merged == labels[edges_b]).all():
+            return labels
+        np.minimum.at(labels, edges_a, merged)
+        np.minimum.at(labels, edges_b, merged)
+    return labels
+
+
+class NearDuplicateIndex:
+    """
+    基于 MinHash + LSH 分段的近似重复评论索引。
+
+    每条评论按分段得到若干桶键，任一分段桶键相同即为候选重复；候选再与桶内最早的评论比较压缩签名，
+    估计的相似度不低于 MIN_SIMILARITY 才连通成簇，桶键的偶然碰撞不会把不相似的评论并为重复。
+    簇编号取簇内最小的行 ID，簇内其余评论标记为重复。计算量随评论数线性增长。
+    每个分段保存 (有序桶键, 桶内最早评论的位置) 数组，另按位置保存每条评论的簇编号和压缩签名，
+    新数据段只需在其中二分查找后合并，支持增量追加。
+    """
+
+    def __init__(self):
+        self._keys = [np.zeros(0, dtype=np.uint64) for _ in range(BANDS)]
+        self._owners = [np.zeros(0, dtype=np.int64) for _ in range(BANDS)]
+        self._labels = np.zeros(0, dtype=np.int64)
+        self._sketches = np.zeros((0, NUM_PERM), dtype=np.uint8)
+
+    def add(self, row_ids, texts, groups=None, signatures=None):
+        """
+        追加一批评论并返回它们的簇编号。
+
+        Args:
+            row_ids (array-like): 行 ID，须大于已加入的所有行 ID。
+            texts (array-like): 评论内容。
+            groups (array-like, optional): 分组（如景区名称），只在同组内判断重复。
+            signatures (tuple, optional): 已计算好的 (桶键, 压缩签名)，传入时不再重新计算。
+
+        Returns:
+            np.ndarray: 每条评论的簇编号（int64）。
+        """
+        started = time.perf_counter()
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        keys, sketches = compute_signatures(texts, groups) if signatures is None else signatures
+        labels = row_ids.copy()
+        valid = np.flatnonzero(keys[:, 0] != 0)
+        keys, sketches = keys[valid], sketches[valid]
+        batch = labels[valid]
+        offset = len(self._labels)
+        candidates = verified = 0
+
+        # 先与已有的桶匹配：与桶内最早的评论足够相似的评论归入其所在的簇
+        for band in range(BANDS):
+            known, owners = self._keys[band], self._owners[band]
+            if len(known) == 0 or len(keys) == 0:
+                continue
+            pos = np.searchsorted(known, keys[:, band])
+            pos[pos == len(known)] = 0
+            hit = np.flatnonzero(known[pos] == keys[:, band])
+            owner = owners[pos[hit]]
+            similar = similarity(sketches[hit], self._sketches[owner]) >= MIN_SIMILARITY
+            candidates += len(hit)
+            verified += int(similar.sum())
+            hit, owner = hit[similar], owner[similar]
+            np.minimum.at(batch, hit, self._labels[owner])
+
+        # 再在本批评论内部：同一个桶里的评论与桶内第一条比较，足够相似的连通成簇
+        edges_a, edges_b = [], []
+        for band in range(BANDS):
+            _, first, inverse = np.unique(keys[:, band], return_index=True, return_inverse=True)
+            owner = first[inverse]
+            pair = np.flatnonzero(owner != np.arange(len(keys)))
+            similar = similarity(sketches[pair], sketches[owner[pair]]) >= MIN_SIMILARITY
+            candidates += len(pair)
+            verified += int(similar.sum())
+            edges_a.append(pair[similar])
+            edges_b.append(owner[pair[similar]])
+        if edges_a:
+            batch = _propagate_min(batch, np.concatenate(edges_a), np.concatenate(edges_b))
+        labels[valid] = batch
+
+        # 把本批评论中新出现的桶键并入索引，桶内最早的评论按其在索引中的位置登记
+        for band in range(BANDS):
+            new_keys, first = np.unique(keys[:, band], return_index=True)
+            new_owners = first + offset
+            known = self._keys[band]
+            if len(known):
+                pos = np.searchsorted(known, new_keys)
+                pos[pos == len(known)] = 0
+                fresh = known[pos] != new_keys
+                new_keys, new_owners = new_keys[fresh], new_owners[fresh]
+            merged_keys = np.concatenate([known, new_keys])
+            order = np.argsort(merged_keys, kind='stable')
+            self._keys[band] = merged_keys[order]
+            self._owners[band] = np.concatenate([self._owners[band], new_owners])[order]
+        self._labels = np.concatenate([self._labels, batch])
+        self._sketches = np.concatenate([self._sketches, sketches])
+
+        logger.info("near-duplicate detection: rows=%d duplicates=%d candidates=%d verified=%d in %.0f ms",
+                    len(row_ids), int((labels != row_ids).sum()), candidates, verified,
+                    (time.perf_counter() - started) * 1000)
+        return labels
+
+    def tag(self, df, text_column='内容', group_column='景区名称', signatures=None):
+        """ 对 DataFrame（索引为行 ID）检测近似重复，就地添加 重复簇 和 是否重复 两列 """
+        texts = df[text_column] if text_column in df.columns else [None] * len(df)
+        groups = df[group_column] if group_column in df.columns else None
+        clusters = self.add(df.index, texts, groups, signatures=signatures)
+        df[CLUSTER_COLUMN] = clusters
+        df[DUPLICATE_COLUMN] = clusters != df.index.to_numpy()
+        return df
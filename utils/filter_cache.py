@@ -0,0 +1,113 @@
+# /utils/filter_cache.py
+"""
+景区页面筛选结果的进程级缓存。
+
+多选框的取值顺序取决于点击顺序，先把筛选条件规范化为 FilterKey：每个字段是排序无关的 frozenset，
+未选择或选中全部选项时记为 None（不限制该字段），因此不同会话中等价的筛选得到同一个键。
+在该键下缓存筛选出的行位置和景区页面图表所需的聚合结果（问题类型计数、月度计数），
+缓存登记在 utils/cache_registry.py 的全局内存预算下（另有条目数上限），同一进程内的所有会话共用。
+规范化的键同时映射为 URL 查询参数（见 key_to_params），分享出去的链接会恢复同样的筛选并命中缓存。
+
+数据集只追加不修改，行 ID 不复用，因此 (行数, 最后一个行 ID) 可以唯一标识数据集的某个版本及其去重视图，
+与 FilterKey 一起作为缓存键；追加数据段后旧版本的条目不再被访问，会被自然淘汰。本模块不依赖 Streamlit。
+"""
+
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from utils import analytics, cache_registry
+
+FILTER_CACHE_SIZE = int(os.environ.get("FILTER_CACHE_SIZE", "128"))
+
+FILTER_FIELDS = ("platforms", "issue_types", "sentiment_levels")
+# 筛选字段 -> URL 查询参数名；多个取值按排序后的顺序重复写同一个参数
+QUERY_PARAMS = {"platforms": "platform", "issue_types": "issue", "sentiment_levels": "sentiment"}
+DEDUP_PARAM = "dedup"
+
+FilterKey = namedtuple("FilterKey", ["scenic_spot", "platforms", "issue_types", "sentiment_levels", "dedup"])
+
+_cache = cache_registry.get_cache("filter_result", max_entries=FILTER_CACHE_SIZE)
+
+
+def normalize_selection(values, options=None):
+    """
+    把多选框的取值规范化为 frozenset。
+
+    未选择任何取值，或选中了 options 中的全部取值时返回 None，表示不限制该字段
+    （与 analytics.filter_mask 中空条件不筛选的约定一致）。
+    """
+    if values is None:
+        return None
+    selected = frozenset(str(v) for v in values)
+    if not selected:
+        return None
+    if options is not None and selected >= frozenset(str(v) for v in options):
+        return None
+    return selected
+
+
+def canonical_key(scenic_spot, platforms=None, issue_types=None, sentiment_levels=None, dedup=False, options=None):
+    """
+    由页面的筛选状态计算规范化的 FilterKey。
+
+    Args:
+        options (dict, optional): 字段名 -> 该景区的全部可选取值，用于把“全选”归并为不筛选。
+    """
+    options = options or {}
+    selections = dict(zip(FILTER_FIELDS, (platforms, issue_types, sentiment_levels)))
+    return FilterKey(str(scenic_spot),
+                     *(normalize_selection(selections[f], options.get(f)) for f in FILTER_FIELDS),
+                     bool(dedup))
+
+
+def key_to_params(key):
+    """ FilterKey -> URL 查询参数（参数名 -> 排序后的取值列表）；不筛选的字段不出现 """
+    params = {QUERY_PARAMS[f]: sorted(getattr(key, f)) for f in FILTER_FIELDS if getattr(key, f) is not None}
+    if key.dedup:
+        params[DEDUP_PARAM] = ["1"]
+    return params
+
+
+def data_token(df):
+    """ 标识数据集版本（及其去重视图）的轻量令牌 """
+    return len(df), int(df.index[-1]) if len(df) else -1
+
+
+def filter_reviews(df, key):
+    """
+    按 FilterKey 筛选评论，命中缓存时直接按行位置取出，无需重新比较各列。
+
+    Returns:
+        tuple: (筛选结果 DataFrame（保留原索引，即行 ID）, 聚合结果 dict：rows、issue_counts、monthly_counts)
+    """
+    cache_key = (data_token(df), key)
+    entry = _cache.get(cache_key)
+    if entry is not None:
+        return df.take(entry["positions"]), entry["aggregates"]
+
+    started = time.perf_counter()
+    mask = analytics.filter_mask(df, key.scenic_spot, key.platforms, key.issue_types, key.sentiment_levels)
+    positions = np.flatnonzero(mask.to_numpy(dtype=bool))
+    if len(df) < np.iinfo(np.int32).max:
+        positions = positions.astype(np.int32)
+    df_filtered = df.take(positions)
+    aggregates = {
+        "rows": len(df_filtered),
+        "issue_counts": analytics.issue_type_counts(df_filtered),
+        "monthly_counts": analytics.monthly_counts(df_filtered) if '月份' in df_filtered.columns else None,
+    }
+    _cache.put(cache_key, {"positions": positions, "aggregates": aggregates},
+               cost_ms=(time.perf_counter() - started) * 1000)
+    return df_filtered, aggregates
+
+
+def get_stats():
+    """ 缓存条目数、字节数、命中率和淘汰次数 """
+    return _cache.stats()
+
+
+def clear():
+    _cache.clear()
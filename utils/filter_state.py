@@ -0,0 +1,49 @@
+# /utils/filter_state.py
+"""
+景区页面侧边栏筛选器与 URL 查询参数的同步。
+
+筛选器第一次渲染时从 URL 查询参数恢复选择（没有参数时默认全选），之后由会话状态保存；
+每次重跑把规范化的筛选键（见 utils/filter_cache.py）写回 URL，只改动筛选相关的参数，
+?admin= 等其他参数保持不变。复制地址栏分享出去的链接会打开同样的筛选，并命中进程级的筛选结果缓存。
+"""
+
+import streamlit as st
+
+from utils import filter_cache
+
+
+def multiselect(label, options, key, field):
+    """
+    侧边栏多选框。field 为 filter_cache.FILTER_FIELDS 中的字段名，决定对应的 URL 查询参数。
+
+    Returns:
+        list: 当前选中的取值（按选项顺序）。
+    """
+    options = list(options)
+    if key not in st.session_state:
+        from_url = set(st.query_params.get_all(filter_cache.QUERY_PARAMS[field]))
+        st.session_state[key] = [o for o in options if str(o) in from_url] or options
+    else:
+        # 切换去重等操作后选项可能变少，去掉已不在选项中的取值
+        kept = [v for v in st.session_state[key] if v in options]
+        if len(kept) != len(st.session_state[key]):
+            st.session_state[key] = kept
+    return st.sidebar.multiselect(label, options=options, key=key)
+
+
+def toggle(label, key, help=None):
+    """ 侧边栏的“去除近似重复评论”开关，初始值取自 URL 查询参数 dedup """
+    if key not in st.session_state:
+        st.session_state[key] = st.query_params.get(filter_cache.DEDUP_PARAM) == "1"
+    return st.sidebar.toggle(label, key=key, help=help)
+
+
+def sync_query_params(filter_key):
+    """ 把规范化的筛选键写回 URL；取值没有变化的参数不重写，避免多余的浏览器历史更新 """
+    params = filter_cache.key_to_params(filter_key)
+    for name in list(filter_cache.QUERY_PARAMS.values()) + [filter_cache.DEDUP_PARAM]:
+        if name in params:
+            if st.query_params.get_all(name) != params[name]:
+                st.query_params[name] = params[name]
+        elif name in st.query_params:
+            del st.query_params[name]
@@ -0,0 +1,129 @@
+# /utils/llm_client.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# --- vLLM 服务配置（可通过环境变量覆盖） ---
+VLLM_BASE_URL = os.environ.get("VLLM_BASE_URL", "http://hpc.wisesoe.com:58001/v1")
+VLLM_MODEL_NAME = os.environ.get("VLLM_MODEL_NAME", "deepseek-r1-distill-qwen-vllm")
+VLLM_API_KEY = os.environ.get("VLLM_API_KEY", "not-needed")  # 私有部署的服务通常不校验密钥
+VLLM_TIMEOUT = float(os.environ.get("VLLM_TIMEOUT", "120"))
+
+# --- 响应缓存与并发控制配置 ---
+RESPONSE_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", "256"))
+RESPONSE_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", "1800"))  # 秒
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+
+# 进程级共享状态：同一个 Streamlit 进程内的所有会话共用
+_client = None
+_client_lock = threading.Lock()
+_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+_cache_lock = threading.Lock()
+_inflight = {}
+_semaphore = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+_stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+
+def get_client():
+    """ 懒加载 OpenAI 客户端，指向 vLLM 服务 """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(base_url=VLLM_BASE_URL, api_key=VLLM_API_KEY, timeout=VLLM_TIMEOUT)
+        return _client
+
+
+def normalize_messages(messages):
+    """ 规范化消息：只保留角色和内容，并合并多余空白，使等价请求得到相同的键 """
+    return [{"role": m["role"], "content": " ".join(str(m["content"]).split())} for m in messages]
+
+
+def cache_key(model, temperature, messages):
+    """ 由模型、温度和规范化后的消息计算缓存键 """
+    payload = json.dumps(
+        {"model": model, "temperature": round(float(temperature), 4), "messages": normalize_messages(messages)},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _call_upstream(messages, model, temperature):
+    """ 在全局并发上限内调用 vLLM 服务 """
+    with _semaphore:
+        response = get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+        )
+    return response.choices[0].message.content
+
+
+def chat_completion(messages, model=VLLM_MODEL_NAME, temperature=0.7, use_cache=True):
+    """
+    带缓存和请求合并的对话补全。
+
+    - 命中缓存（TTL + LRU）时直接返回；
+    - 相同请求正在进行时，等待那次上游调用的结果，而不是重复请求；
+    - 上游调用受进程级信号量限制，避免单个进程压垮 GPU 服务。
+
+    Returns:
+        tuple: (回复文本, 来源)，来源为 "cache"、"coalesced" 或 "upstream"。
+    Raises:
+        调用 vLLM 服务时的异常会原样抛出，失败的结果不会被缓存。
+    """
+    if not use_cache:
+        return _call_upstream(messages, model, temperature), "upstream"
+
+    key = cache_key(model, temperature, messages)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _stats["hits"] += 1
+            return cached, "cache"
+        future = _inflight.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _inflight[key] = future
+            _stats["misses"] += 1
+        else:
+            _stats["coalesced"] += 1
+
+    if not is_leader:
+        return future.result(), "coalesced"
+
+    try:
+        content = _call_upstream(messages, model, temperature)
+    except Exception as e:
+        with _cache_lock:
+            _stats["errors"] += 1
+            _inflight.pop(key, None)
+        future.set_exception(e)
+        raise
+
+    with _cache_lock:
+        _cache[key] = content
+        _inflight.pop(key, None)
+    future.set_result(content)
+    return content, "upstream"
+
+
+def get_cache_stats():
+    """ 返回缓存命中、合并与错误计数以及当前缓存条目数 """
+    with _cache_lock:
+        return dict(_stats, size=len(_cache), inflight=len(_inflight))
+
+
+def clear_cache():
+    """ 清空响应缓存 """
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,199 @@
+# /utils/perf.py
+"""
+页面重跑（rerun）的分段计时：load_data、filter_data、charts.create_*、render_embed、图表序列化等阶段
+各记一个计时片段（span），每次重跑结束时把全部片段写入结构化日志（JSON Lines），
+并按 页面 × 阶段 保存最近若干次的耗时和负载字节数，供管理面板计算 p50/p95 和直方图。
+
+当前重跑的记录保存在线程局部变量中（Streamlit 每次重跑在各自的脚本线程中执行），
+不在重跑中时（预热、批处理任务、基准测试）计时片段不做任何记录。本模块不依赖 Streamlit。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- 计时配置 ---
+PERF_LOG_PATH = os.environ.get("PERF_LOG_PATH", "cache/perf/reruns.jsonl")
+PERF_LOG_ENABLED = os.environ.get("PERF_LOG", "1") != "0"
+PERF_LOG_MAX_BYTES = int(float(os.environ.get("PERF_LOG_MAX_MB", "20")) * 1024 * 1024)
+PERF_WINDOW = int(os.environ.get("PERF_WINDOW", "500"))  # 每个 页面 × 阶段 保留最近的样本数
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+RERUN_STAGE = "rerun"  # 整次重跑的总耗时
+
+_local = threading.local()
+# 进程级共享：(页面, 阶段) -> 最近的耗时 / 负载字节数
+_durations = defaultdict(lambda: deque(maxlen=PERF_WINDOW))
+_payloads = defaultdict(lambda: deque(maxlen=PERF_WINDOW))
+_cache_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+# --- 重跑与计时片段 ---
+
+def begin_rerun(page):
+    """ 在页面脚本开头调用，开始记录本次重跑，返回本次重跑的记录 """
+    _local.rerun = {"page": page, "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "started": time.perf_counter(), "spans": []}
+    return _local.rerun
+
+
+def current_rerun():
+    return getattr(_local, "rerun", None)
+
+
+def annotate(**fields):
+    """ 为本次重跑附加上下文（如筛选状态），写入结构化日志和剖析报告 """
+    rerun = current_rerun()
+    if rerun is not None:
+        rerun.setdefault("context", {}).update(fields)
+
+
+@contextmanager
+def span(stage):
+    """
+    记录一个阶段的耗时。产出的 dict 可在块内写入 bytes（负载字节数）等附加字段：
+
+        with perf.span("render_embed") as record:
+            html = chart.render_embed()
+            record["bytes"] = len(html.encode())
+    """
+    record = {"stage": stage}
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        rerun = current_rerun()
+        if rerun is not None:
+            record["ms"] = round((time.perf_counter() - started) * 1000, 3)
+            rerun["spans"].append(record)
+            _observe(rerun["page"], stage, record["ms"], record.get("bytes"))
+
+
+def timed(stage=None):
+    """ 装饰器：把函数的每次调用记为一个计时片段，阶段名默认为 模块名.函数名 """
+    def decorator(func):
+        name = stage or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def end_rerun():
+    """
+    在页面脚本末尾调用：记录本次重跑的总耗时并写入结构化日志。
+
+    Returns:
+        dict: 本次重跑的记录（page、ts、total_ms、context、spans）；未调用 begin_rerun 时返回 None。
+    """
+    rerun = current_rerun()
+    if rerun is None:
+        return None
+    _local.rerun = None
+    record = {"ts": rerun["ts"], "page": rerun["page"],
+              "total_ms": round((time.perf_counter() - rerun["started"]) * 1000, 3),
+              "context": rerun.get("context", {}), "spans": rerun["spans"]}
+    _observe(rerun["page"], RERUN_STAGE, record["total_ms"], sum(s.get("bytes", 0) for s in rerun["spans"]))
+    if PERF_LOG_ENABLED:
+        _write_log(record)
+    return record
+
+
+def _observe(page, stage, ms, nbytes=None):
+    with _lock:
+        _durations[(page, stage)].append(ms)
+        if nbytes is not None:
+            _payloads[(page, stage)].append(nbytes)
+
+
+def _write_log(record):
+    """ 追加一行 JSON；超过大小上限时把旧日志改名为 .1 后重新开始 """
+    try:
+        with _log_lock:
+            os.makedirs(os.path.dirname(PERF_LOG_PATH) or ".", exist_ok=True)
+            if os.path.exists(PERF_LOG_PATH) and os.path.getsize(PERF_LOG_PATH) > PERF_LOG_MAX_BYTES:
+                os.replace(PERF_LOG_PATH, PERF_LOG_PATH + ".1")
+            with open(PERF_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logger.warning("failed to write perf log: %s", e)
+
+
+# --- 缓存命中 ---
+
+def record_cache(name, hit):
+    """ 记录一次缓存访问是否命中 """
+    with _lock:
+        _cache_stats[name]["hits" if hit else "misses"] += 1
+
+
+def cache_summary():
+    """ 各缓存的命中次数、未命中次数和命中率 """
+    with _lock:
+        stats = {name: dict(s) for name, s in _cache_stats.items()}
+    return [{"cache": name, "hits": s["hits"], "misses": s["misses"],
+             "hit_rate": round(s["hits"] / (s["hits"] + s["misses"]), 3) if s["hits"] + s["misses"] else None}
+            for name, s in sorted(stats.items())]
+
+
+# --- 汇总 ---
+
+def stage_summary(page=None):
+    """
+    按 页面 × 阶段 汇总最近的样本。
+
+    Returns:
+        list: 每项包含 page、stage、count、p50_ms、p95_ms、max_ms、avg_bytes，按页面和 p95 降序排列。
+    """
+    with _lock:
+        durations = {key: list(values) for key, values in _durations.items() if page is None or key[0] == page}
+        payloads = {key: list(values) for key, values in _payloads.items()}
+    rows = []
+    for (page_name, stage), values in durations.items():
+        samples = np.asarray(values)
+        sizes = payloads.get((page_name, stage))
+        rows.append({
+            "page": page_name, "stage": stage, "count": len(samples),
+            "p50_ms": round(float(np.percentile(samples, 50)), 2),
+            "p95_ms": round(float(np.percentile(samples, 95)), 2),
+            "max_ms": round(float(samples.max()), 2),
+            "avg_bytes": int(np.mean(sizes)) if sizes else None,
+        })
+    rows.sort(key=lambda r: (r["page"], -r["p95_ms"]))
+    return rows
+
+
+def histogram(page, stage, bounds=HISTOGRAM_BOUNDS_MS):
+    """
+    某个阶段最近耗时的直方图。
+
+    Returns:
+        dict: {"≤1 ms": n, "≤2 ms": n, ..., ">5000 ms": n}
+    """
+    with _lock:
+        samples = np.asarray(list(_durations.get((page, stage), ())))
+    counts = np.bincount(np.searchsorted(bounds, samples, side="left"), minlength=len(bounds) + 1) \
+        if len(samples) else np.zeros(len(bounds) + 1, dtype=int)
+    labels = [f"≤{b} ms" for b in bounds] + [f">{bounds[-1]} ms"]
+    return dict(zip(labels, (int(c) for c in counts)))
+
+
+def reset():
+    """ 清空滚动样本和缓存计数 """
+    with _lock:
+        _durations.clear()
+        _payloads.clear()
+        _cache_stats.clear()
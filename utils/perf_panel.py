@@ -0,0 +1,137 @@
+# /utils/perf_panel.py
+"""
+页面计时的 Streamlit 部分：带计时和负载统计的图表渲染，以及隐藏的性能管理面板。
+
+管理面板只在设置了环境变量 PERF_ADMIN_TOKEN 且页面地址带有 ?admin=<令牌> 时显示在侧边栏底部。
+管理员再加上 &profile=1（或设置环境变量 PROFILE_RERUNS=1）时，用 cProfile 和 tracemalloc 剖析本次重跑，
+报告保存到 PROFILE_DIR，可在面板中或用 python -m tools.profile_viewer 对比两次剖析。
+"""
+
+import logging
+import os
+
+import pandas as pd
+import simplejson
+import streamlit as st
+from pyecharts.charts.base import default
+from streamlit_echarts import st_echarts
+
+from utils import cache_registry, perf, profiling
+
+logger = logging.getLogger(__name__)
+
+PERF_ADMIN_TOKEN = os.environ.get("PERF_ADMIN_TOKEN", "")
+
+
+def is_admin():
+    """ 当前会话是否带有正确的管理令牌 """
+    return bool(PERF_ADMIN_TOKEN) and st.query_params.get("admin") == PERF_ADMIN_TOKEN
+
+
+def begin_page(page):
+    """ 在页面脚本开头调用：开始本次重跑的计时，需要时同时开始剖析 """
+    # 上一次重跑被 st.stop()、异常或新的重跑打断，没有执行到 show_perf_panel 时，
+    # 它的剖析还挂在本线程上（Streamlit 在同一线程中执行打断后的重跑），先结束并保存
+    _stop_profile()
+    profiling.discard_abandoned()
+    rerun = perf.begin_rerun(page)
+    if profiling.PROFILE_RERUNS or (is_admin() and st.query_params.get("profile") == "1"):
+        rerun["profile"] = profiling.start(page)
+
+
+def _stop_profile():
+    """ 结束本次重跑的剖析（如有），报告目录记入重跑上下文 """
+    rerun = perf.current_rerun()
+    profile = rerun.pop("profile", None) if rerun else None
+    if profile is None:
+        return None
+    try:
+        report_dir = profile.stop(rerun.get("context"))
+    except Exception:
+        logger.exception("failed to save profile of %s", profile.page)
+        return None
+    perf.annotate(profile=report_dir)
+    return report_dir
+
+
+def st_pyecharts(chart, height="300px", width="100%", key=None, stage="st_pyecharts"):
+    """
+    与 streamlit_echarts.st_pyecharts 相同地渲染 pyecharts 图表，
+    额外记录图表配置的序列化耗时和发送到浏览器的字节数。
+    """
+    with perf.span(stage) as record:
+        options = simplejson.dumps(chart.get_options(), default=default, ignore_nan=True)
+        record["bytes"] = len(options.encode("utf-8"))
+        return st_echarts(options=simplejson.loads(options), height=height, width=width, key=key)
+
+
+def show_perf_panel():
+    """
+    在页面脚本末尾调用：结束本次重跑的计时，管理员可在侧边栏查看性能面板。
+    """
+    report_dir = _stop_profile()
+    record = perf.end_rerun()
+    if not is_admin():
+        return
+
+    with st.sidebar.expander("⏱️ 性能面板", expanded=report_dir is not None):
+        if report_dir:
+            st.success(f"已保存本次重跑的剖析报告：{report_dir}")
+        if record:
+            st.caption(f"本次重跑 {record['total_ms']:.0f} ms，{len(record['spans'])} 个计时片段")
+        if record and record["spans"]:
+            st.dataframe(pd.DataFrame(record["spans"]), width='stretch', hide_index=True)
+
+        scope = st.radio("统计范围", ["当前页面", "全部页面"], horizontal=True, key="perf_panel_scope")
+        summary = pd.DataFrame(perf.stage_summary(record["page"] if record and scope == "当前页面" else None))
+        st.markdown("**各阶段耗时（最近 %d 次）**" % perf.PERF_WINDOW)
+        st.dataframe(summary, width='stretch', hide_index=True)
+
+        if not summary.empty:
+            options = [f"{r.page} · {r.stage}" for r in summary.itertuples()]
+            selected = st.selectbox("耗时分布", options, key="perf_panel_stage")
+            page, stage = selected.split(" · ", 1)
+            st.bar_chart(pd.Series(perf.histogram(page, stage), name="次数"))
+
+        st.markdown("**缓存命中**")
+        st.dataframe(pd.DataFrame(_cache_rows()), width='stretch', hide_index=True)
+        memory = cache_registry.get_stats()
+        st.markdown("**缓存内存**（缓存预算 %.0f MB，已用 %.1f MB；常驻对象 %.1f MB，不计入预算）" % (
+            memory["budget_bytes"] / 1024 / 1024, memory["cached_bytes"] / 1024 / 1024,
+            sum(memory["pinned"].values()) / 1024 / 1024))
+        st.dataframe(pd.DataFrame(cache_registry.cache_rows()), width='stretch', hide_index=True,
+                     column_order=["cache", "entries", "size_mb", "hits", "misses", "hit_rate", "evictions",
+                                   "rejected", "pinned"])
+        if st.button("清空统计", key="perf_panel_reset"):
+            perf.reset()
+
+        _show_profile_compare()
+
+
+def _show_profile_compare():
+    """ 选择两份剖析报告，对比耗时和内存分配变化最大的函数 / 位置 """
+    reports = profiling.list_reports()
+    st.markdown("**剖析报告对比**")
+    if len(reports) < 2:
+        st.caption(f"已有 {len(reports)} 份剖析报告，在页面地址后加上 &profile=1 即可剖析一次重跑。")
+        return
+    names = [os.path.basename(r) for r in reports]
+    base = st.selectbox("基准报告", names, index=1, key="perf_panel_profile_base")
+    other = st.selectbox("对比报告", names, index=0, key="perf_panel_profile_other")
+    comparison = profiling.compare_reports(os.path.join(profiling.PROFILE_DIR, base),
+                                           os.path.join(profiling.PROFILE_DIR, other), top=15)
+    st.dataframe(pd.DataFrame(comparison["summary"]), width='stretch', hide_index=True)
+    st.dataframe(pd.DataFrame(comparison["functions"]), width='stretch', hide_index=True)
+    st.dataframe(pd.DataFrame(comparison["allocations"]), width='stretch', hide_index=True)
+
+
+def _cache_rows():
+    """ 页面计时中记录的缓存（磁盘上的词频和词云图），加上各模块自带的缓存统计；内存缓存见 cache_registry """
+    from utils import llm_client, session_store
+
+    rows = perf.cache_summary()
+    for name, stats in (("llm_response", llm_client.get_cache_stats()), ("session_store", session_store.get_stats())):
+        total = stats["hits"] + stats["misses"]
+        rows.append({"cache": name, "hits": stats["hits"], "misses": stats["misses"],
+                     "hit_rate": round(stats["hits"] / total, 3) if total else None})
+    return rows
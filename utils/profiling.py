@@ -0,0 +1,226 @@
+# /utils/profiling.py
+"""
+按需剖析单次页面重跑：用 cProfile 记录调用耗时、用 tracemalloc 记录内存分配，
+结果连同页面名称和筛选状态保存到本地目录，并可对比两次剖析的差异。
+
+tracemalloc 作用于整个进程，同一时刻只剖析一次重跑，其他会话的重跑照常执行、不做剖析。
+剖析只能由开始它的线程结束：重跑被 st.stop()、异常或新的重跑打断时，由 perf_panel 在同一线程的下一次重跑开头结束；
+开始它的线程已经退出时，discard_abandoned() / start() 直接丢弃，不等超时，也不从其他线程关闭它的 cProfile。
+本模块不依赖 Streamlit；是否开启由 perf_panel 根据环境变量或管理参数决定。
+"""
+
+import cProfile
+import hashlib
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+# --- 剖析配置 ---
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "cache/profiles")
+PROFILE_RERUNS = os.environ.get("PROFILE_RERUNS", "0") == "1"  # 为每次重跑开启剖析（同一时刻只剖析一次）
+PROFILE_TOP = 60  # 报告中列出的函数和分配位置数
+# Python 3.12 起 cProfile 基于 sys.monitoring，对整个进程生效，线程退出后仍需关闭；之前只作用于开启它的线程
+_PROCESS_WIDE_PROFILER = sys.version_info >= (3, 12)
+
+_lock = threading.Lock()
+_active = None
+
+
+def _snapshot():
+    # 不统计 tracemalloc 自身的分配
+    return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+
+class RerunProfile:
+    """ 一次进行中的剖析，由 start() 创建，stop() 结束并保存报告 """
+
+    def __init__(self, page):
+        self.page = page
+        self.thread = threading.current_thread()
+        self.started = time.perf_counter()
+        self.started_at = time.strftime("%Y%m%d-%H%M%S")
+        self.owns_tracemalloc = not tracemalloc.is_tracing()
+        if self.owns_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self.baseline = _snapshot()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def _finish(self):
+        self.profiler.disable()
+        snapshot = _snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if self.owns_tracemalloc:
+            tracemalloc.stop()
+        return snapshot, peak
+
+    def stop(self, context=None):
+        """
+        结束剖析并保存报告。
+
+        Args:
+            context (dict): 筛选状态等附加信息，写入报告并参与目录命名。
+
+        Returns:
+            str: 报告目录。
+        """
+        global _active
+        try:
+            snapshot, peak = self._finish()
+            elapsed_ms = (time.perf_counter() - self.started) * 1000
+            return save_report(self.page, context or {}, self.profiler, snapshot.compare_to(self.baseline, 'lineno'),
+                               elapsed_ms, peak, self.started_at)
+        finally:
+            with _lock:
+                if _active is self:
+                    _active = None
+
+
+def start(page):
+    """
+    开始剖析一次重跑。其他仍在运行的线程正在剖析时返回 None。
+    调用方必须在同一线程中调用返回对象的 stop()。
+    """
+    global _active
+    with _lock:
+        if _active is not None:
+            if _active.thread.is_alive():
+                return None
+            _discard_locked()
+        _active = RerunProfile(page)
+        return _active
+
+
+def discard_abandoned():
+    """ 丢弃开始它的线程已经退出、没能正常结束的剖析，释放 tracemalloc """
+    with _lock:
+        if _active is not None and not _active.thread.is_alive():
+            _discard_locked()
+
+
+def _discard_locked():
+    global _active
+    logger.warning("abandoned profile of %s discarded", _active.page)
+    if _PROCESS_WIDE_PROFILER:
+        _active.profiler.disable()
+    if _active.owns_tracemalloc and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _active = None
+
+
+# --- 报告 ---
+
+def _slug(text):
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', str(text))[:40]
+
+
+def _function_label(key):
+    filename, line, name = key
+    if filename == '~':
+        return name  # 内置函数
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def save_report(page, context, profiler, allocation_diffs, elapsed_ms, peak_bytes, started_at=None):
+    """
+    把剖析结果写入 PROFILE_DIR/<时间>_<页面>_<筛选状态摘要>/：
+    profile.pstats（可用 snakeviz 等工具打开）、calltree.txt、allocations.txt 和 meta.json。
+    """
+    context_json = json.dumps(context, ensure_ascii=False, sort_keys=True, default=str)
+    digest = hashlib.md5(context_json.encode("utf-8")).hexdigest()[:8]
+    report_dir = os.path.join(PROFILE_DIR, f"{started_at or time.strftime('%Y%m%d-%H%M%S')}_{_slug(page)}_{digest}")
+    os.makedirs(report_dir, exist_ok=True)
+
+    profiler.dump_stats(os.path.join(report_dir, "profile.pstats"))
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP)
+    stats.print_callees(PROFILE_TOP // 3)
+    with open(os.path.join(report_dir, "calltree.txt"), "w", encoding="utf-8") as f:
+        f.write(stream.getvalue())
+
+    allocations = [{
+        "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+        "size_kb": round(stat.size_diff / 1024, 1),
+        "count": stat.count_diff,
+    } for stat in allocation_diffs[:PROFILE_TOP]]
+    with open(os.path.join(report_dir, "allocations.txt"), "w", encoding="utf-8") as f:
+        for stat in allocation_diffs[:PROFILE_TOP]:
+            f.write(f"{stat}\n")
+
+    top_functions = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:PROFILE_TOP]
+    meta = {
+        "page": page,
+        "context": context,
+        "started_at": started_at,
+        "elapsed_ms": round(elapsed_ms, 1),
+        "peak_kb": round(peak_bytes / 1024, 1),
+        "total_calls": stats.total_calls,
+        "top_functions": [{"function": _function_label(key), "ncalls": nc, "tottime_ms": round(tt * 1000, 3),
+                           "cumtime_ms": round(ct * 1000, 3)} for key, (_, nc, tt, ct, _) in top_functions],
+        "top_allocations": allocations,
+    }
+    with open(os.path.join(report_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+    logger.info("saved profile of %s (%.0f ms, peak %.0f KB) to %s", page, elapsed_ms, peak_bytes / 1024, report_dir)
+    return report_dir
+
+
+def list_reports(profile_dir=PROFILE_DIR):
+    """ 已保存的报告目录，最新的在前 """
+    if not os.path.isdir(profile_dir):
+        return []
+    names = [n for n in os.listdir(profile_dir) if os.path.exists(os.path.join(profile_dir, n, "meta.json"))]
+    return [os.path.join(profile_dir, n) for n in sorted(names, reverse=True)]
+
+
+def load_meta(report_dir):
+    with open(os.path.join(report_dir, "meta.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _function_times(report_dir):
+    stats = pstats.Stats(os.path.join(report_dir, "profile.pstats"))
+    return {_function_label(key): (tt, ct) for key, (_, _, tt, ct, _) in stats.stats.items()}
+
+
+def compare_reports(base_dir, other_dir, top=30):
+    """
+    对比两次剖析：总耗时和峰值内存，以及累计耗时和内存分配变化最大的函数 / 位置。
+
+    Returns:
+        dict: summary（两次的总耗时、峰值内存）、functions 和 allocations（按变化量绝对值降序）。
+    """
+    base, other = load_meta(base_dir), load_meta(other_dir)
+    base_times, other_times = _function_times(base_dir), _function_times(other_dir)
+    functions = []
+    for name in base_times.keys() | other_times.keys():
+        before, after = base_times.get(name, (0.0, 0.0))[1], other_times.get(name, (0.0, 0.0))[1]
+        functions.append({"function": name, "base_ms": round(before * 1000, 3), "other_ms": round(after * 1000, 3),
+                          "delta_ms": round((after - before) * 1000, 3)})
+    functions.sort(key=lambda r: -abs(r["delta_ms"]))
+
+    base_alloc = {a["location"]: a["size_kb"] for a in base["top_allocations"]}
+    other_alloc = {a["location"]: a["size_kb"] for a in other["top_allocations"]}
+    allocations = [{"location": loc, "base_kb": base_alloc.get(loc, 0.0), "other_kb": other_alloc.get(loc, 0.0),
+                    "delta_kb": round(other_alloc.get(loc, 0.0) - base_alloc.get(loc, 0.0), 1)}
+                   for loc in base_alloc.keys() | other_alloc.keys()]
+    allocations.sort(key=lambda r: -abs(r["delta_kb"]))
+
+    return {
+        "summary": [{"report": os.path.basename(d), "page": m["page"], "elapsed_ms": m["elapsed_ms"],
+                     "peak_kb": m["peak_kb"], "total_calls": m["total_calls"]}
+                    for d, m in ((base_dir, base), (other_dir, other))],
+        "functions": functions[:top],
+        "allocations": allocations[:top],
+    }
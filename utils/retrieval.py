@@ -0,0 +1,184 @@
+# /utils/retrieval.py
+
+import logging
+import math
+import sys
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from utils.chat_context import estimate_tokens
+from utils.text_features import load_stopwords
+
+logger = logging.getLogger(__name__)
+
+# 参与统计汇总的分类字段（存在于结构化数据中才会使用）
+AGGREGATE_COLUMNS = ['景区名称', '平台', '核心问题类型', '问题细项', '情感强度']
+TEXT_COLUMN = '内容'
+
+TOP_K = 8
+RETRIEVAL_TOKEN_BUDGET = 1200
+SNIPPET_CHARS = 160
+
+
+def tokenize(text):
+    """ jieba 分词并去除停用词、空白和单字符号 """
+    import jieba
+
+    stopwords = load_stopwords()
+    return [
+        w for w in jieba.cut_for_search(str(text))
+        if w.strip() and w not in stopwords and (len(w) > 1 or w.isalnum())
+    ]
+
+
+def row_text(df):
+    """ 取出每行用于检索的文本：优先使用'内容'列，否则拼接所有文本列 """
+    if TEXT_COLUMN in df.columns:
+        return df[TEXT_COLUMN].fillna('').astype(str)
+    text_columns = df.select_dtypes(include='object').columns
+    return df[text_columns].fillna('').astype(str).agg(' '.join, axis=1)
+
+
+class BM25Index:
+    """
+    基于 BM25 的本地检索索引，覆盖结构化数据的每一行。
+    倒排表按词项存储 (行号数组, 词频数组)，查询时向量化累加得分。
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = np.zeros(0, dtype=np.int32)
+        self.postings = {}
+        self.avg_length = 0.0
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """ 对 DataFrame 的每一行建立索引，行号即 DataFrame 中的位置 """
+        index = cls()
+        if df is None or df.empty:
+            return index
+        started = time.perf_counter()
+
+        doc_ids = defaultdict(list)
+        freqs = defaultdict(list)
+        lengths = []
+        for doc_id, text in enumerate(row_text(df)):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                doc_ids[term].append(doc_id)
+                freqs[term].append(tf)
+
+        index.doc_lengths = np.asarray(lengths, dtype=np.int32)
+        index.avg_length = float(index.doc_lengths.mean()) if lengths else 0.0
+        index.postings = {
+            term: (np.asarray(doc_ids[term], dtype=np.int32), np.asarray(freqs[term], dtype=np.float32))
+            for term in doc_ids
+        }
+        logger.info("built BM25 index: docs=%d terms=%d in %.1f ms",
+                    len(lengths), len(index.postings), (time.perf_counter() - started) * 1000)
+        return index
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def memory_bytes(self):
+        """ 索引占用的内存字节数估算（数组 + 词项字符串），用于登记到缓存预算 """
+        arrays = sum(ids.nbytes + tfs.nbytes for ids, tfs in self.postings.values())
+        terms = sum(sys.getsizeof(term) for term in self.postings)
+        return int(self.doc_lengths.nbytes + arrays + terms + sys.getsizeof(self.postings))
+
+    def search(self, query, top_k=TOP_K):
+        """
+        检索与查询最相关的行。
+
+        Returns:
+            list: [(行号, 得分), ...]，按得分从高到低排列。
+        """
+        n_docs = len(self.doc_lengths)
+        if n_docs == 0:
+            return []
+
+        scores = np.zeros(n_docs, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_length, 1e-9))
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            ids, tf = posting
+            idf = math.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm[ids])
+
+        hit_count = int(np.count_nonzero(scores))
+        if hit_count == 0:
+            return []
+        k = min(top_k, hit_count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+
+def summarize_aggregates(df, question, max_values=5):
+    """
+    生成与问题相关的统计汇总：各分类字段的总体分布；
+    若问题中提到了某个分类取值（如景区名），再给出该取值下的核心问题分布。
+    """
+    lines = [f"数据总行数：{len(df)}"]
+    columns = [c for c in AGGREGATE_COLUMNS if c in df.columns]
+    for column in columns:
+        counts = df[column].value_counts().head(max_values)
+        if not counts.empty:
+            lines.append(f"{column}分布：" + "，".join(f"{k} {v}条" for k, v in counts.items()))
+
+    for column in columns:
+        mentioned = [v for v in df[column].dropna().unique() if str(v) and str(v) in question]
+        for value in mentioned[:2]:
+            subset = df[df[column] == value]
+            for other in columns:
+                if other == column:
+                    continue
+                counts = subset[other].value_counts().head(3)
+                if not counts.empty:
+                    lines.append(f"{column}={value} 时的{other}分布：" +
+                                 "，".join(f"{k} {v}条" for k, v in counts.items()))
+    return lines
+
+
+def build_retrieval_context(index, df, question, top_k=TOP_K, budget=RETRIEVAL_TOKEN_BUDGET):
+    """
+    为当前问题检索相关评论和统计汇总，拼成可放入提示词的文本。
+
+    Returns:
+        tuple: (上下文文本, 检索统计字典)
+    """
+    if df is None:
+        return "", {"hits": 0, "search_ms": 0.0, "total_ms": 0.0}
+
+    started = time.perf_counter()
+    hits = index.search(question, top_k=top_k) if index is not None else []
+    search_ms = (time.perf_counter() - started) * 1000
+
+    lines = ["【相关统计】"] + summarize_aggregates(df, question)
+    if hits:
+        lines.append("【相关评论】")
+        hit_rows = df.iloc[[row for row, _ in hits]]
+        texts = row_text(hit_rows)
+        label_columns = [c for c in AGGREGATE_COLUMNS if c in df.columns]
+        for rank, (_, record) in enumerate(hit_rows.iterrows(), start=1):
+            labels = "/".join(str(record[c]) for c in label_columns if pd.notna(record[c]))
+            snippet = " ".join(texts.iloc[rank - 1].split())[:SNIPPET_CHARS]
+            lines.append(f"{rank}. [{labels}] {snippet}")
+
+    # 超出预算时从末尾丢弃，保证统计信息优先保留
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > budget:
+        lines.pop()
+    context = "\n".join(lines)
+    total_ms = (time.perf_counter() - started) * 1000
+
+    stats = {"hits": len(hits), "search_ms": search_ms, "total_ms": total_ms}
+    logger.info("retrieval: hits=%d search=%.2f ms total=%.2f ms", len(hits), search_ms, total_ms)
+    return context, stats
@@ -0,0 +1,151 @@
+# /utils/review_browser.py
+
+import os
+from urllib.parse import urlsplit
+
+import streamlit as st
+
+from utils import perf, review_export, warmup
+
+PAGE_SIZE_OPTIONS = [20, 50, 100]
+# 表格中评论内容只显示前若干个字，选中某一行后再展示全文
+PREVIEW_CHARS = 60
+TEXT_COLUMN = '内容'
+RELEVANCE_OPTION = '相关度'
+
+
+def sorted_page_ids(df, sort_column, ascending, page, page_size):
+    """
+    只对排序列计算排序后的行 ID，再取出当前页的那一段。
+    排序在服务端完成，不需要把整张表发到浏览器。按相关度排序时保持 df 原有的行顺序。
+    """
+    if sort_column == RELEVANCE_OPTION:
+        return df.index[page * page_size:(page + 1) * page_size]
+    order = df[sort_column].sort_values(ascending=ascending, kind='stable', na_position='last').index
+    return order[page * page_size:(page + 1) * page_size]
+
+
+def truncate_text(series, limit=PREVIEW_CHARS):
+    """ 超过 limit 个字的文本截断并加省略号 """
+    text = series.fillna('').astype(str)
+    return text.where(text.str.len() <= limit, text.str.slice(0, limit) + '…')
+
+
+@perf.timed("review_browser")
+def show_review_browser(df, columns, key, ranked=False):
+    """
+    分页、可排序的评论浏览器。
+    每次交互只把当前页的行（评论内容截断显示）发送到浏览器，数据量与筛选结果的总行数无关；
+    选中某一行时再单独展示该条评论的全文。
+
+    Args:
+        df (pd.DataFrame): 筛选后的评论数据，索引为数据集中的行 ID。
+        columns (list): 要展示的列。
+        key (str): 控件 key 的前缀，同一页面内需唯一。
+        ranked (bool): df 是否为按相关度排好序的检索结果，是则默认按相关度展示。
+    """
+    if df.empty:
+        st.info("根据当前筛选条件，无数据显示。")
+        return
+
+    sort_options = ([RELEVANCE_OPTION] if ranked else []) + [c for c in columns if c != TEXT_COLUMN]
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    with col1:
+        sort_column = st.selectbox("排序字段", sort_options, key=f"{key}_sort_column")
+    with col2:
+        descending = st.toggle("降序", value=True, key=f"{key}_sort_desc")
+    with col3:
+        page_size = st.selectbox("每页行数", PAGE_SIZE_OPTIONS, key=f"{key}_page_size")
+    page_count = max(1, -(-len(df) // page_size))
+    # 筛选条件变化后总页数可能变少，超出范围的页码回到最后一页
+    if st.session_state.get(f"{key}_page", 1) > page_count:
+        st.session_state[f"{key}_page"] = page_count
+    with col4:
+        page = st.number_input(f"页码（共 {page_count} 页）", min_value=1, max_value=page_count,
+                               value=1, step=1, key=f"{key}_page")
+
+    page_ids = sorted_page_ids(df, sort_column, not descending, page - 1, page_size)
+    page_df = df.loc[page_ids, columns]
+    display_df = page_df.copy()
+    if TEXT_COLUMN in display_df.columns:
+        display_df[TEXT_COLUMN] = truncate_text(display_df[TEXT_COLUMN])
+
+    st.caption(f"共 {len(df)} 条评论，当前显示第 {page} 页。点击行首可选中一行查看完整评论。")
+    event = st.dataframe(
+        display_df,
+        width='stretch',
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"{key}_table"
+    )
+
+    selected = event.selection.rows if event else []
+    if selected and TEXT_COLUMN in page_df.columns:
+        row = page_df.iloc[selected[0]]
+        with st.container(border=True):
+            st.caption(" · ".join(str(row[c]) for c in columns if c != TEXT_COLUMN))
+            st.markdown(row[TEXT_COLUMN] if isinstance(row[TEXT_COLUMN], str) else "（无评论内容）")
+
+
+def export_download_url(result, file_name):
+    """
+    导出文件的流式下载地址，由 tools.serve 启动的 HTTP 服务提供（见 utils/warmup.py）。
+    未配置 EXPORT_DOWNLOAD_BASE_URL 时使用浏览器访问本页面的主机名和该服务的端口；
+    本进程没有启动该服务时返回 None。
+    """
+    base = review_export.EXPORT_DOWNLOAD_BASE_URL
+    if not base:
+        port = warmup.download_port()
+        if port is None:
+            return None
+        host = urlsplit("//" + (st.context.headers.get("Host") or "localhost")).hostname
+        base = f"http://{f'[{host}]' if ':' in host else host}:{port}"
+    return base.rstrip("/") + review_export.download_path(result, file_name)
+
+
+@perf.timed("export_panel")
+def show_export_panel(df, row_ids, key, file_stem):
+    """
+    导出筛选结果：先显示将导出的行数，点击后按块把这些行写入 CSV（UTF-8-SIG）或 Parquet 文件，
+    再提供下载链接，由独立的 HTTP 服务流式发送文件。筛选结果不变时复用已生成的文件。
+    没有该服务时退回 st.download_button，每次重跑都会把整个文件读入内存，页面上会注明。
+
+    Args:
+        df (pd.DataFrame): 完整的看板数据集，按行 ID 从中取行。
+        row_ids (array-like): 要导出的行 ID。
+        key (str): 控件 key 的前缀，同一页面内需唯一。
+        file_stem (str): 下载文件名（不含扩展名）。
+    """
+    st.caption(f"将导出 {len(row_ids)} 条评论（{len(review_export.export_columns(df))} 列）。")
+    if len(row_ids) == 0:
+        return
+    fmt = st.radio("导出格式", list(review_export.EXPORT_FORMATS), horizontal=True,
+                   format_func=str.upper, key=f"{key}_export_format")
+
+    state_key = f"{key}_export"
+    signature = (fmt, review_export.selection_key(row_ids))
+    exported = st.session_state.get(state_key)
+    if exported is not None and (exported[0] != signature or not os.path.exists(exported[1]["path"])):
+        exported = None
+
+    if exported is None:
+        if st.button("生成导出文件", key=f"{key}_export_button"):
+            with st.spinner("正在分块写入导出文件..."):
+                result = review_export.write_export(df, row_ids, fmt)
+            exported = (signature, result)
+            st.session_state[state_key] = exported
+    if exported is not None:
+        result = exported[1]
+        mime, suffix = review_export.EXPORT_FORMATS[fmt]
+        st.caption(f"已生成 {result['rows']} 行，{result['bytes'] / 1024:.1f} KB，耗时 {result['elapsed_ms']:.0f} ms。")
+        url = export_download_url(result, f"{file_stem}{suffix}")
+        if url is not None:
+            st.link_button("⬇️ 下载导出文件", url)
+            st.caption(f"下载链接在文件生成后 {review_export.EXPORT_MAX_AGE_SECONDS // 60} 分钟内有效。")
+        else:
+            with open(result["path"], "rb") as f:
+                st.download_button("⬇️ 下载导出文件", data=f, file_name=f"{file_stem}{suffix}", mime=mime,
+                                   key=f"{key}_export_download")
+            st.caption("当前未通过 python -m tools.serve 启动，没有流式下载服务：每次页面重跑都会把整个导出文件读入内存，"
+                       "导出大量数据时建议改用 tools.serve 启动。")
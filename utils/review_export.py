@@ -0,0 +1,131 @@
+# /utils/review_export.py
+
+import hashlib
+import os
+import re
+import time
+import uuid
+from urllib.parse import urlencode
+
+import numpy as np
+
+from utils.review_store import DASHBOARD_COLUMNS
+
+EXPORT_DIR = os.environ.get("EXPORT_DIR", "cache/exports")
+EXPORT_CHUNK_ROWS = 50000
+# 超过这个时间的导出文件在下次导出时清理
+EXPORT_MAX_AGE_SECONDS = 3600
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+# 导出文件由 tools.serve 启动的 HTTP 服务（utils/warmup.py）按块流式下载，见 download_path；
+# 经反向代理部署时设为浏览器可访问的该服务地址，如 https://example.com/dashboard-files
+EXPORT_DOWNLOAD_BASE_URL = os.environ.get("EXPORT_DOWNLOAD_BASE_URL", "")
+DOWNLOAD_ROUTE = "/exports/"
+# 导出文件名是随机的 uuid，下载链接中只接受这种文件名，不能借此读取导出目录之外的文件
+_EXPORT_NAME = re.compile(r"^[0-9a-f]{32}(\.csv|\.parquet)$")
+
+
+def export_columns(df):
+    """ 导出的列：看板数据集中实际存在的列 """
+    return [c for c in DASHBOARD_COLUMNS if c in df.columns]
+
+
+def selection_key(row_ids):
+    """ 一组行 ID 的摘要，用于判断筛选结果是否变化、已生成的导出文件能否复用 """
+    return hashlib.md5(np.asarray(row_ids, dtype=np.int64).tobytes()).hexdigest()
+
+
+def iter_chunks(df, row_ids, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    """ 按行 ID 分块从数据集中取出行，每次只物化一个块 """
+    row_ids = np.asarray(row_ids)
+    for start in range(0, len(row_ids), chunk_rows):
+        yield df.loc[row_ids[start:start + chunk_rows], columns]
+
+
+def _parquet_schema(df, columns):
+    """ 由列类型推断 Parquet 表结构；文本列统一为 string，避免某个块全为空时推断出 null 类型 """
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(df[columns].iloc[:0], preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, pa.field(field.name, pa.string()))
+    return schema
+
+
+def download_path(result, file_name):
+    """ 导出文件的下载路径（含查询参数 name，即浏览器保存时使用的文件名） """
+    return f"{DOWNLOAD_ROUTE}{os.path.basename(result['path'])}?{urlencode({'name': file_name})}"
+
+
+def resolve_download(name, export_dir=EXPORT_DIR):
+    """
+    由下载路径中的文件名找到导出文件。
+
+    Returns:
+        tuple: (文件路径, MIME 类型)；文件名不合法或文件已被清理时返回 (None, None)。
+    """
+    match = _EXPORT_NAME.match(name)
+    path = os.path.join(export_dir, name)
+    if match is None or not os.path.isfile(path):
+        return None, None
+    mime = next(m for m, suffix in EXPORT_FORMATS.values() if suffix == match.group(1))
+    return path, mime
+
+
+def cleanup_exports(export_dir=EXPORT_DIR, max_age=EXPORT_MAX_AGE_SECONDS):
+    if not os.path.isdir(export_dir):
+        return
+    now = time.time()
+    for name in os.listdir(export_dir):
+        path = os.path.join(export_dir, name)
+        try:
+            if now - os.path.getmtime(path) > max_age:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def write_export(df, row_ids, fmt, export_dir=EXPORT_DIR, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    把选中的行分块写入导出文件：CSV 使用 UTF-8-SIG 编码（Excel 可直接打开），Parquet 按块写入行组。
+    内存中同时只保留一个块，不会把整个筛选结果再复制一份。
+
+    Returns:
+        dict: {"path", "rows", "bytes", "elapsed_ms"}
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式：{fmt}")
+    started = time.perf_counter()
+    cleanup_exports(export_dir)
+    os.makedirs(export_dir, exist_ok=True)
+    columns = export_columns(df)
+    path = os.path.join(export_dir, uuid.uuid4().hex + EXPORT_FORMATS[fmt][1])
+
+    rows = 0
+    if fmt == "csv":
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            for i, chunk in enumerate(iter_chunks(df, row_ids, columns, chunk_rows)):
+                chunk.to_csv(f, header=(i == 0), index=False)
+                rows += len(chunk)
+            if rows == 0:
+                df[columns].iloc[:0].to_csv(f, index=False)
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _parquet_schema(df, columns)
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            for chunk in iter_chunks(df, row_ids, columns, chunk_rows):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                rows += len(chunk)
+
+    return {
+        "path": path,
+        "rows": rows,
+        "bytes": os.path.getsize(path),
+        "elapsed_ms": (time.perf_counter() - started) * 1000,
+    }
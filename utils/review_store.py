@@ -0,0 +1,170 @@
+# /utils/review_store.py
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，只做进程内加锁
+    fcntl = None
+
+# 定义景区和对应省份的映射
+SCENIC_PROVINCE_MAP = {
+    '普陀山': '浙江省', '黄山': '安徽省', '庐山': '江西省', '雁荡山': '浙江省',
+    '泰山': '山东省', '衡山': '湖南省', '华山': '陕西省', '恒山': '山西省',
+    '嵩山': '河南省', '峨眉山': '四川省', '武夷山': '福建省'
+}
+
+BASE_DATA_PATH = 'data/sentiment_data.csv'
+STORE_DIR = 'data/store'
+MANIFEST_NAME = 'manifest.json'
+
+# 看板数据集的列：前五列是必需的，其余缺失时补空
+DASHBOARD_COLUMNS = ['点评时间', '平台', '景区名称', '核心问题类型', '问题细项', '情感强度', '内容']
+REQUIRED_COLUMNS = ['点评时间', '平台', '景区名称', '核心问题类型', '情感强度']
+
+_local_lock = threading.Lock()
+
+
+class StoreSchemaError(Exception):
+    """ 待追加的数据缺少看板所需的列 """
+
+
+def read_csv_file(file_path):
+    """ 读取 CSV，优先 UTF-8，失败时回退 GBK """
+    try:
+        return pd.read_csv(file_path, encoding='utf-8')
+    except UnicodeDecodeError:
+        return pd.read_csv(file_path, encoding='gbk')
+
+
+def prepare_reviews(df):
+    """
+    对评论数据做统一的预处理：解析点评时间、丢弃时间无效的行、补充月份和省份列。
+    行号重新从 0 开始编号，作为数据集中的行 ID。
+    """
+    raw = df['点评时间']
+    parsed = pd.to_datetime(raw, errors='coerce')
+    failed = parsed.isna() & raw.notna()
+    if failed.any():
+        # 同一文件混用多种日期写法时，按首行推断的格式解析不了的行再按 ISO 8601 的各种变体、最后逐条解析
+        retry = pd.to_datetime(raw[failed].astype(str), errors='coerce', format='ISO8601')
+        if retry.isna().any():
+            retry = retry.fillna(pd.to_datetime(raw[failed][retry.isna()].astype(str), errors='coerce', format='mixed'))
+        parsed[failed] = retry
+    df['点评时间'] = parsed
+    df.dropna(subset=['点评时间'], inplace=True)
+    df['月份'] = df['点评时间'].dt.month
+    df['省份'] = df['景区名称'].map(SCENIC_PROVINCE_MAP)
+    df.reset_index(drop=True, inplace=True)
+    return df
+
+
+# --- 增量数据段 ---
+
+def manifest_path(store_dir=STORE_DIR):
+    return os.path.join(store_dir, MANIFEST_NAME)
+
+
+def read_manifest(store_dir=STORE_DIR):
+    """ 读取数据段清单；还没有追加过数据时返回空清单 """
+    try:
+        with open(manifest_path(store_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"version": 0, "segments": []}
+
+
+def manifest_mtime(store_dir=STORE_DIR):
+    """ 清单文件的修改时间，用于低成本地判断是否有新数据段 """
+    try:
+        return os.stat(manifest_path(store_dir)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def store_lock(store_dir):
+    """ 追加数据段、更新数据存储下的派生文件（如词频）时的互斥锁：进程内用线程锁，进程间用文件锁 """
+    os.makedirs(store_dir, exist_ok=True)
+    with _local_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(store_dir, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def validate_for_dashboard(df):
+    """
+    按看板数据集的要求校验待追加的行。
+
+    Returns:
+        tuple: (可追加的行（只含看板列）, 被拒绝的行（带拒绝原因）)
+    Raises:
+        StoreSchemaError: 缺少必需的列。
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise StoreSchemaError(f"数据缺少看板所需的列：{'、'.join(missing)}")
+
+    candidate = df.reindex(columns=DASHBOARD_COLUMNS).copy()
+    for column in DASHBOARD_COLUMNS:
+        if column != '点评时间':
+            candidate[column] = candidate[column].astype('string').str.strip()
+    candidate['点评时间'] = pd.to_datetime(candidate['点评时间'], errors='coerce', format='mixed')
+
+    reasons = pd.Series(None, index=candidate.index, dtype=object)
+    reasons = reasons.mask(candidate['点评时间'].isna(), '点评时间无法识别')
+    unknown_scenic = ~candidate['景区名称'].isin(list(SCENIC_PROVINCE_MAP)).to_numpy(dtype=bool)
+    reasons = reasons.mask(reasons.isna() & unknown_scenic, '景区不在看板范围内')
+    blank = candidate[['平台', '核心问题类型', '情感强度']].fillna('').eq('').any(axis=1).to_numpy(dtype=bool)
+    reasons = reasons.mask(reasons.isna() & blank, '平台/问题类型/情感强度为空')
+
+    rejected = df[reasons.notna()].assign(拒绝原因=reasons[reasons.notna()])
+    return candidate[reasons.isna()].reset_index(drop=True), rejected
+
+
+def append_segment(df, source=None, store_dir=STORE_DIR):
+    """
+    把已校验的行写成一个新的 Parquet 增量数据段，并原子地更新清单。
+
+    Returns:
+        dict: 新数据段的清单条目。
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    segment_dir = os.path.join(store_dir, 'segments')
+    os.makedirs(segment_dir, exist_ok=True)
+    with store_lock(store_dir):
+        manifest = read_manifest(store_dir)
+        version = manifest["version"] + 1
+        name = f"delta-{version:06d}.parquet"
+        table = pa.Table.from_pandas(df[DASHBOARD_COLUMNS], preserve_index=False)
+        pq.write_table(table, os.path.join(segment_dir, name), compression='zstd')
+
+        entry = {"name": name, "rows": len(df), "source": source, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        manifest = {"version": version, "segments": manifest["segments"] + [entry]}
+        tmp_path = manifest_path(store_dir) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, manifest_path(store_dir))
+    return entry
+
+
+def read_segments(segments, store_dir=STORE_DIR):
+    """ 读取若干增量数据段并合并为一个 DataFrame（未做预处理） """
+    frames = [pd.read_parquet(os.path.join(store_dir, 'segments', s["name"])) for s in segments]
+    if not frames:
+        return pd.DataFrame(columns=DASHBOARD_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,167 @@
+# /utils/search_index.py
+
+import logging
+import math
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from utils.retrieval import tokenize
+
+logger = logging.getLogger(__name__)
+
+TEXT_COLUMN = '内容'
+# 查询语法：空格分隔的词必须同时出现；用 OR（或 |）分隔的几组词满足任一组即可
+_OR_PATTERN = re.compile(r"\s+OR\s+|\|", re.IGNORECASE)
+
+
+def parse_query(query):
+    """
+    把查询字符串解析为"或"连接的若干组，每组内的词项需同时出现。
+
+    Examples:
+        parse_query("排队 索道 OR 收费") -> [["排队", "索道"], ["收费"]]
+    """
+    groups = []
+    for part in _OR_PATTERN.split(query or ""):
+        terms = []
+        for word in part.split():
+            terms.extend(t for t in tokenize(word) if t not in terms)
+        if terms:
+            groups.append(terms)
+    return groups
+
+
+class InvertedIndex:
+    """
+    评论内容的倒排索引，行 ID 与看板数据集的行 ID 一致。
+
+    倒排表按词项存储 (行 ID 数组, 词频数组)。行 ID 单调递增地追加，
+    因此每个倒排表天然有序，新数据段只需追加到对应倒排表末尾。
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._ids = {}
+        self._freqs = {}
+        self._lengths = array('i')
+        self._next_id = 0
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._next_id
+
+    def add(self, row_ids, texts):
+        """
+        追加一批评论。row_ids 必须从当前文档数开始连续编号（与数据集追加数据段的方式一致）。
+        """
+        started = time.perf_counter()
+        postings = {}
+        lengths = array('i')
+        expected = self._next_id
+        for row_id, text in zip(row_ids, texts):
+            if row_id != expected:
+                raise ValueError(f"行 ID 不连续：期望 {expected}，实际 {row_id}")
+            counts = Counter(tokenize(text)) if isinstance(text, str) else Counter()
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                ids, freqs = postings.setdefault(term, (array('i'), array('f')))
+                ids.append(row_id)
+                freqs.append(tf)
+            expected += 1
+
+        # 分好词之后再一次性合并，查询线程只会看到完整的批次
+        with self._lock:
+            for term, (ids, freqs) in postings.items():
+                if term in self._ids:
+                    self._ids[term].extend(ids)
+                    self._freqs[term].extend(freqs)
+                else:
+                    self._ids[term], self._freqs[term] = ids, freqs
+            self._lengths.extend(lengths)
+            self._total_length += sum(lengths)
+            self._next_id = expected
+        logger.info("indexed %d reviews (%d terms total) in %.0f ms",
+                    len(lengths), len(self._ids), (time.perf_counter() - started) * 1000)
+
+    def add_dataframe(self, df):
+        """ 按 DataFrame 的索引（行 ID）索引其中的评论内容 """
+        texts = df[TEXT_COLUMN] if TEXT_COLUMN in df.columns else [None] * len(df)
+        self.add(df.index, texts)
+
+    def _posting(self, term):
+        ids = self._ids.get(term)
+        if ids is None:
+            return None, None
+        return np.frombuffer(ids, dtype=np.int32), np.frombuffer(self._freqs[term], dtype=np.float32)
+
+    def search(self, query, candidates=None, top_k=None):
+        """
+        检索包含查询词的评论。
+
+        Args:
+            query (str): 查询字符串，语法见 parse_query。
+            candidates (array-like, optional): 只在这些行 ID 中检索（如 filter_data 的结果索引）。
+            top_k (int, optional): 只返回得分最高的若干条。
+
+        Returns:
+            tuple: (按 BM25 得分从高到低排列的行 ID 数组, 对应得分数组)
+        """
+        groups = parse_query(query)
+        if not groups:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        if candidates is not None:
+            candidates = np.asarray(candidates, dtype=np.int32)
+        # 检索期间持有锁：倒排表以零拷贝视图读取，视图存在时数组不能扩容
+        with self._lock:
+            return self._search(groups, candidates, top_k)
+
+    def _search(self, groups, candidates, top_k):
+        empty = np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        n_docs = self._next_id
+        lengths = np.frombuffer(self._lengths, dtype=np.int32)
+        avg_length = self._total_length / n_docs if n_docs else 0.0
+        postings = {t: self._posting(t) for group in groups for t in group}
+
+        # 每组内求交集，组之间求并集
+        matched = []
+        for group in groups:
+            ids = None
+            for term in sorted(group, key=lambda t: 0 if postings[t][0] is None else len(postings[t][0])):
+                term_ids = postings[term][0]
+                if term_ids is None:
+                    ids = empty[0]
+                    break
+                ids = term_ids if ids is None else np.intersect1d(ids, term_ids, assume_unique=True)
+                if len(ids) == 0:
+                    break
+            matched.append(ids)
+        ids = matched[0] if len(matched) == 1 else np.unique(np.concatenate(matched))
+        if candidates is not None and len(ids):
+            ids = np.intersect1d(ids, candidates)
+        if len(ids) == 0:
+            return empty
+
+        # 对命中的行累加各词项的 BM25 得分
+        scores = np.zeros(len(ids), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * lengths[ids] / max(avg_length, 1e-9))
+        for term, (term_ids, tf) in postings.items():
+            if term_ids is None:
+                continue
+            pos = np.searchsorted(term_ids, ids)
+            pos[pos == len(term_ids)] = 0
+            present = term_ids[pos] == ids
+            idf = math.log(1 + (n_docs - len(term_ids) + 0.5) / (len(term_ids) + 0.5))
+            term_tf = np.where(present, tf[pos], 0)
+            scores += idf * term_tf * (self.k1 + 1) / (term_tf + norm)
+
+        order = np.argsort(-scores, kind='stable')
+        if top_k is not None:
+            order = order[:top_k]
+        return ids[order], scores[order]
@@ -0,0 +1,196 @@
+# /utils/session_store.py
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils import cache_registry
+
+logger = logging.getLogger(__name__)
+
+# --- 会话结果落盘缓存配置 ---
+SESSION_STORE_DIR = os.environ.get("SESSION_STORE_DIR", "cache/sessions")
+SESSION_STORE_BUDGET_MB = float(os.environ.get("SESSION_STORE_BUDGET_MB", "1024"))
+BATCH_ROWS = 10000  # 每个记录批次的行数，分页读取时只触及相关批次
+REPORT_METADATA_KEY = b"analysis_report"
+RETRIEVAL_INDEX_CACHE_SIZE = int(os.environ.get("RETRIEVAL_INDEX_CACHE_SIZE", "8"))
+
+# 进程级共享：handle -> {"path": 文件路径, "bytes": 文件大小, "rows": 行数}，按最近访问排序
+_entries = OrderedDict()
+_tables = {}
+_lock = threading.Lock()
+_loaded = False
+_stats = {"puts": 0, "hits": 0, "misses": 0, "evictions": 0}
+# 结果的 BM25 检索索引：handle -> BM25Index，登记在全局内存预算下，被淘汰后按需从结果文件重建
+_indexes = cache_registry.get_cache("retrieval_index", max_entries=RETRIEVAL_INDEX_CACHE_SIZE)
+
+
+def _path(handle):
+    return os.path.join(SESSION_STORE_DIR, f"{handle}.arrow")
+
+
+def _load_existing():
+    """ 进程启动后首次使用时，按修改时间登记磁盘上已有的结果文件 """
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    if not os.path.isdir(SESSION_STORE_DIR):
+        return
+    files = [f for f in os.listdir(SESSION_STORE_DIR) if f.endswith(".arrow")]
+    files.sort(key=lambda f: os.path.getmtime(os.path.join(SESSION_STORE_DIR, f)))
+    for name in files:
+        path = os.path.join(SESSION_STORE_DIR, name)
+        _entries[name[:-len(".arrow")]] = {"path": path, "bytes": os.path.getsize(path), "rows": None}
+    _evict()
+
+
+def _evict():
+    """ 总大小超出预算时，从最久未访问的结果开始删除（至少保留最新的一个） """
+    budget = SESSION_STORE_BUDGET_MB * 1024 * 1024
+    total = sum(e["bytes"] for e in _entries.values())
+    while total > budget and len(_entries) > 1:
+        handle, entry = _entries.popitem(last=False)
+        _tables.pop(handle, None)
+        _indexes.pop(handle)
+        try:
+            os.remove(entry["path"])
+        except OSError:
+            pass
+        total -= entry["bytes"]
+        _stats["evictions"] += 1
+        logger.info("evicted session result %s (%.1f MB)", handle, entry["bytes"] / 1024 / 1024)
+
+
+def put(df, report):
+    """
+    把一次分析的结构化数据和报告写成 Arrow IPC 文件，返回句柄。
+    会话状态里只需保存这个句柄。
+    """
+    import pyarrow as pa
+
+    os.makedirs(SESSION_STORE_DIR, exist_ok=True)
+    handle = uuid.uuid4().hex
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[REPORT_METADATA_KEY] = (report or "").encode("utf-8")
+    table = table.replace_schema_metadata(metadata)
+
+    path = _path(handle)
+    with pa.OSFile(path + ".tmp", "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=BATCH_ROWS)
+    os.replace(path + ".tmp", path)
+
+    with _lock:
+        _load_existing()
+        _entries[handle] = {"path": path, "bytes": os.path.getsize(path), "rows": table.num_rows}
+        _stats["puts"] += 1
+        _evict()
+    return handle
+
+
+def get_table(handle):
+    """
+    以内存映射方式打开结果文件，返回 pyarrow.Table；结果已被淘汰时返回 None。
+    数据留在页缓存中按需读取，不占用进程堆内存。
+    """
+    import pyarrow as pa
+
+    with _lock:
+        _load_existing()
+        entry = _entries.get(handle)
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(handle)
+        _stats["hits"] += 1
+        table = _tables.get(handle)
+        if table is None:
+            table = pa.ipc.open_file(pa.memory_map(entry["path"], "r")).read_all()
+            _tables[handle] = table
+            entry["rows"] = table.num_rows
+        return table
+
+
+def load_frame(handle, columns=None):
+    """
+    返回由 Arrow 内存支撑的 DataFrame（pd.ArrowDtype 列），不复制数据到堆内存。
+    结果已被淘汰时返回 None。
+    """
+    table = get_table(handle)
+    if table is None:
+        return None
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def get_report(handle):
+    """ 读取与结果一同保存的分析报告 """
+    table = get_table(handle)
+    if table is None:
+        return None
+    return (table.schema.metadata or {}).get(REPORT_METADATA_KEY, b"").decode("utf-8")
+
+
+def num_rows(handle):
+    table = get_table(handle)
+    return 0 if table is None else table.num_rows
+
+
+def read_page(handle, page, page_size):
+    """ 只读取第 page 页（从 0 开始）的行并转换为普通 DataFrame，用于表格展示 """
+    table = get_table(handle)
+    if table is None:
+        return None
+    return table.slice(page * page_size, page_size).to_pandas()
+
+
+def get_retrieval_index(handle):
+    """
+    返回结果的 BM25 检索索引。索引保存在进程级的有界缓存中（不放进会话状态），
+    未命中（首次使用或已被淘汰）时从结果文件读取检索文本重建。结果已被淘汰时返回 None。
+    """
+    from utils import retrieval
+
+    index = _indexes.get(handle)
+    if index is not None:
+        return index
+    table = get_table(handle)
+    if table is None:
+        return None
+    started = time.perf_counter()
+    if retrieval.TEXT_COLUMN in table.column_names:
+        table = table.select([retrieval.TEXT_COLUMN])
+    index = retrieval.BM25Index.from_dataframe(table.to_pandas())
+    with _lock:
+        # 建索引期间结果可能已被删除，此时不再缓存
+        if handle in _entries:
+            _indexes.put(handle, index, cost_ms=(time.perf_counter() - started) * 1000, nbytes=index.memory_bytes())
+    return index
+
+
+def discard(handle):
+    """ 删除某个会话的结果文件 """
+    with _lock:
+        entry = _entries.pop(handle, None)
+        _tables.pop(handle, None)
+    _indexes.pop(handle)
+    if entry is not None:
+        try:
+            os.remove(entry["path"])
+        except OSError:
+            pass
+
+
+def get_stats():
+    """ 返回结果数量、总大小和命中/淘汰计数 """
+    with _lock:
+        return dict(_stats, entries=len(_entries), bytes=sum(e["bytes"] for e in _entries.values()),
+                    budget_bytes=int(SESSION_STORE_BUDGET_MB * 1024 * 1024))
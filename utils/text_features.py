@@ -0,0 +1,220 @@
+# /utils/text_features.py
+
+import json
+import os
+import re
+from collections import Counter
+
+from utils import cache_registry, perf
+from utils.dedup import DUPLICATE_COLUMN
+
+STOPWORDS_PATH = 'assets/hit_stopwords.txt'
+TOKEN_DIR = 'data/store/tokens'
+WORDCLOUD_DIR = 'assets/wordclouds'
+# 每个景区只保留出现次数最多的若干个词，词云只用到前 150 个
+MAX_TOKENS_PER_SCENIC = 20000
+
+# 与 WordCloud 默认的分词规则一致：至少两个字符的"词"字符序列
+_WORD_PATTERN = re.compile(r"\w[\w']+")
+
+_stopwords = None
+# 词云形状掩码：路径 -> 图片数组
+_masks = cache_registry.get_cache("wordcloud_mask", max_entries=16)
+
+
+def load_stopwords(path=STOPWORDS_PATH):
+    """ 读取停用词表，只读取一次 """
+    global _stopwords
+    if _stopwords is None:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                _stopwords = frozenset(line.strip() for line in f if line.strip())
+        except FileNotFoundError:
+            _stopwords = frozenset()
+    return _stopwords
+
+
+def count_words(texts):
+    """ 对一组评论逐条分词并统计词频，去除停用词和单字 """
+    import jieba
+
+    stopwords = load_stopwords()
+    counts = Counter()
+    for text in texts:
+        counts.update(
+            w for w in jieba.cut(str(text), cut_all=False)
+            if w not in stopwords and _WORD_PATTERN.fullmatch(w)
+        )
+    return counts
+
+
+# --- 按景区持久化的词频（词云数据） ---
+
+def _variant_name(scenic_name, dedup):
+    # 去除近似重复评论后的词频与图片单独保存
+    return f"{scenic_name}.dedup" if dedup else scenic_name
+
+
+def _token_path(scenic_name, token_dir, dedup=False):
+    return os.path.join(token_dir, f"{_variant_name(scenic_name, dedup)}.json")
+
+
+def _load_token_file(scenic_name, token_dir, dedup):
+    """
+    读取已保存的景区词频及其覆盖到的行 ID 上界（不含），不存在时返回 (None, None)。
+    旧格式的文件只有词频，上界记为 None。
+    """
+    try:
+        with open(_token_path(scenic_name, token_dir, dedup), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None, None
+    if isinstance(data.get("counts"), dict):
+        return Counter(data["counts"]), data.get("upto")
+    return Counter(data), None
+
+
+def load_word_counts(scenic_name, token_dir=TOKEN_DIR, dedup=False):
+    """ 读取已保存的景区词频，不存在时返回 None """
+    return _load_token_file(scenic_name, token_dir, dedup)[0]
+
+
+def save_word_counts(scenic_name, counts, token_dir=TOKEN_DIR, dedup=False, upto=None):
+    """ 保存景区词频；upto 为已统计评论的行 ID 上界（不含），之后只需累加行 ID 不小于它的评论 """
+    os.makedirs(token_dir, exist_ok=True)
+    path = _token_path(scenic_name, token_dir, dedup)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({"upto": upto, "counts": dict(counts.most_common(MAX_TOKENS_PER_SCENIC))}, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def _counted_texts(df, dedup, upto=None):
+    """ 需要计入词频的评论内容：dedup 时跳过近似重复的评论，upto 不为空时只取行 ID 不小于它的评论 """
+    mask = df['内容'].notna()
+    if dedup and DUPLICATE_COLUMN in df.columns:
+        mask &= ~df[DUPLICATE_COLUMN]
+    if upto is not None:
+        mask &= df.index >= upto
+    return df.loc[mask, '内容']
+
+
+def get_word_counts(df, scenic_name, token_dir=TOKEN_DIR, dedup=False):
+    """
+    返回某个景区全部评论的词频，dedup 为 True 时不计近似重复的评论。
+    已保存过时读取，并补上 df 中尚未统计的新评论；否则对该景区的评论分词统计并保存，供之后增量更新。
+    """
+    counts, upto = _load_token_file(scenic_name, token_dir, dedup)
+    perf.record_cache("word_counts", counts is not None)
+    if '内容' not in df.columns:
+        return counts if counts is not None else Counter()
+    scenic_df = df[df['景区名称'] == scenic_name]
+    last_row = int(scenic_df.index[-1]) + 1 if len(scenic_df) else None
+    if counts is not None:
+        if upto is not None and last_row is not None and last_row > upto:
+            counts.update(count_words(_counted_texts(scenic_df, dedup, upto)))
+            save_word_counts(scenic_name, counts, token_dir, dedup, upto=last_row)
+        return counts
+    counts = count_words(_counted_texts(scenic_df, dedup))
+    if counts:
+        save_word_counts(scenic_name, counts, token_dir, dedup, upto=last_row)
+    return counts
+
+
+def wordcloud_image_path(scenic_name, output_dir=WORDCLOUD_DIR, dedup=False):
+    return os.path.join(output_dir, f"{_variant_name(scenic_name, dedup)}.png")
+
+
+def update_word_counts(delta_df, token_dir=TOKEN_DIR, output_dir=WORDCLOUD_DIR):
+    """
+    用新追加的评论增量更新各景区已保存的词频，并删除词频有变化的景区的词云图，
+    下次访问时直接按更新后的词频重新绘制，无需重新分词全部评论。
+
+    delta_df 须已按数据集编号行 ID 并标记近似重复（见 ReviewDataset.refresh），去重后的词频只累加非重复的评论。
+    词频文件记录了已统计到的行 ID，已统计过的评论不会重复累加，多个进程各自刷新数据集时也只更新一次。
+    尚未保存过词频的景区会在下次绘制时从完整数据统计。
+
+    Returns:
+        list: 词频有更新的景区名称。
+    """
+    if '内容' not in delta_df.columns or delta_df.empty:
+        return []
+    affected = []
+    for scenic_name, group in delta_df.groupby('景区名称'):
+        last_row = int(group.index[-1]) + 1
+        changed = False
+        for dedup in (False, True):
+            counts, upto = _load_token_file(scenic_name, token_dir, dedup)
+            if counts is None or (upto is not None and upto >= last_row):
+                continue
+            if upto is None:
+                # 旧格式的词频不知道统计到了哪一行，删除后从完整数据重新统计
+                os.remove(_token_path(scenic_name, token_dir, dedup))
+            else:
+                counts.update(count_words(_counted_texts(group, dedup, upto)))
+                save_word_counts(scenic_name, counts, token_dir, dedup, upto=last_row)
+            changed = True
+        if changed:
+            for dedup in (False, True):
+                image_path = wordcloud_image_path(scenic_name, output_dir, dedup)
+                if os.path.exists(image_path):
+                    os.remove(image_path)
+            affected.append(scenic_name)
+    return affected
+
+
+def load_mask(path):
+    """ 读取词云形状掩码图片为数组，按路径缓存在全局内存预算下；PIL 和 NumPy 在首次读取时才导入 """
+    def read():
+        import numpy as np
+        from PIL import Image
+
+        return np.array(Image.open(path))
+
+    return _masks.get_or_compute(path, read)
+
+
+def render_wordcloud(word_counts, image_path, font_path, mask_image=None):
+    """
+    按词频绘制词云并保存为透明背景的 PNG。
+    绘图库只在这里导入，不画词云的进程无需加载。
+
+    Raises:
+        OSError: 字体文件无法读取或图片无法保存。
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from wordcloud import WordCloud
+
+    # 创建词云图对象
+    wc = WordCloud(
+        font_path=font_path,
+        background_color="rgba(255, 255, 255, 0)",
+        mode="RGB",
+        width=800,
+        height=500,
+        max_words=150,
+        mask=mask_image,  # 形状掩码
+        colormap='viridis',
+        contour_width=1,  # 轮廓宽度
+        contour_color='steelblue',  # 轮廓颜色
+        collocations=False,  # 不考虑词语搭配
+        prefer_horizontal=0.7,  # 水平词语比例
+        scale=2,  # 缩放比例以提高清晰度
+        min_font_size=10,  # 最小字体大小
+        max_font_size=200,  # 最大字体大小
+        random_state=42  # 随机种子以确保可重复性
+    )
+    # 按词频生成词云（停用词已在统计词频时去除）
+    wc.generate_from_frequencies(word_counts)
+
+    # 使用 matplotlib 绘制并保存；bbox_inches='tight' 和 pad_inches=0 去除白边，transparent=True 使背景透明
+    fig, ax = plt.subplots(figsize=(10, 6))
+    try:
+        ax.imshow(wc, interpolation='bilinear')
+        ax.axis('off')
+        os.makedirs(os.path.dirname(image_path) or '.', exist_ok=True)
+        fig.savefig(image_path, format='png', transparent=True, bbox_inches='tight', pad_inches=0)
+    finally:
+        plt.close(fig)  # 关闭图像，释放内存
+    return image_path
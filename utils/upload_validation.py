@@ -0,0 +1,290 @@
+# /utils/upload_validation.py
+
+import codecs
+import csv
+import io
+import os
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+# --- 上传文件校验配置 ---
+REQUIRED_COLUMNS = ['内容']
+OPTIONAL_COLUMNS = ['点评时间', '平台', '景区名称']
+# 常见的列名写法统一映射到标准列名
+COLUMN_ALIASES = {
+    '评论内容': '内容', '评论': '内容', '评价内容': '内容', 'content': '内容', 'review': '内容',
+    '评论时间': '点评时间', '时间': '点评时间', '日期': '点评时间', 'date': '点评时间',
+    '来源平台': '平台', '来源': '平台', 'platform': '平台',
+    '景区': '景区名称', 'scenic': '景区名称',
+}
+
+MAX_UPLOAD_MB = float(os.environ.get("MAX_UPLOAD_MB", "50"))
+MAX_ROWS = int(os.environ.get("MAX_UPLOAD_ROWS", "200000"))
+MAX_CONTENT_CHARS = 5000
+CHUNK_ROWS = 20000
+MAX_REJECTED_SHOWN = 1000  # 只保留前若干条被拒绝的行用于展示
+# 重新编码后上传给 Agent 的格式：默认 csv，标准 Agent 只接受 CSV/XLSX；
+# 确认 Agent 支持读取 Parquet 时可设为 parquet，上传体积更小
+UPLOAD_ENCODING = os.environ.get("UPLOAD_ENCODING", "csv")
+# CSV 中列数多于表头的行在读取时记下原因，随数据块一起交给校验步骤
+PARSE_ERROR_COLUMN = '__parse_error__'
+
+
+class UploadValidationError(Exception):
+    """ 文件整体不可用（格式无法解析、缺少必需列、超出大小限制） """
+
+
+@dataclass
+class ValidationResult:
+    file_name: str
+    payload: bytes
+    mime_type: str
+    accepted_rows: int = 0
+    total_rows: int = 0
+    empty_rows: int = 0
+    duplicate_rows: int = 0
+    rejected: pd.DataFrame = field(default_factory=pd.DataFrame)
+    rejected_count: int = 0
+    original_bytes: int = 0
+    elapsed_ms: float = 0.0
+
+
+def detect_csv_encoding(data, sample_size=65536):
+    """ 用文件开头的一段字节判断编码：能按 UTF-8 解码即为 UTF-8，否则按 GBK 处理 """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        # final=False 允许样本末尾截断半个多字节字符
+        decoder.decode(data[:sample_size], final=False)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'gbk'
+
+
+def iter_csv_chunks(data, chunk_rows=CHUNK_ROWS):
+    """
+    分块读取 CSV，所有列按字符串读入，索引为每条记录在文件中的起始行号。
+
+    列数多于表头的行不丢弃，只保留前几列并在 PARSE_ERROR_COLUMN 中写明原因，
+    由校验步骤记为不合格行；列数不足的行以空值补齐，跳过空白行。
+    """
+    encoding = detect_csv_encoding(data)
+    reader = csv.reader(io.TextIOWrapper(io.BytesIO(data), encoding=encoding, newline=''))
+    header = next((row for row in reader if row), None)
+    if header is None:
+        return
+    columns = [c.strip() or f"列{i + 1}" for i, c in enumerate(header)]
+    # 与 pandas 一致，重复的列名依次加 .1、.2 后缀
+    columns = [c if c not in columns[:i] else f"{c}.{columns[:i].count(c)}" for i, c in enumerate(columns)]
+    width = len(columns)
+    rows, line_numbers, errors = [], [], []
+    has_error = False
+    start = reader.line_num + 1
+    for row in reader:
+        if row:
+            error = None
+            if len(row) > width:
+                error = f'列数与表头不一致（{len(row)} 列，表头 {width} 列）'
+                has_error = True
+                row = row[:width]
+            elif len(row) < width:
+                row = row + [None] * (width - len(row))
+            rows.append(row)
+            line_numbers.append(start)
+            errors.append(error)
+        start = reader.line_num + 1
+        if len(rows) >= chunk_rows:
+            yield _csv_chunk(rows, columns, line_numbers, errors if has_error else None)
+            rows, line_numbers, errors = [], [], []
+            has_error = False
+    if rows:
+        yield _csv_chunk(rows, columns, line_numbers, errors if has_error else None)
+
+
+def _csv_chunk(rows, columns, line_numbers, errors):
+    chunk = pd.DataFrame(rows, columns=columns, index=pd.Index(line_numbers), dtype=object)
+    if errors is not None:
+        chunk[PARSE_ERROR_COLUMN] = errors
+    return chunk
+
+
+def iter_xlsx_chunks(data, chunk_rows=CHUNK_ROWS):
+    """ 以只读模式流式读取 XLSX 的第一个工作表，不把整个工作簿加载进内存；索引为表格中的行号 """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c).strip() if c is not None else f"列{i + 1}" for i, c in enumerate(header)]
+        buffer, first_row = [], 2
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer, columns=columns, index=pd.RangeIndex(first_row, first_row + len(buffer)))
+                first_row += len(buffer)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns, index=pd.RangeIndex(first_row, first_row + len(buffer)))
+    finally:
+        workbook.close()
+
+
+def normalize_columns(df):
+    """ 去除列名空白并按别名表统一列名 """
+    renamed = {c: COLUMN_ALIASES.get(str(c).strip().lower(), COLUMN_ALIASES.get(str(c).strip(), str(c).strip()))
+               for c in df.columns}
+    return df.rename(columns=renamed)
+
+
+def _validate_chunk(chunk, seen_hashes):
+    """
+    对一个数据块做向量化校验，数据块的索引为文件中的行号。
+
+    Returns:
+        tuple: (通过校验的行, 被拒绝的行（带原因）, 空行数, 重复行数)
+    """
+    parse_errors = chunk.pop(PARSE_ERROR_COLUMN) if PARSE_ERROR_COLUMN in chunk.columns else None
+    chunk = chunk.astype('string')
+
+    # 1. 丢弃完全为空的行
+    stripped = chunk.apply(lambda col: col.str.strip()).fillna('')
+    empty_mask = (stripped == '').all(axis=1).to_numpy(dtype=bool)
+    if parse_errors is not None:
+        empty_mask &= parse_errors.isna().to_numpy(dtype=bool)
+    chunk = chunk[~empty_mask]
+    stripped = stripped[~empty_mask]
+
+    # 2. 逐项检查，记录第一个失败原因（读取阶段发现的列数错误优先）
+    content = stripped['内容']
+    if parse_errors is not None:
+        reasons = parse_errors[~empty_mask].astype(object)
+    else:
+        reasons = pd.Series(None, index=chunk.index, dtype=object)
+    reasons = reasons.mask(reasons.isna() & (content == '').to_numpy(dtype=bool), '内容为空')
+    too_long = (content.str.len() > MAX_CONTENT_CHARS).to_numpy(dtype=bool)
+    reasons = reasons.mask(reasons.isna() & too_long, f'内容超过 {MAX_CONTENT_CHARS} 字')
+    if '点评时间' in chunk.columns:
+        times = stripped['点评时间']
+        parsed = pd.to_datetime(times.replace('', None), errors='coerce', format='mixed')
+        bad_time = ((times != '') & parsed.isna()).to_numpy(dtype=bool)
+        reasons = reasons.mask(reasons.isna() & bad_time, '点评时间无法识别')
+
+    rejected = chunk[reasons.notna()].assign(拒绝原因=reasons[reasons.notna()])
+    valid = chunk[reasons.isna()].copy()
+    valid['内容'] = content[reasons.isna()]
+
+    # 3. 去除与已出现行内容完全相同的重复行（跨数据块）
+    key_columns = [c for c in ['内容', '平台', '景区名称'] if c in valid.columns]
+    hashes = pd.util.hash_pandas_object(valid[key_columns].fillna(''), index=False)
+    duplicate_mask = hashes.duplicated() | hashes.isin(seen_hashes)
+    seen_hashes.update(hashes[~duplicate_mask].tolist())
+    valid = valid[~duplicate_mask.values]
+
+    return valid, rejected, int(empty_mask.sum()), int(duplicate_mask.sum())
+
+
+def validate_upload(file_name, data):
+    """
+    在发送给 Agent 之前，于本地流式解析并校验上传的文件。
+
+    - CSV 分块读取，列数多于表头的行记为不合格；XLSX 以 openpyxl 只读模式逐行读取；
+    - 校验必需列，逐块进行向量化检查，丢弃空行和重复行，不合格行带文件中的行号；
+    - 通过校验的行按 UPLOAD_ENCODING 重新编码（默认 CSV，可选 Parquet）用于上传。
+
+    Returns:
+        ValidationResult: 校验结果和重新编码后的文件内容。
+    Raises:
+        UploadValidationError: 文件过大、无法解析或缺少必需列。
+    """
+    started = time.perf_counter()
+    size_mb = len(data) / 1024 / 1024
+    if size_mb > MAX_UPLOAD_MB:
+        raise UploadValidationError(f"文件大小 {size_mb:.1f} MB 超过上限 {MAX_UPLOAD_MB:.0f} MB。")
+
+    name = file_name.lower()
+    if name.endswith('.xlsx'):
+        chunks = iter_xlsx_chunks(data)
+    elif name.endswith('.csv'):
+        chunks = iter_csv_chunks(data)
+    else:
+        raise UploadValidationError("仅支持 CSV 或 XLSX 格式的文件。")
+
+    writer = None
+    sink = io.BytesIO() if UPLOAD_ENCODING == 'parquet' else io.StringIO()
+    seen_hashes = set()
+    rejected_parts, rejected_count = [], 0
+    total = accepted = empty = duplicates = 0
+    output_columns = None
+
+    try:
+        for chunk in chunks:
+            chunk = normalize_columns(chunk)
+            if output_columns is None:
+                missing = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+                if missing:
+                    raise UploadValidationError(
+                        f"文件缺少必需的列：{'、'.join(missing)}。当前列为："
+                        f"{'、'.join(str(c) for c in chunk.columns if c != PARSE_ERROR_COLUMN)}"
+                    )
+                output_columns = REQUIRED_COLUMNS + [c for c in OPTIONAL_COLUMNS if c in chunk.columns]
+
+            valid, rejected, empty_rows, duplicate_rows = _validate_chunk(chunk, seen_hashes)
+            total += len(chunk)
+            empty += empty_rows
+            duplicates += duplicate_rows
+            rejected_count += len(rejected)
+            if rejected_count - len(rejected) < MAX_REJECTED_SHOWN:
+                rejected_parts.append(rejected)
+
+            if accepted + len(valid) > MAX_ROWS:
+                raise UploadValidationError(f"有效评论超过 {MAX_ROWS} 行的上限，请拆分文件后分批上传。")
+            accepted += len(valid)
+            writer = _write_chunk(writer, sink, valid[output_columns])
+    except (csv.Error, UnicodeDecodeError, ValueError, KeyError, OSError) as e:
+        raise UploadValidationError(f"无法解析文件：{e}") from e
+    finally:
+        if writer is not None and UPLOAD_ENCODING == 'parquet':
+            writer.close()
+
+    if output_columns is None:
+        raise UploadValidationError("文件中没有任何数据。")
+
+    if UPLOAD_ENCODING == 'parquet':
+        payload, mime_type, suffix = sink.getvalue(), 'application/vnd.apache.parquet', '.parquet'
+    else:
+        payload, mime_type, suffix = sink.getvalue().encode('utf-8'), 'text/csv', '.csv'
+
+    rejected_df = pd.concat(rejected_parts).head(MAX_REJECTED_SHOWN) if rejected_parts else pd.DataFrame()
+    return ValidationResult(
+        file_name=os.path.splitext(file_name)[0] + suffix,
+        payload=payload,
+        mime_type=mime_type,
+        accepted_rows=accepted,
+        total_rows=total,
+        empty_rows=empty,
+        duplicate_rows=duplicates,
+        rejected=rejected_df,
+        rejected_count=rejected_count,
+        original_bytes=len(data),
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+    )
+
+
+def _write_chunk(writer, sink, df):
+    """ 把一个数据块追加写入输出：Parquet 每块一个行组，CSV 只在第一块写表头 """
+    if UPLOAD_ENCODING == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema, compression='zstd')
+        writer.write_table(table)
+        return writer
+
+    df.to_csv(sink, index=False, header=writer is None)
+    return True
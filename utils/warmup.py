@@ -0,0 +1,292 @@
+# /utils/warmup.py
+"""
+服务启动时的预热：加载数据集（含近似重复标记、异常检测状态和聚合立方体）、建立检索索引、
+加载 jieba 词典，并用进程池预先绘制各景区缺失的词云图，避免部署后第一位访问者承担这些开销。
+加载数据集时顺带写好基础数据的近似重复签名缓存，之后的进程加载数据集不再需要分词（也不导入 jieba）。
+
+预热进度保存在进程内，readiness 接口（GET /ready）在预热完成前返回 503，完成后返回 200，
+负载均衡据此只把流量转发给已预热的实例。同一个 HTTP 服务还提供导出文件的流式下载（GET /exports/...），
+文件按块从磁盘发送，不经过 Streamlit 会话、也不整体读入内存。
+本模块不依赖 Streamlit，由 tools.serve 在启动 Streamlit 前调用。
+"""
+
+import ast
+import copy
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote
+
+from utils import review_export, review_store
+from utils.dataset import get_shared_dataset
+from utils.dedup import DUPLICATE_COLUMN
+
+logger = logging.getLogger(__name__)
+
+# --- 预热配置 ---
+WARMUP_WORKERS = int(os.environ.get("WARMUP_WORKERS", str(os.cpu_count() or 1)))
+WARMUP_READY_HOST = os.environ.get("WARMUP_READY_HOST", "0.0.0.0")
+WARMUP_READY_PORT = int(os.environ.get("WARMUP_READY_PORT", "8502"))
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+PAGES_DIR = 'pages'
+# 从景区页面顶层读取的常量，词云参数与页面保持一致
+PAGE_CONSTANTS = ('SCENIC_SPOT_NAME', 'FONT_PATH', 'MASK_PATH')
+
+STAGES = ('jieba', 'dataset', 'search_index', 'wordclouds')
+
+# 进程级共享的预热进度
+_lock = threading.Lock()
+_thread = None
+_server_port = None  # 本进程中 HTTP 服务的端口，未启动时为 None
+_state = {
+    "status": "idle",  # idle / running / ready / failed
+    "started_at": None,
+    "finished_at": None,
+    "error": None,
+    "stages": {name: {"status": "pending", "done": 0, "total": 1, "elapsed_ms": None} for name in STAGES},
+}
+
+
+def _update_stage(name, **fields):
+    with _lock:
+        _state["stages"][name].update(fields)
+
+
+def get_progress():
+    """
+    返回预热进度的快照。
+
+    Returns:
+        dict: status、ready、progress（0-1）、elapsed_seconds、error 以及各阶段的状态和完成数。
+    """
+    with _lock:
+        state = copy.deepcopy(_state)
+    stages = state["stages"].values()
+    total = sum(s["total"] for s in stages)
+    done = sum(s["total"] if s["status"] in ("done", "failed") else s["done"] for s in stages)
+    end = state["finished_at"] or time.time()
+    state["ready"] = state["status"] == "ready"
+    state["progress"] = round(done / total, 3) if total else 1.0
+    state["elapsed_seconds"] = round(end - state["started_at"], 1) if state["started_at"] else None
+    return state
+
+
+def is_ready():
+    with _lock:
+        return _state["status"] == "ready"
+
+
+# --- 词云预绘制 ---
+
+def page_wordcloud_specs(pages_dir=PAGES_DIR):
+    """
+    从景区页面的顶层常量中读取词云参数（景区名称、字体、形状掩码），不执行页面代码。
+
+    Returns:
+        list: [{"scenic": ..., "font_path": ..., "mask_path": ...}]，按页面文件名排序。
+    """
+    specs = []
+    for name in sorted(os.listdir(pages_dir)):
+        if not name.endswith('.py'):
+            continue
+        with open(os.path.join(pages_dir, name), 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        constants = {}
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant):
+                for target in node.targets:
+                    if isinstance(target, ast.Name) and target.id in PAGE_CONSTANTS:
+                        constants[target.id] = node.value.value
+        if 'SCENIC_SPOT_NAME' in constants:
+            specs.append({
+                "scenic": constants['SCENIC_SPOT_NAME'],
+                "font_path": constants.get('FONT_PATH', 'assets/simhei.ttf'),
+                "mask_path": constants.get('MASK_PATH'),
+            })
+    return specs
+
+
+def render_scenic_wordcloud(df_scenic, scenic, font_path, mask_path):
+    """ 在工作进程中统计词频并绘制一个景区的词云图，返回图片路径（失败时为 None） """
+    from utils import charts
+
+    return charts.get_or_create_wordcloud_image(df_scenic, scenic, font_path=font_path, mask_path=mask_path)
+
+
+def prerender_wordclouds(df, specs, workers=WARMUP_WORKERS):
+    """
+    为缺少词云图的景区统计词频并绘制词云，景区之间用进程池并行（分词和绘图都受 CPU 限制）。
+    已有图片的景区直接跳过；单个景区失败只记录日志，不影响其他景区。
+
+    Returns:
+        int: 绘制失败的景区数。
+    """
+    from utils import text_features
+
+    pending = [s for s in specs if not os.path.exists(text_features.wordcloud_image_path(s["scenic"]))]
+    _update_stage('wordclouds', total=len(specs), done=len(specs) - len(pending))
+    if not pending:
+        return 0
+
+    columns = [c for c in ('景区名称', '内容', DUPLICATE_COLUMN) if c in df.columns]
+    jobs = [(df.loc[df['景区名称'] == s["scenic"], columns], s["scenic"], s["font_path"], s["mask_path"])
+            for s in pending]
+    failed = 0
+    if workers <= 1 or len(jobs) == 1:
+        for job in jobs:
+            failed += render_scenic_wordcloud(*job) is None
+            with _lock:
+                _state["stages"]['wordclouds']["done"] += 1
+        return failed
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = {pool.submit(render_scenic_wordcloud, *job): job[1] for job in jobs}
+        for future in as_completed(futures):
+            try:
+                path = future.result()
+            except Exception:
+                logger.exception("word cloud warm-up failed for %s", futures[future])
+                path = None
+            failed += path is None
+            with _lock:
+                _state["stages"]['wordclouds']["done"] += 1
+    return failed
+
+
+# --- 预热流程 ---
+
+def _run_stage(name, func):
+    _update_stage(name, status="running")
+    started = time.perf_counter()
+    try:
+        result = func()
+    except Exception:
+        _update_stage(name, status="failed", elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+        raise
+    _update_stage(name, status="done", elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+    logger.info("warm-up stage %s finished in %.0f ms", name, (time.perf_counter() - started) * 1000)
+    return result
+
+
+def _initialize_jieba():
+    import jieba
+
+    jieba.initialize()
+
+
+def run_warmup(file_path=review_store.BASE_DATA_PATH, pages_dir=PAGES_DIR, workers=WARMUP_WORKERS):
+    """
+    依次执行各预热阶段，阻塞直到完成。
+    数据集或索引加载失败时状态为 failed（readiness 一直返回 503）；个别词云绘制失败不影响就绪。
+
+    Returns:
+        dict: 预热结束时的进度快照。
+    """
+    with _lock:
+        _state.update(status="running", started_at=time.time(), finished_at=None, error=None)
+    try:
+        _run_stage('jieba', _initialize_jieba)
+        dataset = _run_stage('dataset', lambda: get_shared_dataset(file_path))
+        _run_stage('search_index', dataset.get_search_index)
+        failed = _run_stage('wordclouds', lambda: prerender_wordclouds(dataset.df, page_wordcloud_specs(pages_dir),
+                                                                      workers))
+        if failed:
+            logger.warning("%d word clouds could not be pre-rendered, pages will retry on first visit", failed)
+    except Exception as e:
+        logger.exception("warm-up failed")
+        with _lock:
+            _state.update(status="failed", finished_at=time.time(), error=str(e))
+    else:
+        with _lock:
+            _state.update(status="ready", finished_at=time.time())
+    progress = get_progress()
+    logger.info("warm-up %s in %.1f s", progress["status"], progress["elapsed_seconds"])
+    return progress
+
+
+def start_warmup(file_path=review_store.BASE_DATA_PATH, pages_dir=PAGES_DIR, workers=WARMUP_WORKERS):
+    """ 在后台线程中开始预热（进程内只执行一次），立即返回 """
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return _thread
+        _thread = threading.Thread(target=run_warmup, args=(file_path, pages_dir, workers),
+                                   name="warmup", daemon=True)
+    _thread.start()
+    return _thread
+
+
+# --- readiness 接口 ---
+
+class ReadinessHandler(BaseHTTPRequestHandler):
+    """
+    GET /ready：预热完成返回 200，否则返回 503，响应体为预热进度 JSON；
+    GET /live：进程存活即返回 200；
+    GET /exports/<文件名>?name=<下载文件名>：流式发送 review_export 生成的导出文件。
+    """
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        if path == "/ready":
+            progress = get_progress()
+            self._send_json(200 if progress["ready"] else 503, progress)
+        elif path == "/live":
+            self._send_json(200, {"status": "alive"})
+        elif path.startswith(review_export.DOWNLOAD_ROUTE):
+            self._send_export(unquote(path[len(review_export.DOWNLOAD_ROUTE):]), parse_qs(query))
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _send_export(self, name, params):
+        """ 按块把导出文件写入响应，内存占用与文件大小无关 """
+        path, mime = review_export.resolve_download(name, review_export.EXPORT_DIR)
+        if path is None:
+            self._send_json(404, {"error": "export not found or expired"})
+            return
+        file_name = params.get("name", [name])[0]
+        try:
+            with open(path, "rb") as f:
+                self.send_response(200)
+                self.send_header("Content-Type", mime)
+                self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+                # 中文文件名按 RFC 6266 以 filename* 传递
+                self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(file_name)}")
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                shutil.copyfileobj(f, self.wfile, DOWNLOAD_CHUNK_BYTES)
+        except (BrokenPipeError, ConnectionResetError):
+            # 浏览器取消了下载
+            pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 负载均衡的探测很频繁，不写入访问日志
+        pass
+
+
+def serve_readiness(host=WARMUP_READY_HOST, port=WARMUP_READY_PORT):
+    """ 在后台线程中启动 readiness 接口（兼导出文件下载），返回 HTTP 服务对象 """
+    global _server_port
+    server = ThreadingHTTPServer((host, port), ReadinessHandler)
+    threading.Thread(target=server.serve_forever, name="readiness", daemon=True).start()
+    _server_port = server.server_address[1]
+    logger.info("readiness endpoint listening on http://%s:%d/ready", host, _server_port)
+    return server
+
+
+def download_port():
+    """ 提供导出文件下载的 HTTP 服务端口；本进程没有启动该服务（如直接 streamlit run）时为 None """
+    return _server_port